@@ -0,0 +1,170 @@
+# Seeded synthetic data generators for every study design the solver supports.
+# Each generator returns a Scenario: the data plus everything Tea needs to
+# analyze it (variables, study design, assumptions, hypothesis).
+
+import attr
+import numpy as np
+import pandas as pd
+
+alpha = {'Type I (False Positive) Error Rate': 0.05}
+
+
+@attr.s(init=True)
+class Scenario(object):
+    name = attr.ib(type=str)
+    data = attr.ib(type=pd.DataFrame)
+    variables = attr.ib(type=list)  # as passed to tea.define_variables
+    design = attr.ib(type=dict)  # as passed to tea.define_study_design
+    assumptions = attr.ib(type=dict)  # as passed to tea.assume
+    hypothesis_vars = attr.ib(type=list)
+    prediction = attr.ib(type=list, default=None)
+    key = attr.ib(type=str, default='pid')
+
+    @property
+    def rows(self):
+        return len(self.data)
+
+
+def _balanced_labels(rng, labels, n):
+    values = np.resize(np.asarray(labels, dtype=object), n)
+    rng.shuffle(values)
+    return values
+
+
+def two_group(n: int, seed: int = 0, effect: float = 0.3):
+    rng = np.random.default_rng(seed)
+    condition = _balanced_labels(rng, ['control', 'treatment'], n)
+    score = rng.normal(10, 2, n) + effect * 2 * (condition == 'treatment')
+    data = pd.DataFrame({'pid': np.arange(n), 'condition': condition, 'score': score})
+
+    return Scenario('two_group', data,
+                    [{'name': 'condition', 'data type': 'nominal', 'categories': ['control', 'treatment']},
+                     {'name': 'score', 'data type': 'ratio'}],
+                    {'study type': 'experiment', 'independent variables': 'condition', 'dependent variables': 'score'},
+                    dict(alpha),
+                    ['condition', 'score'],
+                    ['condition:control < treatment'])
+
+
+def paired(n: int, seed: int = 0, effect: float = 0.3):
+    rng = np.random.default_rng(seed)
+    subjects = max(n // 2, 2)
+    pid = np.repeat(np.arange(subjects), 2)
+    time = np.tile(np.array(['pre', 'post'], dtype=object), subjects)
+    baseline = np.repeat(rng.normal(0, 1, subjects), 2)
+    y = 5 + baseline + rng.normal(0, 1, 2 * subjects) + effect * (time == 'post')
+    data = pd.DataFrame({'pid': pid, 'time': time, 'y': y})
+
+    return Scenario('paired', data,
+                    [{'name': 'time', 'data type': 'nominal', 'categories': ['pre', 'post']},
+                     {'name': 'y', 'data type': 'ratio'}],
+                    {'study type': 'experiment', 'independent variables': 'time', 'dependent variables': 'y',
+                     'within subjects': 'time'},
+                    dict(alpha),
+                    ['time', 'y'],
+                    ['time:pre < post'])
+
+
+def k_group(n: int, seed: int = 0, k: int = 4, effect: float = 0.3):
+    rng = np.random.default_rng(seed)
+    groups = [f"g{i}" for i in range(k)]
+    group = _balanced_labels(rng, groups, n)
+    shift = np.array([groups.index(g) for g in group]) * effect
+    data = pd.DataFrame({'pid': np.arange(n), 'group': group, 'value': rng.exponential(2, n) + shift})
+
+    return Scenario('k_group', data,
+                    [{'name': 'group', 'data type': 'nominal', 'categories': groups},
+                     {'name': 'value', 'data type': 'ratio'}],
+                    {'study type': 'experiment', 'independent variables': 'group', 'dependent variables': 'value'},
+                    dict(alpha),
+                    ['group', 'value'])
+
+
+def factorial(n: int, seed: int = 0, effect: float = 0.3):
+    rng = np.random.default_rng(seed)
+    dose = _balanced_labels(rng, ['low', 'high'], n)
+    site = _balanced_labels(rng, ['north', 'south', 'east'], n)
+    y = rng.normal(0, 1, n) + effect * (dose == 'high') + effect / 2 * (site == 'east')
+    data = pd.DataFrame({'pid': np.arange(n), 'dose': dose, 'site': site, 'y': y})
+
+    return Scenario('factorial', data,
+                    [{'name': 'dose', 'data type': 'nominal', 'categories': ['low', 'high']},
+                     {'name': 'site', 'data type': 'nominal', 'categories': ['north', 'south', 'east']},
+                     {'name': 'y', 'data type': 'ratio'}],
+                    {'study type': 'experiment', 'independent variables': ['dose', 'site'], 'dependent variables': 'y'},
+                    dict(alpha),
+                    ['dose', 'site', 'y'])
+
+
+def repeated_measures(n: int, seed: int = 0, k: int = 4, effect: float = 0.3):
+    rng = np.random.default_rng(seed)
+    conditions = [f"c{i}" for i in range(k)]
+    subjects = max(n // k, 2)
+    pid = np.repeat(np.arange(subjects), k)
+    condition = np.tile(np.array(conditions, dtype=object), subjects)
+    subject_effect = np.repeat(rng.normal(0, 1, subjects), k)
+    y = 5 + subject_effect + rng.normal(0, 1, k * subjects) + effect * np.tile(np.arange(k), subjects)
+    data = pd.DataFrame({'pid': pid, 'condition': condition, 'y': y})
+
+    return Scenario('repeated_measures', data,
+                    [{'name': 'condition', 'data type': 'nominal', 'categories': conditions},
+                     {'name': 'y', 'data type': 'ratio'}],
+                    {'study type': 'experiment', 'independent variables': 'condition', 'dependent variables': 'y',
+                     'within subjects': 'condition'},
+                    dict(alpha),
+                    ['condition', 'y'])
+
+
+def contingency(n: int, seed: int = 0, rows: int = 3, cols: int = 4):
+    rng = np.random.default_rng(seed)
+    a_levels = [f"a{i}" for i in range(rows)]
+    b_levels = [f"b{j}" for j in range(cols)]
+    a = rng.choice(np.array(a_levels, dtype=object), n)
+    # Make b depend weakly on a
+    shift = np.array([a_levels.index(v) for v in a])
+    b_index = (rng.integers(0, cols, n) + (rng.random(n) < 0.1) * shift) % cols
+    b = np.array(b_levels, dtype=object)[b_index]
+    data = pd.DataFrame({'pid': np.arange(n), 'a': a, 'b': b})
+
+    return Scenario('contingency', data,
+                    [{'name': 'a', 'data type': 'nominal', 'categories': a_levels},
+                     {'name': 'b', 'data type': 'nominal', 'categories': b_levels}],
+                    {'study type': 'observational study', 'contributor variables': 'a', 'outcome variables': 'b'},
+                    dict(alpha),
+                    ['a', 'b'])
+
+
+def correlation(n: int, seed: int = 0, rho: float = 0.3):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 1, n)
+    y = rho * x + np.sqrt(1 - rho ** 2) * rng.normal(0, 1, n)
+    data = pd.DataFrame({'pid': np.arange(n), 'x': x, 'y': y})
+
+    return Scenario('correlation', data,
+                    [{'name': 'x', 'data type': 'ratio'},
+                     {'name': 'y', 'data type': 'ratio'}],
+                    {'study type': 'observational study', 'contributor variables': 'x', 'outcome variables': 'y'},
+                    dict(alpha),
+                    ['x', 'y'],
+                    ['x ~ y'])
+
+
+__generators__ = {
+    'two_group': two_group,
+    'paired': paired,
+    'k_group': k_group,
+    'factorial': factorial,
+    'repeated_measures': repeated_measures,
+    'contingency': contingency,
+    'correlation': correlation,
+}
+
+
+def all_designs():
+    return list(__generators__)
+
+
+def generate(design: str, n: int, seed: int = 0):
+    if design not in __generators__:
+        raise ValueError(f"Unknown design: {design}. Expected one of {all_designs()}")
+    return __generators__[design](int(n), seed)
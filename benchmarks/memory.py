@@ -0,0 +1,84 @@
+# Measures the memory footprint of Tea's runtime data structures: the bytes
+# allocated per object when many are alive at once (as in a large batch of hypotheses).
+#
+#   python -m benchmarks.memory --count 10000 --output memory.jsonl
+#
+# Each structure is one JSON line with its total and per-object bytes.
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from tea.global_vals import *
+from tea.ast import DataType
+from tea.runtimeDataStructures.varData import VarData
+from tea.runtimeDataStructures.bivariateData import BivariateData
+from tea.runtimeDataStructures.testResult import TestResult
+from tea.z3_solver.solver import StatVar
+
+default_count = 10000
+
+
+def _var_data(i: int):
+    metadata = {'dtype': DataType.RATIO, 'categories': None, 'var_name': f"y{i}", 'query': ''}
+    return VarData(metadata, role=outcome_identifier)
+
+
+def _combined_data(i: int):
+    x = VarData({'dtype': DataType.NOMINAL, 'categories': {'a': 1, 'b': 2}, 'var_name': 'x', 'query': ''},
+                role=contributor_identifier)
+    return BivariateData([x, _var_data(i)], observational_identifier, alpha=0.05)
+
+
+def _test_result(i: int):
+    result = TestResult(name='students_t', test_statistic=1.5 + i, p_value=0.01, prediction=None, alpha=0.05, dof=98)
+    result.add_effect_size('Cohen\'s d', 0.3)
+    return result
+
+
+structures = {
+    'VarData': _var_data,
+    'CombinedData': _combined_data,
+    'TestResult': _test_result,
+    'StatVar': lambda i: StatVar(f"y{i}"),
+}
+
+
+# @returns the bytes allocated to keep @param count objects made by @param make alive
+def measure(make, count: int):
+    gc.collect()
+    tracemalloc.start()
+    objects = [make(i) for i in range(count)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return allocated
+
+
+def run(count: int = default_count):
+    for structure, make in structures.items():
+        allocated = measure(make, count)
+        yield {'structure': structure, 'count': count, 'bytes': allocated, 'bytes per object': allocated / count}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory',
+                                     description="Measure the memory footprint of Tea's runtime data structures.")
+    parser.add_argument('--count', type=int, default=default_count, help=f"objects of each kind (default: {default_count})")
+    parser.add_argument('--output', help='write JSON lines to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for record in run(args.count):
+            out.write(json.dumps(record) + '\n')
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# Runs Tea end-to-end on synthetic data and records per-stage timings and peak memory.
+# Everything runs offline: data is generated locally and written to a temporary directory.
+#
+#   python -m benchmarks.run --designs two_group,correlation --rows 1e3,1e5 --output bench.jsonl
+#   python -m benchmarks.run --baseline bench.jsonl --tolerance 0.25
+#
+# Each benchmark is one JSON line. With --baseline, benchmarks slower than the
+# baseline by more than --tolerance are reported and the exit status is 1.
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import tea
+from tea.helpers import logger
+
+from benchmarks.generators import all_designs, generate
+
+default_rows = [1e3, 1e4]
+
+
+def _parse_rows(value: str):
+    return [int(float(v)) for v in value.split(',') if v]
+
+
+def _parse_designs(value: str):
+    designs = [d for d in value.split(',') if d]
+    unknown = [d for d in designs if d not in all_designs()]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown designs: {unknown}. Expected some of {all_designs()}")
+    return designs
+
+
+# Runs one scenario through the public API and returns its benchmark record.
+# @param memory traces allocations with tracemalloc; this slows execution, so
+# timings from memory runs are not comparable with timings from plain runs.
+def run_scenario(scenario, directory: str, memory: bool = True):
+    path = os.path.join(directory, f"{scenario.name}_{scenario.rows}.csv")
+    scenario.data.to_csv(path, index=False)
+
+    record = {
+        'design': scenario.name,
+        'rows': scenario.rows,
+        'memory traced': memory,
+    }
+
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    try:
+        tea.data(path, key=scenario.key)
+        tea.define_variables(scenario.variables)
+        tea.define_study_design(scenario.design)
+        tea.assume(scenario.assumptions)
+        result = tea.hypothesize(scenario.hypothesis_vars, scenario.prediction)
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        result = None
+    else:
+        record['status'] = 'ok'
+    finally:
+        record['wall'] = time.perf_counter() - wall_start
+        if memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            record['peak memory'] = peak  # bytes
+
+    if result is not None:
+        record['tests'] = sorted(result.test_to_results)
+        if result.profile is not None:
+            record['profile'] = result.profile.as_dict()
+
+    os.remove(path)
+    return record
+
+
+# Yields one benchmark record per design, size and repetition
+def run(designs: list, rows: list, seed: int = 0, repeat: int = 1, memory: bool = True):
+    with tempfile.TemporaryDirectory(prefix='tea-bench-') as directory:
+        for design in designs:
+            for n in rows:
+                scenario = generate(design, n, seed)
+                for i in range(repeat):
+                    record = run_scenario(scenario, directory, memory)
+                    record['seed'] = seed
+                    record['repeat'] = i
+                    yield record
+
+
+# Best wall time per (design, rows)
+def _best_times(records):
+    best = {}
+    for r in records:
+        if r.get('status') != 'ok':
+            continue
+        key = (r['design'], r['rows'])
+        best[key] = min(best.get(key, float('inf')), r['wall'])
+    return best
+
+
+# Returns the (design, rows, baseline, current) benchmarks that regressed by more than @param tolerance
+def compare(baseline: list, current: list, tolerance: float):
+    regressions = []
+    baseline_times = _best_times(baseline)
+    for key, wall in _best_times(current).items():
+        if key in baseline_times and wall > baseline_times[key] * (1 + tolerance):
+            regressions.append((key[0], key[1], baseline_times[key], wall))
+    return regressions
+
+
+# Returns the records of @param records whose scenario raised
+def failures(records: list):
+    return [r for r in records if r.get('status') == 'error']
+
+
+def load_records(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run',
+                                     description='Benchmark Tea on seeded synthetic data.')
+    parser.add_argument('--designs', type=_parse_designs, default=all_designs(),
+                        help=f"comma-separated designs (default: all of {','.join(all_designs())})")
+    parser.add_argument('--rows', type=_parse_rows, default=default_rows,
+                        help='comma-separated row counts, e.g., 1e3,1e5,1e7 (default: 1e3,1e4)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='runs per design and size')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='skip tracemalloc (faster, more accurate timings; no peak memory)')
+    parser.add_argument('--output', help='write JSON lines to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON lines from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown relative to the baseline (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    logger.configure(level='quiet')
+    out = open(args.output, 'w') if args.output else sys.stdout
+    records = []
+    try:
+        for record in run(args.designs, args.rows, args.seed, args.repeat, args.memory):
+            records.append(record)
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+
+    status = 0
+    for record in failures(records):
+        print(f"ERROR {record['design']} ({record['rows']} rows): {record['error']}", file=sys.stderr)
+        status = 1
+    if args.baseline:
+        for design, n, before, after in compare(load_records(args.baseline), records, args.tolerance):
+            print(f"REGRESSION {design} ({n} rows): {before:.4f}s -> {after:.4f}s", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,15 +3,19 @@ import setuptools
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+# Defines __version__
+with open("tea/version.py", "r") as fh:
+    exec(fh.read())
+
 setuptools.setup(name='tealang',
-      version='0.2',
+      version=__version__,
       author='Eunice Jun',
       author_email='emjun@cs.washington.edu',
       description='Tea: A High-level Language and Runtime System to Automate Statistical Analysis',
       long_description=long_description,
       long_description_content_type="text/markdown",
       url='https://github.com/emjun/tea-lang',
-      packages=setuptools.find_packages(),
+      packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
       install_requires=[
           'attrs',
           'pandas',
@@ -24,6 +28,12 @@ setuptools.setup(name='tealang',
           'z3-solver',
           'urllib3'
       ],
+      extras_require={
+          'yaml': ['pyyaml']
+      },
+      entry_points={
+          'console_scripts': ['tea=tea.cli:main']
+      },
       classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
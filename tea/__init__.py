@@ -1,9 +1,17 @@
+from tea.version import __version__
 from tea.api import (
                     data, 
                     define_variables, 
                     define_study_design, 
                     assume,
                     hypothesize,
+                    hypothesize_many,
+                    hypothesize_mass_univariate,
+                    hypothesize_from_summary,
+                    validate_data,
+                    correct_multiple_comparisons,
                     download_data,
-                    divine_properties
+                    divine_properties,
+                    configure_logging,
+                    configure_cache
                 )
\ No newline at end of file
@@ -0,0 +1,5 @@
+import sys
+
+from tea.cli import main
+
+sys.exit(main())
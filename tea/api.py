@@ -6,21 +6,26 @@ from .build import (load_data, load_data_from_url, const,
                     select, compare, relate, predict,
                     get_var_from_list
                     )
-from .evaluate import evaluate
+from .evaluate import evaluate, evaluate_many
 import tea.helpers
 import tea.runtimeDataStructures
 import tea.z3_solver
 from tea.z3_solver.solver import set_mode
+from tea.helpers import logger, profiler, multipleComparisons, massUnivariate, summaryStatistics, resultCache, validation
 
 from typing import Dict
 from .global_vals import *
 from pathlib import Path
+import pandas as pd
 
 # Set at start of programs
 # Used across functions
 dataset_path = ''
 dataset_obj = None
 dataset_id = None
+dataset_weights = None
+dataset_chunk_size = None
+dataset_validation = None
 vars_objs = []
 study_design = None
 
@@ -41,19 +46,61 @@ all_results = {}  # Used for multiple comparison correction
 MODE = 'strict'
 
 
+# Logging
+# @param level is one of 'debug', 'info', 'warning', 'error', 'quiet'
+# @param file is a path that log records are appended to
+# @param json_lines writes @param file as JSON lines (one object per record) for log aggregation
+def configure_logging(level: str = None, file=None, json_lines: bool = False, console: bool = True):
+    logger.configure(level=level, file=file, json_lines=json_lines, console=console)
+
+
+# Result cache
+# @param enabled turns on caching of hypothesize() results on disk, keyed by the
+# data's contents, variables, study design, assumptions, mode, hypothesis and Tea version
+# @param directory defaults to ~/.tea/cache
+# @param max_bytes and @param max_age_days bound the cache; older and least recently used entries are evicted
+def configure_cache(enabled: bool = True, directory=None, max_bytes: int = None, max_age_days: float = None):
+    resultCache.configure(enabled, directory, max_bytes, max_age_days * 24 * 60 * 60 if max_age_days is not None else None)
+
+
 # For testing purposes
 def download_data(url, file_name):
     return load_data_from_url(url, file_name)
 
 
 # @sets global dataset_path and dataaset_obj (of type Dataset)
-def data(file, key=None):
-    global dataset_path, dataset_obj, dataset_id
+# Starts a new family of hypotheses for multiple comparison correction
+# @param weights is the name of a column with the number of observations each
+# row stands for (e.g., counts per condition and outcome), for pre-aggregated data
+# @param chunk_size streams correlations over this many rows at a time, for large data
+# @param validation is what to do with values that are not among the declared
+# categories or within the declared range of their variable, checked on load:
+# 'warn' (log them), 'coerce' (treat them as missing), 'drop' (drop their rows),
+# 'error' (raise a ValueError) or None (do not check)
+def data(file, key=None, weights=None, chunk_size=None, validation=validation.warn_policy):
+    global dataset_path, dataset_obj, dataset_id, dataset_weights, dataset_chunk_size, dataset_validation, all_results
 
     # Require that the path to the data must be a string or a Path object
     assert (isinstance(file, str) or isinstance(file, Path))
     dataset_path = file
     dataset_id = key
+    dataset_weights = weights
+    dataset_chunk_size = chunk_size
+    dataset_validation = validation
+    all_results = {}
+
+
+# Checks the data against the defined variables without testing any hypothesis
+# @param policy defaults to the validation policy given to data()
+# @returns the validation.ValidationReport (with the violations found, if any)
+def validate_data(policy: str = None):
+    global dataset_obj
+
+    assert (dataset_path)
+    assert (vars_objs)
+
+    dataset_obj = load_data(dataset_path, vars_objs, dataset_id, dataset_weights, dataset_chunk_size)
+    return validation.validate(dataset_obj, policy if policy else (dataset_validation or validation.warn_policy))
 
 
 def define_variables(vars: Dict[str, str]):
@@ -124,14 +171,14 @@ def assume(user_assumptions: Dict[str, str], mode=None):
     # Set MODE for dealing with assumptions
     if mode and mode == 'relaxed':
         MODE = mode
-        log(f"\nRunning under {MODE.upper()} mode.\n")
+        log("\nRunning under %s mode.\n", MODE.upper(), mode=MODE)
         log(
-            f"This means that user assertions will be checked. Should they fail, Tea will issue a warning but proceed as if user's assertions were true.")
+            "This means that user assertions will be checked. Should they fail, Tea will issue a warning but proceed as if user's assertions were true.")
     else:
         assert (mode == None or mode == 'strict')
         MODE = 'strict'
-        log(f"\nRunning under {MODE.upper()} mode.\n")
-        log(f"This means that user assertions will be checked. Should they fail, Tea will override user assertions.\n")
+        log("\nRunning under %s mode.\n", MODE.upper(), mode=MODE)
+        log("This means that user assertions will be checked. Should they fail, Tea will override user assertions.\n")
 
 
 def hypothesize(vars: list, prediction: list = None):
@@ -143,25 +190,50 @@ def hypothesize(vars: list, prediction: list = None):
     assert (vars_objs)
     assert (study_design)
 
-    dataset_obj = load_data(dataset_path, vars_objs, dataset_id)
+    # Profile the whole run; the profile is attached to the result as result.profile
+    with profiler.profiling() as profile:
+        cache_key = None
+        if resultCache.enabled:
+            cache_key = resultCache.key(dataset_path, vars_objs, study_design, assumptions, MODE, vars, prediction,
+                                        key=dataset_id, weights=dataset_weights, chunk_size=dataset_chunk_size,
+                                        validation=dataset_validation)
+            result = resultCache.get(cache_key)
+            if result is not None:
+                profiler.count(profiler.result_cache_hits)
+                profile.claimed = True
+                result.profile = profile
+                all_results[_hypothesis_key(vars, prediction)] = result
+                with profiler.stage(profiler.rendering):
+                    log("\n%s", result)
+                return result
+
+        with profiler.stage(profiler.data_load):
+            dataset_obj = load_data(dataset_path, vars_objs, dataset_id, dataset_weights, dataset_chunk_size,
+                                    dataset_validation)
+
+        v_objs = []
+        for v in vars:
+            v_objs.append(get_var_from_list(v, vars_objs))  # may want to use Dataset instance method instead
+
+        # Create and get back handle to AST node
+        relationship = relate(v_objs, prediction)
+        num_predictions = len(relationship.predictions) # use for multiple comparison correction
+
+        # Interpret AST node, Returns ResultData object <-- this may need to change
+        set_mode(MODE)
+        num_comparisons = max(num_predictions, 1)
+        result = evaluate(dataset_obj, relationship, assumptions, study_design)
+
+        # Make multiple comparison correction across the predictions
+        result.bonferroni_correction(num_comparisons)
+        # Keep for correction across hypotheses (see correct_multiple_comparisons)
+        all_results[_hypothesis_key(vars, prediction)] = result
+        resultCache.put(cache_key, result)
+
+        # Rendering the result is deferred to the logger, so it is skipped entirely when INFO is disabled
+        with profiler.stage(profiler.rendering):
+            log("\n%s", result)
 
-    v_objs = []
-    for v in vars:
-        v_objs.append(get_var_from_list(v, vars_objs))  # may want to use Dataset instance method instead
-
-    # Create and get back handle to AST node
-    relationship = relate(v_objs, prediction)
-    num_predictions = len(relationship.predictions) # use for multiple comparison correction
-
-    # Interpret AST node, Returns ResultData object <-- this may need to change
-    set_mode(MODE)
-    num_comparisons = 1
-    result = evaluate(dataset_obj, relationship, assumptions, study_design)
-
-    # Make multiple comparison correction
-    result.bonferroni_correction(num_comparisons)
-    
-    print(f"\n{result}")
     return result
 
     # Use assumptions and hypotheses for interpretation/reporting back to user
@@ -172,6 +244,129 @@ def hypothesize(vars: list, prediction: list = None):
     # return output
 
 
+# @param spec is a list of variable names, a (vars, prediction) pair, or a dict with 'vars' and optionally 'prediction'
+def _parse_hypothesis_spec(spec):
+    if isinstance(spec, dict):
+        return spec['vars'], spec.get('prediction')
+    elif isinstance(spec, tuple):
+        assert (len(spec) == 2)
+        return spec
+    else:
+        assert (isinstance(spec, list))
+        return spec, None
+
+
+def _hypothesis_key(vars: list, prediction: list = None):
+    return (tuple(vars), tuple(prediction) if prediction else ())
+
+
+# Corrects every hypothesis tested on the current data (with hypothesize or
+# hypothesize_many) as one family; see multipleComparisons.correct_result_data.
+# @param method is one of 'bonferroni', 'holm', 'hochberg', 'fdr_bh', 'fdr_by'
+# @returns the corrected ResultData objects
+def correct_multiple_comparisons(method: str = multipleComparisons.holm_name):
+    global all_results
+
+    results = list(all_results.values())
+    return multipleComparisons.correct_result_data(results, method)
+
+
+# Tests many hypotheses about the variables, study design and assumptions defined so far.
+# Loads the data once and shares properties, group splits and test selection
+# across the hypotheses; see evaluate_many.
+# @param specs is a list of hypotheses; each is a list of variable names, a
+# (vars, prediction) pair, or a dict with 'vars' and optionally 'prediction'
+# @param correction is the multiple comparison correction across the family
+# ('bonferroni', 'holm', 'hochberg', 'fdr_bh', 'fdr_by') or None
+# @param workers is the number of threads that execute tests
+# @param processes executes tests on @param workers processes instead (default: one per CPU),
+# for CPU-bound batches; the data is shared with them rather than copied
+# @returns a ResultData per hypothesis, in order
+def hypothesize_many(specs: list, correction: str = multipleComparisons.holm_name, workers: int = None,
+                     processes: bool = False):
+    global dataset_path, vars_objs, study_design, dataset_obj, dataset_id
+    global assumptions, all_results
+    global MODE
+
+    assert (dataset_path)
+    assert (vars_objs)
+    assert (study_design)
+
+    with logger.batch_mode(), profiler.profiling():
+        with profiler.stage(profiler.data_load):
+            dataset_obj = load_data(dataset_path, vars_objs, dataset_id, dataset_weights, dataset_chunk_size,
+                                    dataset_validation)
+
+        relationships = []
+        for spec in specs:
+            vars, prediction = _parse_hypothesis_spec(spec)
+            v_objs = [get_var_from_list(v, vars_objs) for v in vars]
+            relationships.append(relate(v_objs, prediction))
+
+        set_mode(MODE)
+        results = evaluate_many(dataset_obj, relationships, assumptions, study_design, workers, processes)
+
+        if correction:
+            multipleComparisons.correct_result_data(results, correction)
+
+        for spec, result in zip(specs, results):
+            all_results[_hypothesis_key(*_parse_hypothesis_spec(spec))] = result
+
+    return results
+
+
+# Mass-univariate mode: tests one categorical variable against many outcome columns.
+# Properties of the outcomes are not verified; @param tests are run on every outcome.
+# @param x is a nominal or ordinal variable defined with define_variables
+# @param ys are the names of numeric columns in the data (they need not be defined as variables)
+# @param tests defaults to students_t, welchs_t and mannwhitney_u when x has two
+# categories and f_test and kruskall_wallis otherwise
+# @param chunk_size is the number of outcome columns processed at a time, bounding memory
+# @param correction is applied across outcomes for each test ('fdr_bh', 'holm', 'bonferroni') or None
+# @returns a DataFrame with one row per outcome and test (see massUnivariate.columns);
+# its attrs['profile'] holds the timings
+def hypothesize_mass_univariate(x: str, ys: list, tests: list = None, chunk_size: int = massUnivariate.default_chunk_size,
+                                correction: str = multipleComparisons.benjamini_hochberg_name):
+    global dataset_path, vars_objs, dataset_obj, dataset_id
+
+    assert (dataset_path)
+    assert (vars_objs)
+
+    x_var = get_var_from_list(x, vars_objs)
+    if not (isnominal(x_var) or isordinal(x_var)):
+        raise ValueError(f"{x} must be a nominal or ordinal variable to group outcomes by")
+
+    with profiler.profiling() as profile:
+        with profiler.stage(profiler.data_load):
+            dataset_obj = load_data(dataset_path, vars_objs, dataset_id, dataset_weights, dataset_chunk_size,
+                                    dataset_validation)
+
+        results = massUnivariate.test_outcomes(dataset_obj.data, x, list(x_var.categories.keys()), list(ys),
+                                               tests, chunk_size, correction)
+
+    results.attrs['profile'] = profile
+    return results
+
+
+# Summary-statistics mode: compares groups given one row per group with its
+# @param mean, standard deviation @param sd and size @param n, instead of raw data.
+# Properties of the data cannot be verified from summaries; @param tests are run as given.
+# @param group is the column naming the groups
+# @param tests defaults to students_t and welchs_t for two groups and f_test otherwise
+# @returns a DataFrame with one row per test (see summaryStatistics.columns)
+def hypothesize_from_summary(file, group: str, mean: str, sd: str, n: str, tests: list = None):
+    assert (isinstance(file, str) or isinstance(file, Path))
+
+    with profiler.profiling() as profile:
+        with profiler.stage(profiler.data_load):
+            summary = summaryStatistics.from_table(pd.read_csv(file), group, mean, sd, n)
+        with profiler.stage(profiler.test_execution):
+            results = summaryStatistics.test_summary(summary, tests)
+
+    results.attrs['profile'] = profile
+    return results
+
+
 # TODO: Add relate and compare methods
 
 # @param vars that user would like to relate
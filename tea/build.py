@@ -1,4 +1,5 @@
 from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import validation as data_validation
 from tea.ast import (Variable, DataType, Literal, Relate, Relationship)
 
 from collections import OrderedDict
@@ -70,8 +71,12 @@ def iscategorical(var: Variable):
 
 
 # @param pid is the name of the column with participant ids
-def load_data(source_name: str, vars: list, pid: str):
-    return Dataset(source_name, vars, pid)
+# @param validation is the policy for data that does not match @param vars (see helpers/validation.py), or None not to check
+def load_data(source_name: str, vars: list, pid: str, weights: str = None, chunk_size: int = None, validation: str = None):
+    dataset = Dataset(source_name, vars, pid, weights, chunk_size)
+    if validation:
+        data_validation.validate(dataset, validation)
+    return dataset
 
 
 def load_data_from_url(url: str, name: str):
@@ -0,0 +1,214 @@
+# Runs an analysis spec file from the command line, e.g., from cron or a workflow scheduler.
+#
+#   tea sweep.yaml --output results.jsonl --workers 8 --processes
+#   tea sweep.yaml --output results.jsonl --resume
+#
+# A spec is a JSON or YAML (requires PyYAML) object:
+#   data: path to a CSV file, relative to the spec, or {file, key, weights, chunk_size} as for tea.data
+#   variables: as for tea.define_variables
+#   design: as for tea.define_study_design
+#   assumptions: as for tea.assume (optional)
+#   hypotheses: list of variable lists, or of {vars, prediction}
+#   correction: multiple comparison correction across the hypotheses (default: holm; null for none)
+#
+# Hypotheses run in batches with tea.hypothesize_many. Each finished batch is
+# appended to the checkpoint (<output>.checkpoint, JSON lines); with --resume,
+# hypotheses already in the checkpoint are not run again. Once every hypothesis
+# has run, p-values are corrected across the spec and --output is written with
+# one record per hypothesis (or follow-up prediction) and test: JSON lines, or
+# CSV if the file name ends in .csv.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import tea
+from tea.helpers import multipleComparisons
+
+default_batch_size = 100
+
+# Fields of each TestResult that are written out
+result_fields = ['test_statistic', 'p_value', 'adjusted_p_value', 'dof', 'alpha', 'approximation_error',
+                 'null_hypothesis', 'interpretation']
+
+
+def load_spec(path: str):
+    with open(path) as f:
+        if Path(path).suffix.lower() in ['.yaml', '.yml']:
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Reading YAML specs requires PyYAML: pip install tealang[yaml]")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    for key in ['data', 'variables', 'design', 'hypotheses']:
+        if key not in spec:
+            raise ValueError(f"The spec {path} is missing '{key}'")
+    return spec
+
+
+# Identifies a spec, so that a checkpoint is only resumed for the spec that wrote it
+def _spec_hash(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+# Sets up Tea's data, variables, design and assumptions from @param spec
+def _define(spec, spec_dir: Path):
+    source = spec['data'] if isinstance(spec['data'], dict) else {'file': spec['data']}
+    source = dict(source)
+    source['file'] = str(spec_dir / source['file'])
+    tea.data(**source)
+    tea.define_variables(spec['variables'])
+    tea.define_study_design(spec['design'])
+    tea.assume(spec.get('assumptions', {}))
+
+
+# @returns one record per test of @param res_data (and of its follow-up predictions)
+def _records(index: int, vars: list, prediction, res_data):
+    records = []
+    follow_ups = list(getattr(res_data, 'follow_up_results', None) or [])
+    for res in multipleComparisons.family_members([res_data]):
+        follow_up = None if res is res_data else next(i for i, f in enumerate(follow_ups) if f is res)
+        for test, test_result in res.test_to_results.items():
+            record = {'hypothesis': index, 'vars': vars, 'prediction': prediction, 'follow_up': follow_up, 'test': test}
+            for field in result_fields:
+                record[field] = _jsonable(getattr(test_result, field, None))
+            records.append(record)
+    return records
+
+
+# @returns the indices of hypotheses recorded in @param checkpoint and their records.
+# A batch that was interrupted while being written is dropped from the file.
+def _read_checkpoint(checkpoint: Path, spec_hash: str):
+    lines = checkpoint.read_text().splitlines(keepends=True)
+    header = json.loads(lines[0]) if lines else None
+    if not header or header.get('spec') != spec_hash:
+        raise ValueError(f"The checkpoint {checkpoint} was written for a different spec; run without --resume to start over")
+
+    done, records = set(), []
+    complete = lines[:1]
+    for line in lines[1:]:
+        if not line.endswith('\n'):
+            break
+        entry = json.loads(line)
+        done.add(entry['hypothesis'])
+        records.extend(entry['records'])
+        complete.append(line)
+    if len(complete) < len(lines):
+        checkpoint.write_text(''.join(complete))
+    return done, records
+
+
+# Sets corrected_p_value on @param records, with the families of hypothesize_many
+# (see multipleComparisons.correct_result_data)
+def _correct(records: list, method: str):
+    for record in records:
+        record['corrected_p_value'] = None
+    if not method:
+        return
+
+    entries = [(r['test'], multipleComparisons.p_value_to_correct(r['adjusted_p_value'], r['p_value'])) for r in records]
+    for record, c in zip(records, multipleComparisons.correct_by_test(entries, method)):
+        record['corrected_p_value'] = c
+
+
+def _write_output(output: Path, records: list):
+    partial = output.with_name(output.name + '.partial')
+    if output.suffix.lower() == '.csv':
+        frame = pd.DataFrame(records)
+        for column in ['vars', 'prediction']:
+            if column in frame:
+                frame[column] = frame[column].map(json.dumps)
+        frame.to_csv(partial, index=False)
+    else:
+        with open(partial, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+    os.replace(partial, output)
+
+
+# Runs the hypotheses of @param spec_path, checkpointing after each batch
+# @returns the output records
+def run(spec_path: str, output: str, workers: int = None, processes: bool = False,
+        batch_size: int = default_batch_size, resume: bool = False, checkpoint: str = None):
+    spec = load_spec(spec_path)
+    spec_hash = _spec_hash(spec)
+    output = Path(output)
+    checkpoint = Path(checkpoint) if checkpoint else output.with_name(output.name + '.checkpoint')
+    correction = spec.get('correction', multipleComparisons.holm_name)
+
+    done, records = set(), []
+    if resume and checkpoint.exists():
+        done, records = _read_checkpoint(checkpoint, spec_hash)
+    else:
+        checkpoint.write_text(json.dumps({'spec': spec_hash}) + '\n')
+
+    hypotheses = []
+    for i, h in enumerate(spec['hypotheses']):
+        vars, prediction = (h['vars'], h.get('prediction')) if isinstance(h, dict) else (h, None)
+        if i not in done:
+            hypotheses.append((i, vars, prediction))
+
+    if hypotheses:
+        _define(spec, Path(spec_path).resolve().parent)
+    for start in range(0, len(hypotheses), batch_size):
+        batch = hypotheses[start:start + batch_size]
+        # Corrected once all batches have run
+        results = tea.hypothesize_many([(vars, prediction) for _, vars, prediction in batch],
+                                       correction=None, workers=workers, processes=processes)
+        with open(checkpoint, 'a') as f:
+            for (i, vars, prediction), res_data in zip(batch, results):
+                hypothesis_records = _records(i, vars, prediction, res_data)
+                f.write(json.dumps({'hypothesis': i, 'records': hypothesis_records}) + '\n')
+                records.extend(hypothesis_records)
+            f.flush()
+            os.fsync(f.fileno())
+
+    records.sort(key=lambda r: r['hypothesis'])
+    _correct(records, correction)
+    _write_output(output, records)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='tea', description='Run the hypotheses of a Tea analysis spec.')
+    parser.add_argument('spec', help='JSON or YAML analysis spec')
+    parser.add_argument('--output', '-o', required=True, help='results file: JSON lines, or CSV if it ends in .csv')
+    parser.add_argument('--workers', type=int, help='threads (or processes) that execute tests')
+    parser.add_argument('--processes', action='store_true', help='execute tests in worker processes')
+    parser.add_argument('--batch-size', type=int, default=default_batch_size,
+                        help=f"hypotheses per checkpointed batch (default: {default_batch_size})")
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <output>.checkpoint)')
+    parser.add_argument('--resume', action='store_true', help='skip hypotheses already in the checkpoint')
+    parser.add_argument('--log-level', default='warning', help="'debug', 'info', 'warning', 'error' or 'quiet'")
+    args = parser.parse_args(argv)
+
+    tea.configure_logging(level=args.log_level)
+    records = run(args.spec, args.output, args.workers, args.processes, args.batch_size, args.resume, args.checkpoint)
+    hypotheses = len({r['hypothesis'] for r in records})
+    print(f"Wrote {len(records)} results for {hypotheses} hypotheses to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from tea.ast import (   Node, Variable, Literal, 
+from tea.ast import (   Node, DataType, Variable, Literal, 
                         Equal, NotEqual, LessThan, 
                         LessThanEqual, GreaterThan, GreaterThanEqual,
                         Relate, PositiveRelationship
@@ -9,9 +9,12 @@ from tea.runtimeDataStructures.bivariateData import BivariateData
 from tea.runtimeDataStructures.multivariateData import MultivariateData
 from tea.runtimeDataStructures.resultData import ResultData
 from tea.helpers.evaluateHelperMethods import determine_study_type, assign_roles, add_paired_property, execute_test
-from tea.z3_solver.solver import synthesize_tests
+from tea.z3_solver.solver import synthesize_tests, property_cache
+from tea.helpers import profiler, processPool
 
 import attr
+import operator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from types import SimpleNamespace # allows for dot notation access for dictionaries
 from typing import Dict
@@ -36,306 +39,185 @@ def evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design:
         return VarData(metadata)
 
     elif isinstance(expr, Literal):
-        data = pd.Series([expr.value] * len(dataset.data), index=dataset.data.index) # Series filled with literal value
-        # metadata = None # metadata=None means literal
-        metadata = dict() # metadata=None means literal
+        # Kept as a scalar: comparisons broadcast it (see _evaluate_comparison)
+        metadata = dict() 
         metadata['var_name'] = '' # because not a var in the dataset 
         metadata['query'] = ''
         metadata['value'] = expr.value
-        return VarData(data, metadata)
-
-    elif isinstance(expr, Equal):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
-        
-        
-        dataframe = lhs.dataframe[lhs.dataframe == rhs.dataframe]
-        metadata = lhs.metadata
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = f" == \'{rhs.metadata['value']}\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" == {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-        
-        return VarData(metadata)
-
-    elif isinstance(expr, NotEqual): 
-        rhs = evaluate(dataset, expr.rhs)
-        lhs = evaluate(dataset, expr.lhs)
-        assert isinstance(rhs, VarData)
-        assert isinstance(lhs, VarData)
-        
-        dataframe = lhs.dataframe[lhs.dataframe != rhs.dataframe]
-        metadata = lhs.metadata
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " != \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" != {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
         return VarData(metadata)
 
-    elif isinstance(expr, LessThan):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
+    elif type(expr) in __comparison_operators__:
+        return _evaluate_comparison(dataset, expr, assumptions, design)
 
-        dataframe = None
-        metadata = rhs.metadata
-        
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Less Than')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None) 
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] < categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] < comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x < comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
+    elif isinstance(expr, Relate):
+        with profiler.profiling():
+            return _evaluate_relate(dataset, expr, assumptions, design)
 
-        else:
-            raise Exception(f"Invalid Less Than Operation:{lhs} < {rhs}")
-
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " < \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" < {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-        return VarData(metadata)
-
-    elif isinstance(expr, LessThanEqual):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
+    elif isinstance(expr, PositiveRelationship):
+        # get variables
+        vars = [expr.lhs.var, expr.rhs.var]
 
+        # create a Relate object
+        pos_relate_expr = Relate(vars)
+        return evaluate(dataset, pos_relate_expr, assumptions, design)
 
-        dataframe = None
-        metadata = rhs.metadata
+    # elif isinstance(expr, Relationship):
+    #     import pdb; pdb.set_trace()
         
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Less Than')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None)
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] <= categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] <= comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x <= comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
-
-        else:
-            raise Exception(f"Invalid Less Than Equal Operation:{lhs} <= {rhs}")
-
-
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " <= \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" <= {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-
-        return VarData(metadata)
-    
-    elif isinstance(expr, GreaterThan):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
-
+    # elif isinstance(expr, Mean):
+    #     var = evaluate(dataset, expr.var)
+    #     assert isinstance(var, VarData)
 
-        dataframe = None
-        metadata = rhs.metadata
-        
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Greater Than')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None) 
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] > categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] > comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x > comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
+    #     # bs.bootstrap(var.dataframe, stat_func=
+    #     # bs_stats.mean)
 
+    #     raise Exception('Not implemented Mean')
+
+
+__comparison_operators__ = {
+    Equal: '==',
+    NotEqual: '!=',
+    LessThan: '<',
+    LessThanEqual: '<=',
+    GreaterThan: '>',
+    GreaterThanEqual: '>=',
+}
+
+__ordering_functions__ = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+# Evaluates a filter on a variable (e.g., x < 5) to the VarData of the variable with a query.
+# The query compares the column with a constant or another column, so it is evaluated
+# vectorized, broadcasting the constant, without materializing it for each row.
+def _evaluate_comparison(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design: Dict[str, str]=None):
+    op = __comparison_operators__[type(expr)]
+    lhs = evaluate(dataset, expr.lhs, assumptions, design)
+    rhs = evaluate(dataset, expr.rhs, assumptions, design)
+    assert isinstance(lhs, VarData)
+    assert isinstance(rhs, VarData)
+
+    if not isinstance(expr.lhs, Variable):
+        raise ValueError('Malformed Relation. Filter on Variables must have variable as lhs')
+    column = f"`{lhs.metadata['var_name']}`"
+    ordering = op in __ordering_functions__
+
+    if isinstance(expr.rhs, Variable):
+        query = f"{column} {op} `{rhs.metadata['var_name']}`"
+    elif isinstance(expr.rhs, Literal):
+        comparison = rhs.metadata['value']
+        if ordering and lhs.metadata['dtype'] is DataType.NOMINAL:
+            raise ValueError(f"Cannot compare nominal values with {op}")
+        elif ordering and lhs.metadata['dtype'] is DataType.ORDINAL:
+            categories = lhs.metadata['categories'] # OrderedDict
+            if isinstance(comparison, str):
+                comparison = categories[comparison]
+            elif not np.issubdtype(type(comparison), np.integer):
+                raise ValueError(f"Cannot compare ORDINAL variables to {type(comparison)}")
+            # Categories are only ordered through categories, so select those that satisfy the comparison
+            selected = [c for c, rank in categories.items() if __ordering_functions__[op](rank, comparison)]
+            query = f"{column} in {selected!r}"
         else:
-            raise Exception(f"Invalid Greater Than Operation:{lhs} > {rhs}")
-
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " > \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" > {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-
-        return VarData(metadata) 
-   
-    elif isinstance(expr, GreaterThanEqual):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
-
-
-        dataframe = None
-        metadata = rhs.metadata
-        
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Greater Than Equal')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None) 
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] >= categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] >= comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x >= comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
+            query = f"{column} {op} {comparison!r}"
+    else:
+        raise ValueError(f"Not implemented for {rhs}")
 
-        else:
-            raise Exception(f"Invalid Greater Than Equal Operation:{lhs} >= {rhs}")
+    if lhs.metadata['query']:
+        query = f"({lhs.metadata['query']}) & ({query})"
+    return VarData({**lhs.metadata, 'query': query})
 
 
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " >= \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" >= {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-        return VarData(metadata) 
+# Evaluates a Relate node while a profile is active (see tea/helpers/profiler.py)
+def _evaluate_relate(dataset: Dataset, expr: Relate, assumptions: Dict[str, str], design: Dict[str, str]=None):
+    # Follow-ups reuse the group splits and verified properties of the hypothesis
+    with dataset.cached_selects(), property_cache():
+        combined_data, tests = _plan_relate(dataset, expr, assumptions, design)
 
-    elif isinstance(expr, Relate):    
-        vars = []
+        # Execute and store results from each valid test
+        res_data = ResultData(_execute_tests(dataset, design, expr.predictions, combined_data, tests), combined_data)
+        profiler.claim(res_data)
 
+        # There are multiple hypotheses to follow-up and correct for
+        if expr.predictions and len(expr.predictions) > 1: 
+            with profiler.stage(profiler.follow_up):
+                res_data.add_follow_up(_evaluate_follow_ups(dataset, (combined_data, tests), expr.predictions, assumptions, design))
+
+    return res_data
+
+
+# Evaluates the follow-up of each of @param predictions of the hypothesis planned as @param plan.
+# Predictions that compare the same categories share one plan; distinct follow-ups run concurrently.
+# @returns a ResultData for each prediction, in order
+def _evaluate_follow_ups(dataset: Dataset, plan: tuple, predictions: list, assumptions: Dict[str, str], design: Dict[str, str]=None,
+                         workers: int=None):
+    plans = {(): plan}
+    follow_ups = []
+    for pred in predictions:
+        key = _follow_up_key((), plan[0], pred)
+        if key not in plans:
+            plans[key] = _plan_follow_up(dataset, plan[0], key[-1], assumptions, design)
+        follow_ups.append((key, _predictions_key([pred])))
+
+    execute_tests = profiler.carry(_execute_tests)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for (key, predictions_key), pred in zip(follow_ups, predictions):
+            if (key, predictions_key) not in futures:
+                futures[(key, predictions_key)] = executor.submit(execute_tests, dataset, design, [pred], *plans[key])
+        results = {h: ResultData(f.result(), plans[h[0]][0]) for h, f in futures.items()}
+    return [results[h] for h in follow_ups]
+
+
+# @returns the variable and the two categories that @param prediction compares (e.g., condition:a < b),
+# or None if it does not compare two of the categories of an explanatory variable of @param combined_data
+def _compared_categories(combined_data, prediction):
+    pred = prediction[0] if isinstance(prediction, list) else prediction
+    lhs, rhs = getattr(pred, 'lhs', None), getattr(pred, 'rhs', None)
+    if not isinstance(lhs, Literal) or not isinstance(rhs, Literal):
+        return None
+    for v in combined_data.get_explanatory_variables():
+        var_categories = v.metadata['categories'] or {}
+        if len(var_categories) > 2 and lhs.value in var_categories and rhs.value in var_categories:
+            return (v.metadata['var_name'], frozenset([lhs.value, rhs.value]))
+    return None
+
+
+# A follow-up that compares two categories is a hypothesis on those categories only;
+# other follow-ups are tested with the plan of their hypothesis (@param plan_key)
+def _follow_up_key(plan_key: tuple, combined_data, prediction):
+    compared = _compared_categories(combined_data, prediction)
+    return plan_key if compared is None else plan_key + (compared,)
+
+
+# Plans the pairwise comparison of the categories in @param compared, reusing the roles of @param combined_data
+# @returns the CombinedData to analyze and the names of the tests to execute
+def _plan_follow_up(dataset: Dataset, combined_data, compared: tuple, assumptions: Dict[str, str], design: Dict[str, str]=None):
+    var_name, pair = compared
+    vars = []
+    for v in combined_data.vars:
+        if v.metadata['var_name'] == var_name:
+            pair_categories = type(v.metadata['categories'])((c, i) for c, i in v.metadata['categories'].items() if c in pair)
+            # Tests that model the whole variable (e.g., ANOVA) are restricted to the rows of the pair by the query
+            query = f"`{var_name}` in {list(pair_categories)!r}"
+            v = VarData({**v.metadata, 'categories': pair_categories, 'query': query}, role=v.role)
+        vars.append(v)
+
+    follow_up_data = type(combined_data)(vars, combined_data.study_type, alpha=combined_data.alpha)
+    with profiler.stage(profiler.property_verification, 'paired'):
+        follow_up_data = add_paired_property(dataset, follow_up_data, combined_data.study_type, design)
+    return follow_up_data, synthesize_tests(dataset, assumptions, follow_up_data)
+
+
+# Assigns roles, checks pairing and synthesizes the valid tests for @param expr
+# @returns the CombinedData to analyze and the names of the tests to execute
+def _plan_relate(dataset: Dataset, expr: Relate, assumptions: Dict[str, str], design: Dict[str, str]=None):
+    vars = []
+
+    with profiler.stage(profiler.role_assignment):
         for v in expr.vars: 
             eval_v = evaluate(dataset, v, design)    
             
@@ -350,95 +232,127 @@ def evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design:
 
         # Assign roles to variables we are analyzing
         vars = assign_roles(vars, study_type, design)
-        
-        combined_data = None
-        # Do we have a Bivariate analysis?
-        if len(vars) == 2: 
-            combined_data = BivariateData(vars, study_type, alpha=float(assumptions['alpha'])) 
-        else: # Do we have a Multivariate analysis?
-            combined_data = MultivariateData(vars, study_type, alpha=float(assumptions['alpha']))
-        
-        # Add paired property
-        add_paired_property(dataset, combined_data, study_type, design) # check sample sizes are identical
-
-        # Infer stats tests (mingled with)
-        tests = synthesize_tests(dataset, assumptions, combined_data)
-        
     
-        """"
-        # verify_properties(properties_and_tests)
-        # get_tests
-        # execute_tests
-        # interpret_tests_results
-        # print(tests)
-        for test in tests:
-            print("\nValid test: %s" % test.name)
-            print("Properties:")
-            properties = test.properties()
-            for prop in properties:
-                property_identifier = ""
-                if prop.scope == "test":
-                    property_identifier = test.name + ": " + prop.name
-                else:
-                    for var_indices in test.properties_for_vars[prop]:
-                        for var_index in var_indices:
-                            property_identifier += f"variable {test.test_vars[var_index].name} "
-                        property_identifier += ": %s" % prop.name
-                print(property_identifier)
-        """
-        
-        # Execute and store results from each valid test
-        results = {}
-        if len(tests) == 0: 
-            tests.append('bootstrap') # Default to bootstrap
-
-        for test in tests: 
-            test_result = execute_test(dataset, design, expr.predictions, combined_data, test)
-            results[test] = test_result
-        
-        
-        res_data = ResultData(results, combined_data)
-
-        follow_up = []
-
-        # There are multiple hypotheses to follow-up and correct for
-        if expr.predictions and len(expr.predictions) > 1: 
-            for pred in expr.predictions: 
-                # create follow-up expr Node (to evaluate recursively)
-                pred_res = evaluate(dataset, pred, assumptions, design)
-                follow_up.append(pred_res) # add follow-up result to follow_up
-        
-        res_data.add_follow_up(follow_up) # add follow-up results to the res_data object
-        """
-        # TODO: use a handle here to more generally/modularly support corrections, need a more generic data structure for this!
-        if expr.predictions:
-            preds = expr.predictions
-
-            # There are multiple comparisons
-            # if len(preds > 1): 
-            # FOR DEBUGGING: 
-            if len(preds) >= 1: 
-                correct_multiple_comparison(res_data,  len(preds))
-        """
-        # import pdb; pdb.set_trace()
-        return res_data
-
-    elif isinstance(expr, PositiveRelationship):
-        # get variables
-        vars = [expr.lhs.var, expr.rhs.var]
-
-        # create a Relate object
-        pos_relate_expr = Relate(vars)
-        return evaluate(dataset, pos_relate_expr, assumptions, design)
-
-    # elif isinstance(expr, Relationship):
-    #     import pdb; pdb.set_trace()
-        
-    # elif isinstance(expr, Mean):
-    #     var = evaluate(dataset, expr.var)
-    #     assert isinstance(var, VarData)
-
-    #     # bs.bootstrap(var.dataframe, stat_func=
-    #     # bs_stats.mean)
+    combined_data = None
+    # Do we have a Bivariate analysis?
+    if len(vars) == 2: 
+        combined_data = BivariateData(vars, study_type, alpha=float(assumptions['alpha'])) 
+    else: # Do we have a Multivariate analysis?
+        combined_data = MultivariateData(vars, study_type, alpha=float(assumptions['alpha']))
+    
+    # Add paired property
+    with profiler.stage(profiler.property_verification, 'paired'):
+        combined_data = add_paired_property(dataset, combined_data, study_type, design) # check sample sizes are identical
 
-    #     raise Exception('Not implemented Mean')
\ No newline at end of file
+    # Infer stats tests (mingled with)
+    tests = synthesize_tests(dataset, assumptions, combined_data)
+    
+    
+    """"
+    # verify_properties(properties_and_tests)
+    # get_tests
+    # execute_tests
+    # interpret_tests_results
+    # print(tests)
+    for test in tests:
+        print("\nValid test: %s" % test.name)
+        print("Properties:")
+        properties = test.properties()
+        for prop in properties:
+            property_identifier = ""
+            if prop.scope == "test":
+                property_identifier = test.name + ": " + prop.name
+            else:
+                for var_indices in test.properties_for_vars[prop]:
+                    for var_index in var_indices:
+                        property_identifier += f"variable {test.test_vars[var_index].name} "
+                    property_identifier += ": %s" % prop.name
+            print(property_identifier)
+    """
+
+    return combined_data, tests
+
+
+# @returns the result of each of @param tests (default: bootstrap) on @param combined_data
+def _execute_tests(dataset: Dataset, design: Dict[str, str], predictions: list, combined_data, tests: list):
+    results = {}
+    for test in (tests or ['bootstrap']): # Default to bootstrap
+        results[test] = execute_test(dataset, design, predictions, combined_data, test)
+    return results
+
+
+# Hypotheses on the same variables share one plan
+def _plan_key(expr: Relate):
+    return tuple(v.name for v in expr.vars)
+
+
+def _predictions_key(predictions: list):
+    if not predictions:
+        return ()
+    return tuple(tuple(p) if isinstance(p, list) else p for p in predictions)
+
+
+# Evaluates a batch of Relate nodes that share @param dataset, @param assumptions and @param design.
+# Work is shared across the batch: each distinct set of variables is planned
+# (roles, properties, test synthesis) once, verified properties and group
+# splits are reused, and identical hypotheses are executed once.
+# Planning is serial because the solver keeps global state; tests then run on
+# @param workers threads, or with @param processes on @param workers processes
+# that share the data (see processPool). Tests run in other processes are not
+# profiled stage by stage.
+# Hypotheses with several predictions get one follow-up result per prediction
+# (see _follow_up_key).
+# @returns a ResultData for each of @param exprs, in order, sharing the batch profile
+def evaluate_many(dataset: Dataset, exprs: list, assumptions: Dict[str, str], design: Dict[str, str]=None, workers: int=None,
+                  processes: bool=False):
+    with profiler.profiling() as profile, dataset.cached_selects(), property_cache():
+        plans = {}
+        for expr in exprs:
+            key = _plan_key(expr)
+            if key not in plans:
+                plans[key] = _plan_relate(dataset, expr, assumptions, design)
+
+        # Each hypothesis is a plan and the predictions to test
+        hypotheses = {}
+        for expr in exprs:
+            key = _plan_key(expr)
+            hypotheses[(key, _predictions_key(expr.predictions))] = (key, expr.predictions)
+            if expr.predictions and len(expr.predictions) > 1:
+                for pred in expr.predictions:
+                    follow_up_key = _follow_up_key(key, plans[key][0], pred)
+                    if follow_up_key not in plans:
+                        plans[follow_up_key] = _plan_follow_up(dataset, plans[key][0], follow_up_key[-1], assumptions, design)
+                    hypotheses[(follow_up_key, _predictions_key([pred]))] = (follow_up_key, [pred])
+
+        def run_hypothesis(plan_key, predictions):
+            combined_data, tests = plans[plan_key]
+            return ResultData(_execute_tests(dataset, design, predictions, combined_data, tests), combined_data)
+
+        if processes:
+            with profiler.stage(profiler.test_execution), processPool.shared(dataset) as shared_dataset:
+                futures = {}
+                for h, (plan_key, predictions) in hypotheses.items():
+                    combined_data, tests = plans[plan_key]
+                    futures[h] = processPool.submit(shared_dataset, _execute_tests, design, predictions, combined_data, tests,
+                                                    workers=workers)
+                results = {h: ResultData(f.result(), plans[hypotheses[h][0]][0]) for h, f in futures.items()}
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                run = profiler.carry(run_hypothesis)
+                futures = {h: executor.submit(run, *args) for h, args in hypotheses.items()}
+                results = {h: f.result() for h, f in futures.items()}
+
+    profile.claimed = True
+    batch_results = []
+    for expr in exprs:
+        key = _plan_key(expr)
+        res_data = results[(key, _predictions_key(expr.predictions))]
+        if expr.predictions and len(expr.predictions) > 1:
+            res_data.add_follow_up([results[(_follow_up_key(key, plans[key][0], pred), _predictions_key([pred]))]
+                                    for pred in expr.predictions])
+        batch_results.append(res_data)
+
+    for res_data in results.values():
+        res_data.profile = profile
+
+    return batch_results
@@ -47,15 +47,8 @@ assumptions_to_properties = {
 # MODE = 'strict' #can be 'strict' or 'relaxed'
 
 # LOGGING
-# TODO: This shoudl eventually write out to a file somewhere.
-def log(message: str):
-    print(message)
-    # pass
-
-
-def log_debug(message: str):
-    print(message)
-    # pass
+# See tea/helpers/logger.py. Messages are formatted lazily, only when their level is enabled.
+from tea.helpers.logger import log, log_debug, log_warning, log_error
 
 # Test names.
 pearson_name = "Pearson Correlation"
@@ -0,0 +1,134 @@
+# In-memory column store behind Dataset.data.
+# - Nominal and ordinal columns are dictionary-encoded: each value is stored as a
+#   small integer code into the column's dictionary of values (the declared
+#   categories, in their declared order for ordinals, followed by any other values
+#   found in the data). They are kept as pandas Categoricals sharing the codes, so
+#   comparisons, grouping and filters work on integers rather than strings.
+# - Integer columns are stored at the narrowest integer type that holds their values.
+#   Float columns stay float64: narrowing them would lose precision in the statistics.
+# ColumnStore exposes the code arrays for grouping (group splits, contingency
+# tables, ranks) and builds bitmap (boolean mask) filters from the dictionary.
+
+import attr
+import numpy as np
+import pandas as pd
+
+from tea.ast import DataType
+
+_integer_types = [np.int8, np.int16, np.int32, np.int64]
+
+
+# @returns the narrowest integer type holding codes into a dictionary of @param size values (and -1)
+def code_type(size: int):
+    return narrowest_integer(-1, size - 1)
+
+
+# @returns the narrowest integer type holding the values from @param low to @param high
+def narrowest_integer(low, high):
+    for integer_type in _integer_types:
+        info = np.iinfo(integer_type)
+        if info.min <= low and high <= info.max:
+            return integer_type
+    return np.int64
+
+
+def _ordinal(var):
+    return var.dtype is DataType.ORDINAL
+
+
+def _categorical(var):
+    return var.dtype is DataType.NOMINAL or var.dtype is DataType.ORDINAL
+
+
+# @returns @param values dictionary-encoded, with the @param categories first in the dictionary
+def encode_column(values: pd.Series, categories: list = None, ordered: bool = False):
+    categories = list(categories) if categories else []
+    codes, uniques = pd.factorize(values)
+    dictionary = pd.Index(categories)
+    others = uniques[~pd.Index(uniques).isin(dictionary)]
+    if len(others):
+        dictionary = dictionary.append(pd.Index(others))
+    # Map the codes of the values (in order of appearance) to their place in the dictionary
+    remap = np.append(dictionary.get_indexer(uniques), -1).astype(code_type(len(dictionary)))
+    return pd.Series(pd.Categorical.from_codes(remap[codes], dictionary, ordered=ordered),
+                     index=values.index, name=values.name)
+
+
+# @returns @param values at the narrowest integer type holding them, if they are integers
+def narrow_column(values: pd.Series):
+    if not pd.api.types.is_integer_dtype(values) or not len(values):
+        return values
+    return values.astype(narrowest_integer(values.min(), values.max()), copy=False)
+
+
+# @returns @param data with the columns of @param variables encoded (see the top of this file)
+def encode(data: pd.DataFrame, variables: list):
+    encoded = {}
+    for var in variables:
+        if var.name not in data.columns:
+            continue
+        values = data[var.name]
+        if _categorical(var):
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                encoded[var.name] = encode_column(values, var.categories, _ordinal(var))
+        else:
+            encoded[var.name] = narrow_column(values)
+    return data.assign(**encoded) if encoded else data
+
+
+@attr.s(init=True, frozen=True, slots=True)
+class Column(object):
+    codes = attr.ib(repr=False)  # np.ndarray of codes into the dictionary (-1 for missing)
+    dictionary = attr.ib()  # pd.Index of the values
+
+    # @returns the codes of the values in @param values (-1 for those not in the dictionary)
+    def lookup(self, values: list):
+        return self.dictionary.get_indexer(pd.Index(list(values)))
+
+    # @returns the bitmap of the rows whose value is among @param values
+    def mask(self, values: list):
+        selected = np.zeros(len(self.dictionary) + 1, dtype=bool)  # the last entry is for code -1
+        codes = self.lookup(values)
+        selected[codes[codes >= 0]] = True
+        return selected[self.codes]
+
+    # @returns the codes of the rows in the order of @param categories (-1 for other values)
+    def recode(self, categories: list):
+        remap = np.full(len(self.dictionary) + 1, -1, dtype=np.int64)  # the last entry is for code -1
+        codes = self.lookup(categories)
+        found = codes >= 0
+        remap[codes[found]] = np.flatnonzero(found)
+        return remap[self.codes]
+
+
+@attr.s(init=True, frozen=True)
+class ColumnStore(object):
+    dataset = attr.ib(repr=False)
+    columns = attr.ib(factory=dict, repr=False)  # name -> Column, encoded on first use
+
+    # @returns the dictionary-encoded Column of @param name
+    def column(self, name: str):
+        if name not in self.columns:
+            values = self.dataset.data[name]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = encode_column(values)
+            self.columns[name] = Column(np.asarray(values.cat.codes), values.cat.categories)
+        return self.columns[name]
+
+    def codes(self, name: str):
+        return self.column(name).codes
+
+    def dictionary(self, name: str):
+        return self.column(name).dictionary
+
+    # @returns the number of bytes of the data of @param dataset
+    def nbytes(self):
+        return int(self.dataset.data.memory_usage(index=False, deep=True).sum())
+
+
+# @returns the ColumnStore of @param dataset (cached on the dataset)
+def store(dataset):
+    key = ('column store',)
+    if key not in dataset.cache:
+        dataset.cache[key] = ColumnStore(dataset)
+    return dataset.cache[key]
@@ -0,0 +1,187 @@
+# Contingency tables of two categorical variables.
+# A table is counted in one np.bincount pass over category codes and cached on
+# the Dataset, so frequency checks, chi-square and Fisher's exact test share it.
+# Tables with many cells (high-cardinality nominals) are kept as scipy.sparse
+# matrices; chi-square and G statistics only visit the non-zero cells.
+# Fisher's exact test for r x c tables is estimated by Monte Carlo simulation
+# of tables with the observed margins.
+
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import processPool
+
+import attr
+import numpy as np
+from scipy import sparse, stats
+from scipy.special import gammaln
+
+# Keep tables with more cells than this sparse
+sparse_cells = 1 << 16
+
+# Monte Carlo Fisher's exact test
+fisher_simulations = 10000
+fisher_seed = 0
+fisher_chunk_size = 1000  # simulated tables per task; fixed so results do not depend on the number of workers
+# Processes simulating tables in parallel. Opt-in: the pool starts processes with 'spawn',
+# which re-imports the calling script (it needs an `if __name__ == '__main__'` guard)
+fisher_workers = 1
+fisher_parallel_cells = 1 << 20  # simulated cells (tables x cells per table) from which to simulate in parallel
+
+pearson_name = 'pearson'
+log_likelihood_name = 'log-likelihood'  # G-test
+
+
+@attr.s(init=True, eq=False)
+class ContingencyTable(object):
+    counts = attr.ib()  # rows (x categories) x columns (y categories); ndarray, or CSR matrix when large
+    x_categories = attr.ib(type=list)
+    y_categories = attr.ib(type=list)
+
+    @property
+    def is_sparse(self):
+        return sparse.issparse(self.counts)
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    @property
+    def row_sums(self):
+        return np.asarray(self.counts.sum(axis=1)).ravel()
+
+    @property
+    def col_sums(self):
+        return np.asarray(self.counts.sum(axis=0)).ravel()
+
+    def dense(self):
+        return self.counts.toarray() if self.is_sparse else self.counts
+
+    def min_count(self):
+        if self.is_sparse and self.counts.nnz < np.prod(self.shape):
+            return 0
+        return int(self.counts.data.min() if self.is_sparse else self.counts.min())
+
+
+# @returns the ContingencyTable of @param x_name by @param y_name over the given categories
+def table(dataset: Dataset, x_name: str, y_name: str, x_categories: list, y_categories: list):
+    key = ('contingency', x_name, y_name, tuple(x_categories), tuple(y_categories))
+    if key not in dataset.cache:
+        x_codes = dataset.column_store.column(x_name).recode(x_categories)
+        y_codes = dataset.column_store.column(y_name).recode(y_categories)
+        keep = (x_codes >= 0) & (y_codes >= 0)
+        x_codes = x_codes[keep]
+        y_codes = y_codes[keep]
+        # Each row counts as many observations as its frequency weight
+        weights = dataset.weights
+        weights = np.ones(len(x_codes), dtype=np.int64) if weights is None else weights[keep]
+
+        shape = (len(x_categories), len(y_categories))
+        if shape[0] * shape[1] > sparse_cells:
+            counts = sparse.csr_matrix((weights, (x_codes, y_codes)), shape=shape)
+            counts.sum_duplicates()
+        else:
+            counts = np.bincount(x_codes * shape[1] + y_codes, weights=weights, minlength=shape[0] * shape[1])
+            counts = counts.astype(np.int64).reshape(shape)
+        dataset.cache[key] = ContingencyTable(counts, list(x_categories), list(y_categories))
+    return dataset.cache[key]
+
+
+# Chi-square test of independence (Pearson's, or the G-test with @param statistic='log-likelihood').
+# Rows and columns without any observations are left out.
+# @returns the statistic, p-value and degrees of freedom
+def chi_square(contingency_table: ContingencyTable, statistic: str = pearson_name):
+    row_sums = contingency_table.row_sums
+    col_sums = contingency_table.col_sums
+    n = float(row_sums.sum())
+    dof = (np.count_nonzero(row_sums) - 1) * (np.count_nonzero(col_sums) - 1)
+
+    # Observed counts and expected counts of the non-zero cells
+    if contingency_table.is_sparse:
+        coo = contingency_table.counts.tocoo()
+        rows, cols, observed = coo.row, coo.col, coo.data.astype(float)
+    else:
+        rows, cols = np.nonzero(contingency_table.counts)
+        observed = contingency_table.counts[rows, cols].astype(float)
+    expected = row_sums[rows] * col_sums[cols] / n
+
+    if statistic == pearson_name:
+        # sum (O - E)^2 / E = sum O^2 / E - n, and only non-zero O contribute to the first sum
+        value = np.sum(observed * observed / expected) - n
+    elif statistic == log_likelihood_name:
+        value = 2.0 * np.sum(observed * np.log(observed / expected))
+    else:
+        raise ValueError(f"Unknown chi-square statistic: {statistic}. Expected '{pearson_name}' or '{log_likelihood_name}'")
+
+    return value, stats.chi2.sf(value, dof), dof
+
+
+# -log of the probability of each table given its margins, up to a constant (the sum of log(count!))
+def _log_factorial_sum(tables):
+    return gammaln(tables + 1.0).sum(axis=(-2, -1))
+
+
+# Simulates @param size tables with the given margins (Patefield's setting: every
+# r x c table with these margins, weighted by its probability under independence).
+# Each table is filled row by row, drawing each cell from the hypergeometric
+# distribution of the remaining column totals.
+# @returns the _log_factorial_sum of each simulated table
+def _simulate(row_sums, col_sums, size, seed):
+    rng = np.random.default_rng(seed)
+    num_rows, num_cols = len(row_sums), len(col_sums)
+    col_left = np.tile(np.asarray(col_sums, dtype=np.int64), (size, 1))
+    statistic = np.zeros(size)
+
+    for i in range(num_rows - 1):
+        row_left = np.full(size, row_sums[i], dtype=np.int64)
+        total_left = col_left.sum(axis=1)
+        for j in range(num_cols - 1):
+            total_left = total_left - col_left[:, j]
+            cell = rng.hypergeometric(col_left[:, j], total_left, row_left) if row_sums[i] > 0 else np.zeros(size, dtype=np.int64)
+            statistic += gammaln(cell + 1.0)
+            col_left[:, j] -= cell
+            row_left -= cell
+        statistic += gammaln(row_left + 1.0)
+        col_left[:, num_cols - 1] -= row_left
+
+    # The last row takes what is left in each column
+    statistic += gammaln(col_left + 1.0).sum(axis=1)
+    return statistic
+
+
+# Fisher's exact test of independence for an r x c table, estimated from
+# @param simulations tables with the same margins.
+# @param seed makes the estimate reproducible; with @param workers (default: fisher_workers) > 1,
+# large simulations (see fisher_parallel_cells) run in the processPool pool, unless this
+# process is already a pool worker
+# @returns -log of the probability of the observed table given its margins and the
+# estimated p-value, (1 + #{simulated tables at most as likely}) / (1 + simulations)
+def fisher_monte_carlo(contingency_table: ContingencyTable, simulations: int = None, seed: int = None, workers: int = None):
+    simulations = fisher_simulations if simulations is None else simulations
+    seed = fisher_seed if seed is None else seed
+
+    observed = contingency_table.dense()
+    observed = observed[contingency_table.row_sums > 0][:, contingency_table.col_sums > 0]
+    row_sums = observed.sum(axis=1)
+    col_sums = observed.sum(axis=0)
+    observed_statistic = _log_factorial_sum(observed.astype(float))
+
+    sizes = [min(fisher_chunk_size, simulations - start) for start in range(0, simulations, fisher_chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers if workers else fisher_workers
+    if workers > 1 and len(sizes) > 1 and simulations * observed.size >= fisher_parallel_cells \
+            and not processPool.in_worker():
+        executor = processPool.running_pool(workers)
+        chunks = list(executor.map(_simulate, [row_sums] * len(sizes), [col_sums] * len(sizes), sizes, seeds))
+    else:
+        chunks = [_simulate(row_sums, col_sums, size, s) for size, s in zip(sizes, seeds)]
+    simulated = np.concatenate(chunks) if chunks else np.array([])
+
+    # Tables at most as likely as the observed one have a larger sum of log(count!);
+    # the tolerance keeps tables that are equally likely up to rounding
+    as_extreme = np.count_nonzero(simulated >= observed_statistic * (1 - 1e-7))
+    n = row_sums.sum()
+    neg_log_probability = observed_statistic + gammaln(n + 1.0) - gammaln(row_sums + 1.0).sum() - gammaln(col_sums + 1.0).sum()
+    return float(neg_log_probability), (1 + as_extreme) / (1 + simulations)
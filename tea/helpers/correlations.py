@@ -0,0 +1,217 @@
+# Correlations computed over a dataset one chunk of rows at a time, in memory
+# bounded by the chunk size rather than the number of rows.
+# Pearson's r is exact: the co-moments of each chunk are merged into running
+# totals (Chan et al.'s pairwise update).
+# Spearman's rho ranks each variable exactly from running counts of its distinct
+# values while it has at most sketch_size of them, and otherwise from a uniform
+# sample of sketch_size rows. Kendall's tau is computed on that sample.
+# Approximate results come with a bound on their error that holds with
+# probability `confidence`; exact results have an error of 0.
+
+import attr
+import numpy as np
+from scipy import stats
+
+sketch_size = 1 << 20  # distinct values counted, and rows sampled, per variable
+sketch_seed = 0
+value_counts_buffer = 1 << 16  # distinct values of chunks buffered before merging them into the counts
+confidence = 0.95
+
+
+@attr.s(init=True, eq=False)
+class Comoments(object):
+    n = attr.ib(default=0)
+    mean_x = attr.ib(default=0.0)
+    mean_y = attr.ib(default=0.0)
+    m2_x = attr.ib(default=0.0)  # sum of squared deviations from the mean
+    m2_y = attr.ib(default=0.0)
+    c_xy = attr.ib(default=0.0)  # sum of products of deviations
+
+    def update(self, x: np.ndarray, y: np.ndarray):
+        n = len(x)
+        if n == 0:
+            return
+        mean_x, mean_y = x.mean(), y.mean()
+        dx, dy = x - mean_x, y - mean_y
+
+        total = self.n + n
+        delta_x, delta_y = mean_x - self.mean_x, mean_y - self.mean_y
+        scale = self.n * n / total
+        self.m2_x += dx @ dx + delta_x * delta_x * scale
+        self.m2_y += dy @ dy + delta_y * delta_y * scale
+        self.c_xy += dx @ dy + delta_x * delta_y * scale
+        self.mean_x += delta_x * n / total
+        self.mean_y += delta_y * n / total
+        self.n = total
+
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return float(np.clip(self.c_xy / np.sqrt(self.m2_x * self.m2_y), -1.0, 1.0))
+
+
+# Counts of each distinct value of a variable, or None once there are more than sketch_size
+# The counts of each chunk are buffered and merged once the buffer is as large as the
+# counts so far (and value_counts_buffer), so each value is merged O(log distinct) times.
+@attr.s(init=True, eq=False)
+class ValueCounts(object):
+    limit = attr.ib()
+    values = attr.ib(factory=lambda: np.empty(0))  # sorted
+    counts = attr.ib(factory=lambda: np.empty(0, dtype=np.int64))
+    n = attr.ib(default=0)
+    pending = attr.ib(factory=list, repr=False)  # (values, counts) of the chunks not merged yet
+    pending_size = attr.ib(default=0, repr=False)
+    midpoints = attr.ib(default=None, repr=False)  # normalized ranks of the values, once counted
+
+    @property
+    def exact(self):
+        self._merge()
+        return self.values is not None
+
+    def update(self, x: np.ndarray):
+        self.n += len(x)
+        if self.values is None:
+            return
+        values, counts = np.unique(x, return_counts=True)
+        self.pending.append((values, counts))
+        self.pending_size += len(values)
+        if self.pending_size >= max(len(self.values), value_counts_buffer):
+            self._merge()
+
+    def _merge(self):
+        if not self.pending:
+            return
+        pending, self.pending, self.pending_size = self.pending, [], 0
+        self.midpoints = None
+        if self.values is None:
+            return
+        values, inverse = np.unique(np.concatenate([self.values] + [v for v, _ in pending]), return_inverse=True)
+        if len(values) > self.limit:
+            self.values = self.counts = None
+            return
+        weights = np.concatenate([self.counts] + [c for _, c in pending])
+        self.counts = np.bincount(inverse, weights=weights, minlength=len(values)).astype(np.int64)
+        self.values = values
+
+    # (midrank - 1/2) / n of each of @param x, in (0, 1)
+    def normalized_ranks(self, x: np.ndarray):
+        self._merge()
+        if self.midpoints is None:
+            self.midpoints = (np.cumsum(self.counts) - self.counts / 2.0) / self.n
+        return self.midpoints[np.searchsorted(self.values, x)]
+
+    # Variance of the normalized ranks of all values, with the correction for ties
+    def variance(self):
+        self._merge()
+        counts = self.counts.astype(float)
+        return (self.n ** 2 - 1) / (12.0 * self.n ** 2) - np.sum(counts ** 3 - counts) / (12.0 * self.n ** 3)
+
+
+# A uniform sample (without replacement) of at most @param size (x, y) rows:
+# the rows with the smallest random keys
+@attr.s(init=True, eq=False)
+class PairSample(object):
+    size = attr.ib()
+    rng = attr.ib()
+    x = attr.ib(factory=lambda: np.empty(0))
+    y = attr.ib(factory=lambda: np.empty(0))
+    keys = attr.ib(factory=lambda: np.empty(0))
+    n = attr.ib(default=0)  # rows seen
+
+    @property
+    def complete(self):
+        return self.n == len(self.keys)
+
+    def update(self, x: np.ndarray, y: np.ndarray):
+        self.n += len(x)
+        self.x = np.concatenate([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        self.keys = np.concatenate([self.keys, self.rng.random(len(x))])
+        if len(self.keys) > self.size:
+            keep = np.argpartition(self.keys, self.size)[:self.size]
+            self.x, self.y, self.keys = self.x[keep], self.y[keep], self.keys[keep]
+
+    # Estimated (midrank - 1/2) / n of each of @param x among all rows of @param axis (0 for x, 1 for y)
+    def normalized_ranks(self, axis: int, x: np.ndarray):
+        sample = np.sort(self.y if axis else self.x)
+        below = np.searchsorted(sample, x, side='left')
+        at_or_below = np.searchsorted(sample, x, side='right')
+        return (below + at_or_below) / (2.0 * len(sample))
+
+    # Bound on the error of every estimated normalized rank (Dvoretzky-Kiefer-Wolfowitz)
+    def rank_error(self):
+        return np.sqrt(np.log(2.0 / (1.0 - confidence)) / (2.0 * len(self.keys)))
+
+
+# Two-sided p-value of a correlation @param r of @param n rows (t distribution with n - 2 dof)
+def _p_value(r: float, n: int):
+    dof = n - 2
+    if abs(r) == 1.0:
+        return 0.0
+    t = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+    return float(2 * stats.t.sf(abs(t), dof))
+
+
+# @param get_chunks starts a pass over the data, yielding (x, y) arrays
+# @returns Pearson's r and its p-value
+def pearson(get_chunks):
+    moments = Comoments()
+    for x, y in get_chunks():
+        moments.update(x, y)
+    r = moments.correlation()
+    return r, _p_value(r, moments.n)
+
+
+# Spearman's rho in two passes over @param get_chunks: the first counts values
+# (or samples rows), the second correlates the normalized ranks.
+# @returns rho, its p-value and the bound on the error of rho, or None if the data has NaNs
+def spearman(get_chunks, size: int = None, seed: int = None):
+    size = sketch_size if size is None else size
+    counts = [ValueCounts(size), ValueCounts(size)]
+    sample = PairSample(size, np.random.default_rng(sketch_seed if seed is None else seed))
+    for x, y in get_chunks():
+        if np.isnan(x).any() or np.isnan(y).any():
+            return None
+        counts[0].update(x)
+        counts[1].update(y)
+        sample.update(x, y)
+
+    n = sample.n
+    error = [0.0 if c.exact else sample.rank_error() for c in counts]
+    # Normalized ranks have mean 1/2; without ties, variance (n^2 - 1) / (12 n^2)
+    variance = [c.variance() if c.exact else (n ** 2 - 1) / (12.0 * n ** 2) for c in counts]
+
+    def normalized_ranks(axis, x):
+        return counts[axis].normalized_ranks(x) if counts[axis].exact else sample.normalized_ranks(axis, x)
+
+    total = 0.0
+    for x, y in get_chunks():
+        total += (normalized_ranks(0, x) - 0.5) @ (normalized_ranks(1, y) - 0.5)
+
+    scale = np.sqrt(variance[0] * variance[1])
+    rho = float(np.clip(total / n / scale, -1.0, 1.0))
+    # |u'v' - uv| <= |u' - u||v'| + |u||v' - v| for ranks centered at 1/2 (so |u|, |v| <= 1/2)
+    bound = (error[0] / 2 + error[1] / 2 + error[0] * error[1]) / scale
+    return rho, _p_value(rho, n), float(bound)
+
+
+# Kendall's tau-b over @param get_chunks, exact if there are at most @param size rows
+# and otherwise estimated from a uniform sample of them
+# @returns tau, its p-value and the bound on the error of tau, or None if the data has NaNs
+def kendall(get_chunks, size: int = None, seed: int = None):
+    size = sketch_size if size is None else size
+    sample = PairSample(size, np.random.default_rng(sketch_seed if seed is None else seed))
+    for x, y in get_chunks():
+        if np.isnan(x).any() or np.isnan(y).any():
+            return None
+        sample.update(x, y)
+
+    tau, p_value = stats.kendalltau(sample.x, sample.y)
+    if sample.complete:
+        return float(tau), float(p_value), 0.0
+
+    # Normal approximation of the null distribution for all n rows
+    n = sample.n
+    z = 3 * tau * np.sqrt(n * (n - 1)) / np.sqrt(2 * (2 * n + 5))
+    # Hoeffding's bound for a U-statistic of degree 2 with a kernel in [-1, 1]
+    bound = np.sqrt(2 * np.log(2.0 / (1.0 - confidence)) / (len(sample.keys) // 2))
+    return float(tau), float(2 * stats.norm.sf(abs(z))), float(bound)
@@ -7,6 +7,7 @@ from tea.runtimeDataStructures.combinedData import CombinedData
 from tea.runtimeDataStructures.bivariateData import BivariateData
 from tea.runtimeDataStructures.multivariateData import MultivariateData
 from tea.runtimeDataStructures.testResult import TestResult
+from tea.helpers import profiler, linearModels, repeatedMeasures, ranks, contingency, summaryStatistics, correlations
 
 # Stats
 from statistics import mean, stdev
@@ -17,6 +18,7 @@ import statsmodels.api as sm
 import statsmodels.formula.api as smf
 from statsmodels.formula.api import ols
 
+import numpy as np
 import pandas as pd
 from statsmodels.stats.anova import AnovaRM
 import bootstrapped.bootstrap as bs
@@ -28,7 +30,7 @@ from typing import Any, Dict, List
 from types import SimpleNamespace # allows for dot notation access for dictionaries
 from collections import namedtuple
 from enum import Enum
-import copy
+import itertools
 
 
 def determine_study_type(vars_data: list, design: Dict[str, str]):
@@ -58,60 +60,60 @@ def determine_study_type(vars_data: list, design: Dict[str, str]):
 
 # @returns list of VarData objects with same info as @param vars but with one updated role characteristic
 def assign_roles(vars_data: list, study_type: str, design: Dict[str, str]):
-    vars = copy.deepcopy(vars_data)
-
     if study_type == experiment_identifier:
         ivs = design[iv_identifier] if isinstance(design[iv_identifier], list) else [design[iv_identifier]]
         dvs = design[dv_identifier] if isinstance(design[dv_identifier], list) else [design[dv_identifier]]
 
-        for v in vars:
+        def role_of(v):
             if v.metadata[name] in ivs:
-                setattr(v, 'role', iv_identifier)
+                return iv_identifier
             elif v.metadata[name] in dvs:
-                setattr(v, 'role', dv_identifier)
+                return dv_identifier
             else:
-                setattr(v, 'role', null_identifier) #  may need to be the covariates
+                return null_identifier #  may need to be the covariates
     elif study_type == observational_identifier:
         contributors = design[contributor_identifier] if isinstance(design[contributor_identifier], list) else [design[contributor_identifier]]
         outcomes = design[outcome_identifier] if isinstance(design[outcome_identifier], list) else [design[outcome_identifier]]
 
-        for v in vars:
+        def role_of(v):
             if v.metadata[name] in contributors:
-                setattr(v, 'role', contributor_identifier)
+                return contributor_identifier
             elif v.metadata[name] in outcomes:
-                setattr(v, 'role', outcome_identifier)
+                return outcome_identifier
             else:
-                setattr(v, 'role', null_identifier) #  may need to change
+                return null_identifier #  may need to change
 
             # We don't know what kind of study this is.
     else:
         raise ValueError(f"Type of study is not supported:{design[study_type_identifier]}. Is it an experiment or an observational study?")
 
-    return vars
+    return [v.with_role(role_of(v)) for v in vars_data]
 
 
 # Helper methods for Interpreter (in evaluate.py)
 # Compute properties about the VarData objects in @param vars using data in @param dataset
+# @returns new VarData objects with the properties
 def compute_data_properties(dataset, vars_data: list):
-    vars = copy.deepcopy(vars_data)
+    vars = []
 
-    for v in vars:
-        v.properties[sample_size] = len(dataset.select(v.metadata[name]))
+    for v in vars_data:
+        properties = {sample_size: len(dataset.select(v.metadata[name]))}
         if v.is_continuous():
-            v.properties[distribution] = compute_distribution(dataset.select(v.metadata[name]))
-            v.properties[variance] = compute_variance(dataset.select(v.metadata[name]))
+            properties[distribution] = compute_distribution(dataset.select(v.metadata[name]))
+            properties[variance] = compute_variance(dataset.select(v.metadata[name]))
         elif v.is_categorical():
-            v.properties[num_categories] = len(v.metadata[categories])
+            properties[num_categories] = len(v.metadata[categories])
 
             # For each group (where DV is continuous) is the data normal?
 
         else:
             raise ValueError (f"Not supported data type: {v.metadata[data_type]}")
+        vars.append(v.with_properties(properties))
 
     return vars
 
 
-# Add equal variance property to @param combined_data
+# @returns @param combined_data with the equal variance property
 def add_eq_variance_property(dataset, combined_data: CombinedData, study_type: str):
     xs = None
     ys = None
@@ -136,7 +138,7 @@ def add_eq_variance_property(dataset, combined_data: CombinedData, study_type: s
         if y.is_continuous():
             cont_ys.append(y)
 
-    combined_data.properties[eq_variance] = None
+    properties = {eq_variance: None}
 
     if cat_xs and cont_ys:
         for y in ys:
@@ -148,20 +150,23 @@ def add_eq_variance_property(dataset, combined_data: CombinedData, study_type: s
                 if isinstance(combined_data, BivariateData):
                     # Equal variance
                     eq_var = compute_eq_variance(grouped_data)
-                    combined_data.properties[eq_variance] = eq_var
+                    properties[eq_variance] = eq_var
                 elif isinstance(combined_data, MultivariateData):
-                    combined_data.properties[eq_variance + '::' + x.metadata[name] + ':' + y.metadata[name]] = compute_eq_variance(grouped_data)
+                    properties[eq_variance + '::' + x.metadata[name] + ':' + y.metadata[name]] = compute_eq_variance(grouped_data)
                 else:
                     raise ValueError(f"combined_data_data object is neither BivariateData nor MultivariateData: {type(combined_data)}")
 
+    return combined_data.with_properties(properties)
+
 
 # Independent vs. Paired?
+# @returns @param combined_data with the paired property
 def add_paired_property(dataset, combined_data: CombinedData, study_type: str, design: Dict[str, str]=None): # check same sizes are identical
     global paired
 
     x = None
     y = None
-    combined_data.properties[paired] = False
+    is_paired = False
     if isinstance(combined_data, BivariateData):
         if study_type == experiment_identifier:
             # Just need one variable to be Categorical and another to be Continuous (regardless of role) 
@@ -179,9 +184,12 @@ def add_paired_property(dataset, combined_data: CombinedData, study_type: str, d
 
             if x.is_categorical() and y.is_continuous():
                 if within_subj in design and design[within_subj] == x.metadata[name]:
-                    combined_data.properties[paired] = True
+                    is_paired = True
 
+    return combined_data.with_properties({paired: is_paired})
 
+
+# @returns @param combined_data with the distribution of y in each category of x
 def add_categories_normal(dataset, combined_data: CombinedData, study_type: str, design: Dict[str, str]=None):
     global cat_distribution
 
@@ -208,7 +216,7 @@ def add_categories_normal(dataset, combined_data: CombinedData, study_type: str,
         if y.is_continuous():
             cont_ys.append(y)
 
-    combined_data.properties[cat_distribution] = None
+    distributions = None
 
     if cat_xs and cont_ys:
         for y in ys:
@@ -218,23 +226,24 @@ def add_categories_normal(dataset, combined_data: CombinedData, study_type: str,
                     data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
                     grouped_data_name =  str(x.metadata[name] + ':' + c)
                     grouped_data[grouped_data_name] = compute_distribution(data)
-                combined_data.properties[cat_distribution] = dict()
-                combined_data.properties[cat_distribution][y.metadata[name] + '::' + x.metadata[name]] = grouped_data
+                distributions = dict()
+                distributions[y.metadata[name] + '::' + x.metadata[name]] = grouped_data
+
+    return combined_data.with_properties({cat_distribution: distributions})
 
 
 # Compute properties that are between/among VarData objects
 def compute_combined_data_properties(dataset, combined_data: CombinedData, study_type: str, design: Dict[str, str]=None):
     assert (study_type == experiment_identifier or study_type == observational_identifier)
-    combined = copy.deepcopy(combined_data)
 
     # Equal variance?
-    add_eq_variance_property(dataset, combined, study_type)
+    combined = add_eq_variance_property(dataset, combined_data, study_type)
 
     # Independent vs. Paired?
-    add_paired_property(dataset, combined, study_type, design) # check sample sizes are identical
+    combined = add_paired_property(dataset, combined, study_type, design) # check sample sizes are identical
 
     # Add is_normal for every category? in dictionary
-    add_categories_normal(dataset, combined, study_type, design)
+    combined = add_categories_normal(dataset, combined, study_type, design)
 
     return combined
 
@@ -268,7 +277,10 @@ def compute_variance(data):
 # https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.levene.html#scipy.stats.levene
 
 
-def compute_eq_variance(groups_data):
+# @param groups_weights are the frequency weights of the rows of each group (None if rows are unweighted)
+def compute_eq_variance(groups_data, groups_weights=None):
+    if groups_weights is not None:
+        return summaryStatistics.levene(groups_data, groups_weights)
     levene_test = stats.levene(*groups_data)
     return levene_test[0], levene_test[1]
 
@@ -276,7 +288,69 @@ def compute_eq_variance(groups_data):
 # Queries dataset using var_data's query
 # @returns data for var_data according to its internally held query
 def get_data(dataset: Dataset, var: VarData):
-    return dataset.select(var.metadata[name], where=f"{var.metadata[query]}")
+    where = [var.metadata[query]] if var.metadata[query] else None
+    return dataset.select(var.metadata[name], where=where)
+
+
+# @returns the data of @param y for each of @param cats of @param x, aligned by
+# participant (see repeatedMeasures.SubjectMatrix.alignment), or None if the data
+# has no participant ids (observations are then paired by position)
+def get_paired_data(dataset: Dataset, x: VarData, y: VarData, cats: list):
+    matrix = repeatedMeasures.subject_matrix(dataset, y.metadata[name], x.metadata[name], cats)
+    if matrix is None:
+        log_warning("Without participant ids, observations of %s in %s are paired by position", y.metadata[name], x.metadata[name])
+        return None
+    return matrix.alignment().columns
+
+
+# @returns the group summaries of @param y for frequency-weighted data, or None
+# for unweighted data (whose tests run on the rows themselves)
+def get_weighted_summary(dataset: Dataset, x: VarData, y: VarData, cats: list):
+    if not dataset.weights_col_name:
+        return None
+    return summaryStatistics.from_data(dataset, y.metadata[name], x.metadata[name], cats)
+
+
+# @returns the cached Ranking of the data of @param var, or None if it cannot be ranked
+# @param ordinal_order ranks ordinal data by the order of its categories
+def get_ranking(dataset: Dataset, var: VarData, ordinal_order: bool = False):
+    if var.is_ordinal() and not ordinal_order:
+        return None
+
+    def get_values():
+        where = [var.metadata[query]] if var.metadata[query] else None
+        var_data, weights = dataset.select_weighted(var.metadata[name], where=where)
+        if var.is_ordinal():
+            ordered_cat = var.metadata[categories]
+            var_data = [ordered_cat[v] for v in var_data]
+        else:
+            var_data = var_data.to_numpy(dtype=float)
+        return var_data if weights is None else (var_data, weights)
+
+    return ranks.cached(dataset, (var.metadata[name], var.metadata[query], var.is_ordinal()), get_values)
+
+
+# @returns a function that starts a pass over the data of @param vars chunk by chunk,
+# yielding one array per variable, or None if @param dataset is not read in chunks
+# @param ordinal_order maps ordinal data to the order of its categories (otherwise ordinal data is not streamed)
+def get_chunks(dataset: Dataset, vars: list, ordinal_order: bool = False):
+    if not dataset.chunk_size or len(dataset.data) <= dataset.chunk_size or dataset.weights_col_name:
+        return None
+    if any(var.is_ordinal() for var in vars) and not ordinal_order:
+        return None
+
+    def values(chunk, var):
+        if var.metadata[query]:
+            chunk = chunk.query(var.metadata[query])
+        var_data = chunk[var.metadata[name]]
+        if var.is_ordinal():
+            var_data = var_data.map(var.metadata[categories])
+        return var_data.to_numpy(dtype=float)
+
+    def chunks():
+        for chunk in dataset.iter_chunks():
+            yield [values(chunk, var) for var in vars]
+    return chunks
 
 
 def is_normal(comp_data: CombinedData, alpha, data=None):
@@ -332,29 +406,36 @@ def students_t(dataset, predictions, combined_data: BivariateData):
     else:
         prediction = None
 
-    lhs = None
-    rhs = None
-    for c in cat:
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        if c == prediction.lhs.value:
-            lhs = cat_data
-        if c == prediction.rhs.value:
-            rhs = cat_data
-        data.append(cat_data)
+    summary = get_weighted_summary(dataset, x, y, cat)
+    if summary is not None:
+        t_stat, p_val = summaryStatistics.t_test(summary, prediction.lhs.value, prediction.rhs.value, equal_var=True)
+        (n_lhs, mean_lhs, stdev_lhs), (n_rhs, mean_rhs, stdev_rhs) = summary.of(prediction.lhs.value), summary.of(prediction.rhs.value)
+    else:
+        lhs = None
+        rhs = None
+        for c in cat:
+            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+            if c == prediction.lhs.value:
+                lhs = cat_data
+            if c == prediction.rhs.value:
+                rhs = cat_data
+            data.append(cat_data)
 
-    t_stat, p_val = stats.ttest_ind(lhs, rhs, equal_var=True)
+        t_stat, p_val = stats.ttest_ind(lhs, rhs, equal_var=True)
+        n_lhs, mean_lhs, stdev_lhs = len(lhs), mean(lhs), stdev(lhs)
+        n_rhs, mean_rhs, stdev_rhs = len(rhs), mean(rhs), stdev(rhs)
 
     group_descriptive_statistics = {
         prediction.lhs.value: {
-            'mean': mean(lhs),
-            'stdev': stdev(lhs),
+            'mean': mean_lhs,
+            'stdev': stdev_lhs,
         }, prediction.rhs.value: {
-            'mean': mean(rhs),
-            'stdev': stdev(rhs),
+            'mean': mean_rhs,
+            'stdev': stdev_rhs,
         },
     }
 
-    dof = len(lhs) + len(rhs) - 2 # Group1 + Group2 - 2
+    dof = n_lhs + n_rhs - 2 # Group1 + Group2 - 2
     test_result = TestResult(
                         name = students_t_name,
                         test_statistic = t_stat,
@@ -387,9 +468,12 @@ def paired_students_t(dataset, predictions, combined_data: CombinedData):
     else:
         prediction = None
 
-    for c in cat:
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        data.append(cat_data)
+    data = get_paired_data(dataset, x, y, cat)
+    if data is None:
+        data = []
+        for c in cat:
+            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+            data.append(cat_data)
 
     t_stat, p_val = stats.ttest_rel(data[0], data[1])
     dof = (len(data[0]) + len(data[1]))/2. - 1 # (Group1 + Group2)/2 - 1
@@ -424,24 +508,30 @@ def welchs_t(dataset, predictions, combined_data: BivariateData):
     else:
         prediction = None
 
-    lhs = None
-    rhs = None
-    for c in cat:
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        if c == prediction.lhs.value:
-            lhs = cat_data
-        if c == prediction.rhs.value:
-            rhs = cat_data
-        data.append(cat_data)
+    summary = get_weighted_summary(dataset, x, y, cat)
+    if summary is not None:
+        t_stat, p_val = summaryStatistics.t_test(summary, prediction.lhs.value, prediction.rhs.value, equal_var=False)
+        sizes = [summary.of(cat[0])[0], summary.of(cat[1])[0]]
+    else:
+        lhs = None
+        rhs = None
+        for c in cat:
+            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+            if c == prediction.lhs.value:
+                lhs = cat_data
+            if c == prediction.rhs.value:
+                rhs = cat_data
+            data.append(cat_data)
 
-    t_stat, p_val = stats.ttest_ind(lhs, rhs, equal_var=False)
+        t_stat, p_val = stats.ttest_ind(lhs, rhs, equal_var=False)
+        sizes = [len(data[0]), len(data[1])]
     # dof = (len(data[0]) + len(data[1]))/2. - 1 # (Group1 + Group2)/2 - 1
 
     # TODO Maybe use Satterthaite-Welch adjustment 
-    if len(data[0]) < len(data[1]):
-        dof = len(data[0]) - 1
+    if sizes[0] < sizes[1]:
+        dof = sizes[0] - 1
     else:
-        dof = len(data[1]) - 1
+        dof = sizes[1] - 1
     test_result = TestResult(
                         name = welchs_t_name,
                         test_statistic = t_stat,
@@ -468,11 +558,6 @@ def mannwhitney_u(dataset, predictions, combined_data: BivariateData):
     x = xs[0]
     y = ys[0]
     cat = [k for k,v in x.metadata[categories].items()]
-    data = []
-
-    for c in cat:
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        data.append(cat_data)
 
     if predictions:
         if isinstance(predictions[0], list):
@@ -481,8 +566,19 @@ def mannwhitney_u(dataset, predictions, combined_data: BivariateData):
             prediction = predictions[0]
     else:
         prediction = None
-    t_stat, p_val = stats.mannwhitneyu(data[0], data[1], alternative='two-sided')
-    dof = len(data[0]) # TODO This might not be correct
+
+    grouped_ranks = ranks.grouped(dataset, y.metadata[name], x.metadata[name], cat[:2])
+    if grouped_ranks is not None and not ranks.mannwhitney_is_exact(grouped_ranks, cat[0], cat[1]):
+        t_stat, p_val = ranks.mannwhitney_u(grouped_ranks, cat[0], cat[1])
+        dof = grouped_ranks.count(cat[0]) # TODO This might not be correct
+    else:
+        data = []
+        for c in cat:
+            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+            data.append(cat_data)
+
+        t_stat, p_val = stats.mannwhitneyu(data[0], data[1], alternative='two-sided')
+        dof = len(data[0]) # TODO This might not be correct
     test_result = TestResult(
                         name = mann_whitney_name,
                         test_statistic = t_stat,
@@ -504,11 +600,14 @@ def wilcoxon_signed_rank(dataset: Dataset, predictions, combined_data: CombinedD
     x = xs[0]
     y = ys[0]
     cat = [k for k,v in x.metadata[categories].items()]
-    data = []
+    data = get_paired_data(dataset, x, y, cat)
+    paired_by_participant = data is not None
 
-    for c in cat:
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        data.append(cat_data)
+    if data is None:
+        data = []
+        for c in cat:
+            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+            data.append(cat_data)
 
     if predictions:
         if isinstance(predictions[0], list):
@@ -517,7 +616,19 @@ def wilcoxon_signed_rank(dataset: Dataset, predictions, combined_data: CombinedD
             prediction = predictions[0]
     else:
         prediction = None
-    t_stat, p_val = stats.wilcoxon(data[0], data[1])
+
+    ranking = None
+    if paired_by_participant:
+        differences = data[0] - data[1]
+        if ranks.wilcoxon_is_asymptotic(differences):
+            # Ranks of the absolute non-zero differences
+            key = ('signed', y.metadata[name], x.metadata[name], tuple(cat[:2]))
+            ranking = ranks.cached(dataset, key, lambda: np.abs(differences[differences != 0]))
+
+    if ranking is not None:
+        t_stat, p_val = ranks.wilcoxon(differences, ranking)
+    else:
+        t_stat, p_val = stats.wilcoxon(data[0], data[1])
     dof = len(data[0]) # TODO This might not be correct
     test_result = TestResult(
                         name = wilcoxon_signed_rank_name,
@@ -537,13 +648,6 @@ def wilcoxon_signed_rank(dataset: Dataset, predictions, combined_data: CombinedD
 def pearson_corr(dataset: Dataset, predictions, combined_data: CombinedData):
     assert(len(combined_data.vars) == 2)
 
-    data = []
-    for var in combined_data.vars:
-        var_data = get_data(dataset, var)
-        data.append(var_data)
-
-    assert(len(data) == 2)
-
     if predictions:
         if isinstance(predictions[0], list):
             prediction = predictions[0][0]
@@ -551,7 +655,18 @@ def pearson_corr(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    t_stat, p_val = stats.pearsonr(data[0], data[1])
+
+    chunks = get_chunks(dataset, combined_data.vars)
+    if chunks is not None:
+        t_stat, p_val = correlations.pearson(chunks)
+    else:
+        data = []
+        for var in combined_data.vars:
+            var_data = get_data(dataset, var)
+            data.append(var_data)
+
+        assert(len(data) == 2)
+        t_stat, p_val = stats.pearsonr(data[0], data[1])
     dof = None
     test_result = TestResult(
                         name = pearson_name,
@@ -568,20 +683,6 @@ def pearson_corr(dataset: Dataset, predictions, combined_data: CombinedData):
 def spearman_corr(dataset: Dataset, predictions, combined_data: CombinedData):
     assert(len(combined_data.vars) == 2)
 
-    data = []
-    for var in combined_data.vars:
-        # TODO: Check that var is ordinal. If so, then assign all ordinal values numbers 
-        # Compare to without converting to numbers (in Evernote)
-        var_data = get_data(dataset, var)
-        if var.is_ordinal():
-            ordered_cat = var.metadata[categories]
-            num_var_data = [ordered_cat[v] for v in var_data]
-            var_data = num_var_data
-
-        data.append(var_data)
-
-    assert(len(data) == 2)
-
     if predictions:
         if isinstance(predictions[0], list):
             prediction = predictions[0][0]
@@ -589,7 +690,30 @@ def spearman_corr(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    t_stat, p_val = stats.spearmanr(data[0], data[1])
+
+    approximation_error = None
+    chunks = get_chunks(dataset, combined_data.vars, ordinal_order=True)
+    streamed = correlations.spearman(chunks) if chunks is not None else None
+    rankings = [get_ranking(dataset, var, ordinal_order=True) for var in combined_data.vars] if streamed is None else []
+    if streamed is not None:
+        t_stat, p_val, approximation_error = streamed
+    elif all(r is not None for r in rankings) and rankings[0].n == rankings[1].n > 2:
+        t_stat, p_val = ranks.spearman(rankings[0], rankings[1])
+    else:
+        data = []
+        for var in combined_data.vars:
+            # TODO: Check that var is ordinal. If so, then assign all ordinal values numbers 
+            # Compare to without converting to numbers (in Evernote)
+            var_data = get_data(dataset, var)
+            if var.is_ordinal():
+                ordered_cat = var.metadata[categories]
+                num_var_data = [ordered_cat[v] for v in var_data]
+                var_data = num_var_data
+
+            data.append(var_data)
+
+        assert(len(data) == 2)
+        t_stat, p_val = stats.spearmanr(data[0], data[1])
     dof = None
     test_result = TestResult(
                         name = spearman_name,
@@ -597,7 +721,8 @@ def spearman_corr(dataset: Dataset, predictions, combined_data: CombinedData):
                         p_value = p_val,
                         prediction = prediction,
                         dof = dof,
-                        alpha = combined_data.alpha)
+                        alpha = combined_data.alpha,
+                        approximation_error = approximation_error)
     return test_result
 
 # https://docs.scipy.org/doc/scipy-0.15.1/reference/generated/scipy.stats.kendalltau.html
@@ -605,12 +730,6 @@ def spearman_corr(dataset: Dataset, predictions, combined_data: CombinedData):
 def kendalltau_corr(dataset: Dataset, predictions, combined_data: CombinedData):
     assert(len(combined_data.vars) == 2)
 
-    data = []
-    for var in combined_data.vars:
-        var_data = get_data(dataset, var)
-        data.append(var_data)
-
-    assert(len(data) == 2)
     if predictions:
         if isinstance(predictions[0], list):
             prediction = predictions[0][0]
@@ -618,7 +737,22 @@ def kendalltau_corr(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    t_stat, p_val = stats.kendalltau(data[0], data[1])
+
+    approximation_error = None
+    chunks = get_chunks(dataset, combined_data.vars)
+    streamed = correlations.kendall(chunks) if chunks is not None else None
+    if streamed is not None:
+        t_stat, p_val, approximation_error = streamed
+    else:
+        data = []
+        for var in combined_data.vars:
+            # Kendall's tau depends only on the order of the data, so the shared ranks stand in for it
+            ranking = get_ranking(dataset, var)
+            var_data = ranking.observation_ranks() if ranking is not None else get_data(dataset, var)
+            data.append(var_data)
+
+        assert(len(data) == 2)
+        t_stat, p_val = stats.kendalltau(data[0], data[1])
     dof = None
     test_result = TestResult(
                         name = kendalltau_name,
@@ -626,7 +760,8 @@ def kendalltau_corr(dataset: Dataset, predictions, combined_data: CombinedData):
                         p_value = p_val,
                         prediction = prediction,
                         dof = dof,
-                        alpha = combined_data.alpha)
+                        alpha = combined_data.alpha,
+                        approximation_error = approximation_error)
 
     return test_result
 
@@ -682,24 +817,7 @@ def chi_square(dataset: Dataset, predictions, combined_data: CombinedData):
             x_cat = [k for k,v in x.metadata[categories].items()]
             y_cat = [k for k,v in y.metadata[categories].items()]
 
-            contingency_table = []
-            contingency_table_key = [] # labels for the order in which data is stored in data array (define above)
-
-            for xc in x_cat:
-                table_row = []
-                table_row_key = []
-                for yc in y_cat:
-                    data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{xc}'", f"{y.metadata[name]} == '{yc}'"])
-                    table_row.append(len(data))
-
-                    x_y_key = str(x.metadata[name]) + ':' + str(xc) + ' by ' + str(y.metadata[name]) + ':' + str(yc)
-                    table_row_key.append(x_y_key)
-
-                assert(len(table_row_key) == len(table_row))
-                assert(len(table_row) == len(y_cat))
-                contingency_table.append(table_row)
-                contingency_table_key.append(table_row_key)
-
+            contingency_table = contingency.table(dataset, x.metadata[name], y.metadata[name], x_cat, y_cat)
         else:
             raise ValueError(f"Currently, chi square requires/only supports 1 explained variable, instead received: {len(ys)} -- {ys}")
     else:
@@ -715,7 +833,7 @@ def chi_square(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    test_statistic, p_val, dof, ex = stats.chi2_contingency(contingency_table, correction=False)
+    test_statistic, p_val, dof = contingency.chi_square(contingency_table)
     dof = None
     test_result = TestResult(
                         name = chi_square_name,
@@ -732,6 +850,7 @@ def chi_square(dataset: Dataset, predictions, combined_data: CombinedData):
 
 # https://docs.scipy.org/doc/scipy-0.18.1/reference/generated/scipy.stats.fisher_exact.html#scipy.stats.fisher_exact
 # Parmaters: table (2 x 2) | alternative (default='two-sided' optional)
+# Larger tables use contingency.fisher_monte_carlo
 # FishersResult = namedtuple('FishersResult', ('oddsratio', 'p_value'))
 
 def fishers_exact(dataset: Dataset, predictions, combined_data: CombinedData):
@@ -750,23 +869,7 @@ def fishers_exact(dataset: Dataset, predictions, combined_data: CombinedData):
     x_cat = [k for k,v in x.metadata[categories].items()]
     y_cat = [k for k,v in y.metadata[categories].items()]
 
-    contingency_table = []
-    contingency_table_key = [] # labels for the order in which data is stored in data array (define above)
-
-    for xc in x_cat:
-        table_row = []
-        table_row_key = []
-        for yc in y_cat:
-            data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{xc}'", f"{y.metadata[name]} == '{yc}'"])
-            table_row.append(len(data))
-
-            x_y_key = str(x.metadata[name]) + ':' + str(xc) + ' by ' + str(y.metadata[name]) + ':' + str(yc)
-            table_row_key.append(x_y_key)
-
-        assert(len(table_row_key) == len(table_row))
-        assert(len(table_row) == len(y_cat))
-        contingency_table.append(table_row)
-        contingency_table_key.append(table_row_key)
+    contingency_table = contingency.table(dataset, x.metadata[name], y.metadata[name], x_cat, y_cat)
 
     # odds_ratio, p_value = stats.fisher_exact(contingency_table, alternative='two-sided')
     # return FishersResult(odds_ratio, p_value)
@@ -778,7 +881,11 @@ def fishers_exact(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    odds_ratio, p_val = stats.fisher_exact(contingency_table, alternative='two-sided')
+    if contingency_table.shape == (2, 2):
+        odds_ratio, p_val = stats.fisher_exact(contingency_table.dense(), alternative='two-sided')
+    else:
+        # r x c: Monte Carlo estimate; the statistic is -log of the probability of the observed table
+        odds_ratio, p_val = contingency.fisher_monte_carlo(contingency_table)
     dof = None
     test_result = TestResult(
                         name = fisher_exact_name,
@@ -793,7 +900,6 @@ def fishers_exact(dataset: Dataset, predictions, combined_data: CombinedData):
     return test_result
 
 def f_test(dataset: Dataset, predictions, combined_data: CombinedData):
-    # Construct formula
     xs = combined_data.get_explanatory_variables()
     ys = combined_data.get_explained_variables()
     assert(len(xs) == 1)
@@ -802,10 +908,6 @@ def f_test(dataset: Dataset, predictions, combined_data: CombinedData):
     x = xs[0]
     y = ys[0]
 
-    formula = ols(f"{y.metadata[name]} ~ C({x.metadata[name]})", data=dataset.data)
-    model =formula.fit()
-
-
     if predictions:
         if isinstance(predictions[0], list):
             prediction = predictions[0][0]
@@ -813,7 +915,8 @@ def f_test(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    result_df = sm.stats.anova_lm(model, type=2)
+    where = [x.metadata[query]] if x.metadata[query] else None
+    result_df = linearModels.anova_table(dataset, y.metadata[name], [(x.metadata[name],)], where)
     # Need to inspect the result_df and return the appropriate test_statistic/p_value pair based on the prediction
     col_name = "C(" + x.metadata[name] + ")"
     for row_name in result_df.index:
@@ -837,54 +940,20 @@ def f_test(dataset: Dataset, predictions, combined_data: CombinedData):
     return test_result
 
 
-# Private function to prevent duplicate symmetric interactions
-# (e.g., ''A*B' is the same as 'B*A', both should not occur in ANOVA formula twice)
-def _is_interaction_unique(interactions, inter):
-    for existing_inter in interactions:
-        variables = inter.split('*')
-        # Check if the varibles in inter already exist in another interaction
-        exists = [(v in existing_inter) for v in variables]
-        # If all of the variables in inter already exist, this means 
-        # the interaction is not unique!
-        return not all(exists)
-
-
 def factorial_ANOVA(dataset: Dataset, predictions, combined_data: CombinedData):
 
-    # Construct formula
     xs = combined_data.get_explanatory_variables()
     ys = combined_data.get_explained_variables()
     assert(len(ys) == 1)
 
     y = ys[0]
 
-    formula = f"{y.metadata[name]} ~ "
-
-    for i in range(len(xs)):
-        x = xs[i]
-        formula += f"C({x.metadata[name]})"
-
-        if i < len(xs) - 1:
-            formula += " + "
-
-
-    # Add the interactions
-    interactions = []
-    for i in range(len(xs)):
-        x_i = xs[i]
-        inter = f"C({x_i.metadata[name]})"
-        for j in range(len(xs)):
-            if i != j:
-                x_j = xs[j]
-                inter += " * " + f"C({x_j.metadata[name]})"
-                interactions.append(inter)
-
-                if _is_interaction_unique(interactions, inter):
-                    formula += " + " +  inter
-
-    ols_formula = ols(formula, data=dataset.data)
-    model = ols_formula.fit()
-    result_df = sm.stats.anova_lm(model, type=2)
+    # Full factorial model: main effects and all interactions of the xs
+    factors = [x.metadata[name] for x in xs]
+    terms = [t for k in range(1, len(factors) + 1) for t in itertools.combinations(factors, k)]
+    x = xs[-1]
+    where = [v.metadata[query] for v in xs if v.metadata[query]]
+    result_df = linearModels.anova_table(dataset, y.metadata[name], terms, where)
     if predictions:
         if isinstance(predictions[0], list):
             prediction = predictions[0][0]
@@ -915,7 +984,6 @@ def factorial_ANOVA(dataset: Dataset, predictions, combined_data: CombinedData):
     return test_result
 
 def rm_one_way_anova(dataset: Dataset, predictions, design, combined_data: CombinedData):
-    data = dataset.data
     xs = combined_data.get_explanatory_variables()
     ys = combined_data.get_explained_variables()
 
@@ -937,11 +1005,24 @@ def rm_one_way_anova(dataset: Dataset, predictions, design, combined_data: Combi
     else:
         prediction = None
 
-    key = dataset.pid_col_name
-    aovrm2way = AnovaRM(data, depvar=y.metadata[name], subject=key, within=within_subjs, aggregate_func='mean')
-    # aovrm2way = AnovaRM(data, depvar=y.metadata[name], subject=dataset.pid_col_name, within=within_subjs, between=between_subjs) # apparently not implemented in statsmodels
-    res2way = aovrm2way.fit()
-    result_df = res2way.anova_table
+    # One within-subjects factor: compute from the cached subjects x conditions matrix of cell means
+    matrix = None
+    if len(within_subjs) == 1:
+        within = [v for v in xs if v.metadata[name] == within_subjs[0]][0]
+        if within.metadata[categories]:
+            matrix = repeatedMeasures.subject_matrix(dataset, y.metadata[name], within_subjs[0], list(within.metadata[categories].keys()))
+
+    if matrix is not None and matrix.complete and not matrix.unknown_conditions:
+        result_df = repeatedMeasures.anova_table(matrix, within_subjs[0])
+    else:
+        data = dataset.data
+        if dataset.weights_col_name:
+            data = data.loc[data.index.repeat(dataset.weights)]
+        key = dataset.pid_col_name
+        aovrm2way = AnovaRM(data, depvar=y.metadata[name], subject=key, within=within_subjs, aggregate_func='mean')
+        # aovrm2way = AnovaRM(data, depvar=y.metadata[name], subject=dataset.pid_col_name, within=within_subjs, between=between_subjs) # apparently not implemented in statsmodels
+        res2way = aovrm2way.fit()
+        result_df = res2way.anova_table
 
     col_name = x.metadata[name]
     for row_name in result_df.index:
@@ -971,14 +1052,9 @@ def kruskall_wallis(dataset: Dataset, predictions, combined_data: CombinedData):
     assert (len(ys) == 1)
     y = ys[0]
 
-    data = []
     for x in xs:
         if x.metadata[categories] is None:
             raise ValueError('')
-        cat = [k for k,v in x.metadata[categories].items()]
-        for c in cat:
-            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-            data.append(cat_data)
 
     if predictions:
         if isinstance(predictions[0], list):
@@ -987,8 +1063,25 @@ def kruskall_wallis(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    t_stat, p_val = stats.kruskal(*data)
-    dof = len(data[0]) # TODO This might not be correct
+
+    grouped_ranks = None
+    if len(xs) == 1:
+        cat = [k for k,v in xs[0].metadata[categories].items()]
+        grouped_ranks = ranks.grouped(dataset, y.metadata[name], xs[0].metadata[name], cat)
+
+    if grouped_ranks is not None and len(cat) > 1 and all(grouped_ranks.count(c) > 0 for c in cat):
+        t_stat, p_val = ranks.kruskal(grouped_ranks)
+        dof = grouped_ranks.count(cat[0]) # TODO This might not be correct
+    else:
+        data = []
+        for x in xs:
+            cat = [k for k,v in x.metadata[categories].items()]
+            for c in cat:
+                cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+                data.append(cat_data)
+
+        t_stat, p_val = stats.kruskal(*data)
+        dof = len(data[0]) # TODO This might not be correct
     test_result = TestResult(
                         name = kruskall_wallis_name,
                         test_statistic = t_stat,
@@ -1010,12 +1103,18 @@ def friedman(dataset: Dataset, predictions, combined_data: CombinedData):
     assert (len(ys) == 1)
     y = ys[0]
 
-    data = []
-    for x in xs:
-        cat = [k for k,v in x.metadata[categories].items()]
-        for c in cat:
-            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-            data.append(cat_data)
+    data = None
+    if len(xs) == 1:
+        data = get_paired_data(dataset, xs[0], y, [k for k,v in xs[0].metadata[categories].items()])
+    paired_by_participant = data is not None
+
+    if data is None:
+        data = []
+        for x in xs:
+            cat = [k for k,v in x.metadata[categories].items()]
+            for c in cat:
+                cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+                data.append(cat_data)
 
     # return stats.friedmanchisquare(*data)
 
@@ -1026,7 +1125,11 @@ def friedman(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else:
         prediction = None
-    test_statistic, p_val = stats.friedmanchisquare(*data)
+
+    if paired_by_participant and len(data) >= 3:
+        test_statistic, p_val = ranks.friedman(np.column_stack(data))
+    else:
+        test_statistic, p_val = stats.friedmanchisquare(*data)
     dof = len(data[0]) # TODO This might not be correct
     test_result = TestResult(
                         name = "Kruskall Wallis Test",
@@ -1151,6 +1254,11 @@ def vda(dataset, predictions, combined_data: CombinedData):
     if predictions:
         pred = predictions[0][0]
 
+    # Shares the pooled ranking of the test that was just run on the same groups
+    grouped_ranks = ranks.grouped(dataset, y.metadata[name], x.metadata[name], [pred.lhs.value, pred.rhs.value])
+    if grouped_ranks is not None and grouped_ranks.count(pred.lhs.value) > 0 and grouped_ranks.count(pred.rhs.value) > 0:
+        return ranks.vda(grouped_ranks, pred.lhs.value, pred.rhs.value)
+
     lhs = None
     rhs = None
     for c in cat:
@@ -1163,7 +1271,7 @@ def vda(dataset, predictions, combined_data: CombinedData):
 
     m = len(lhs)
     n = len(rhs)
-    concat = lhs.append(rhs)
+    concat = pd.concat([lhs, rhs])
     r = stats.rankdata(concat)
     r1 = sum(r[range(0,m)])
 
@@ -1236,13 +1344,15 @@ def execute_test(dataset, design, predictions, combined_data: CombinedData, test
     test_func = lookup_function(test)
 
     # Execute the statistical test
-    if test_func is rm_one_way_anova:
-        stat_result = test_func(dataset, predictions, design, combined_data)
-    else:
-        stat_result = test_func(dataset, predictions, combined_data)
+    with profiler.stage(profiler.test_execution, test):
+        if test_func is rm_one_way_anova:
+            stat_result = test_func(dataset, predictions, design, combined_data)
+        else:
+            stat_result = test_func(dataset, predictions, combined_data)
 
     # Calculate the effect size
-    add_effect_size(dataset, predictions, combined_data, test_func, stat_result)
+    with profiler.stage(profiler.effect_sizes, test):
+        add_effect_size(dataset, predictions, combined_data, test_func, stat_result)
 
     # Compute the DOF
     # add_dof(dataset, predictions, combined_data, test_func, stat_result)
@@ -0,0 +1,178 @@
+# Linear models over categorical factors without formula materialization.
+# Factors are dummy (treatment) coded once per dataset and their design matrix
+# is cached on the Dataset. ANOVA tables are computed from the cached Gram
+# matrix X'X and X'y: the residual sum of squares of every sub-model needed for
+# Type II sums of squares is a least-squares solve on a block of X'X.
+# Design matrices switch to scipy.sparse when factors have many levels.
+# Models can be restricted to the rows selected by where clauses (as for
+# Dataset.select), e.g., to compare two of the levels of a factor.
+
+from tea.runtimeDataStructures.dataset import Dataset
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from scipy.sparse import linalg as sparse_linalg
+
+# Use sparse design matrices beyond this many columns
+sparse_threshold = 64
+
+table_columns = ['df', 'sum_sq', 'mean_sq', 'F', 'PR(>F)']
+
+
+def term_label(term: tuple):
+    return ':'.join(f"C({f})" for f in term)
+
+
+# @returns integer codes (-1 for missing, or outside the rows selected by @param where)
+# and the sorted levels of @param factor
+def factor_codes(dataset: Dataset, factor: str, where: tuple = ()):
+    key = ('factor codes', factor, where)
+    if key not in dataset.cache:
+        values = dataset.data[factor]
+        if where:
+            selected = np.zeros(len(values), dtype=bool)
+            selected[dataset.plan(factor, list(where)).rows(dataset)] = True
+            values = values.where(selected)
+        codes, levels = pd.factorize(values, sort=True)
+        dataset.cache[key] = (codes.astype(np.int64), levels)
+    return dataset.cache[key]
+
+
+# Dummy-coded columns for @param term: one column per non-reference level, or
+# per combination of non-reference levels for an interaction.
+# @returns (row indices, column indices) of the ones and the number of columns
+def _term_entries(dataset: Dataset, term: tuple, rows: np.ndarray, where: tuple = ()):
+    col = np.zeros(len(rows), dtype=np.int64)
+    present = np.ones(len(rows), dtype=bool)
+    width = 1
+    for factor in term:
+        codes, levels = factor_codes(dataset, factor, where)
+        codes = codes[rows]
+        present &= codes > 0  # the reference level (code 0) has no column
+        col = col * (len(levels) - 1) + (codes - 1)
+        width *= len(levels) - 1
+    return np.flatnonzero(present), col[present], width
+
+
+# Design matrix (intercept followed by each term's dummy columns) over the rows
+# selected by @param where where no factor is missing. Cached on @param dataset per terms and where.
+# @returns X (ndarray, or CSR matrix when wide), the column slice of each term and the rows used
+def design_matrix(dataset: Dataset, terms: list, where: tuple = ()):
+    terms = [tuple(t) for t in terms]
+    key = ('design matrix', tuple(terms), where)
+    if key in dataset.cache:
+        return dataset.cache[key]
+
+    factors = sorted({f for t in terms for f in t})
+    complete = np.ones(len(dataset.data), dtype=bool)
+    for factor in factors:
+        complete &= factor_codes(dataset, factor, where)[0] >= 0
+    rows = np.flatnonzero(complete)
+
+    row_idx = [np.arange(len(rows))]
+    col_idx = [np.zeros(len(rows), dtype=np.int64)]
+    slices = {}
+    start = 1
+    for term in terms:
+        r, c, width = _term_entries(dataset, term, rows, where)
+        row_idx.append(r)
+        col_idx.append(c + start)
+        slices[term] = slice(start, start + width)
+        start += width
+
+    row_idx = np.concatenate(row_idx)
+    col_idx = np.concatenate(col_idx)
+    X = sparse.csr_matrix((np.ones(len(row_idx)), (row_idx, col_idx)), shape=(len(rows), start))
+    if start <= sparse_threshold:
+        X = X.toarray()
+
+    dataset.cache[key] = (X, slices, rows)
+    return dataset.cache[key]
+
+
+# Gram matrix X'WX over the rows where y is also present, with W the frequency weights.
+# Cached on @param dataset per terms, where clauses and missing-y pattern.
+def _gram(dataset: Dataset, terms: list, where: tuple, X, y_present: np.ndarray, weights: np.ndarray = None):
+    missing_key = None if y_present.all() else np.flatnonzero(~y_present).tobytes()
+    key = ('gram', tuple(tuple(t) for t in terms), where, missing_key)
+    if key not in dataset.cache:
+        Xy = X if missing_key is None else X[y_present]
+        if weights is None:
+            gram = Xy.T @ Xy
+        elif sparse.issparse(Xy):
+            gram = Xy.T @ sparse.diags(weights) @ Xy
+        else:
+            gram = Xy.T @ (Xy * weights[:, None])
+        dataset.cache[key] = gram if sparse.issparse(gram) else np.asarray(gram)
+    return dataset.cache[key]
+
+
+# Residual sum of squares of the sub-model with @param columns: y'y - b'X'y with (X'X) b = X'y
+def _rss(gram, xty, yty, columns):
+    g = gram[columns][:, columns]
+    v = xty[columns]
+    if sparse.issparse(g):
+        b = sparse_linalg.spsolve(g.tocsc(), v)
+        if not np.all(np.isfinite(b)): # singular, e.g., confounded factors
+            b = sparse_linalg.lsqr(g.tocsr(), v, atol=1e-12, btol=1e-12)[0]
+    else:
+        b = np.linalg.lstsq(g, v, rcond=None)[0]
+    return yty - b @ v
+
+
+# ANOVA table with Type II sums of squares for @param y_name on @param terms
+# (tuples of factor names; a tuple of two factors is their interaction),
+# over the rows selected by the @param where clauses (default: all rows).
+# Rows are weighted by the dataset's frequency weights, if any.
+# A term is tested against the model with every term that does not contain it.
+# Rows are labeled like statsmodels' anova_lm ("C(a)", "C(a):C(b)", "Residual").
+def anova_table(dataset: Dataset, y_name: str, terms: list, where: list = None):
+    terms = [tuple(t) for t in terms]
+    where = tuple(where) if where else ()
+    X, slices, rows = design_matrix(dataset, terms, where)
+    y = dataset.data[y_name].to_numpy(dtype=float)[rows]
+    y_present = ~np.isnan(y)
+    y = y[y_present]
+    weights = dataset.weights
+    if weights is not None:
+        weights = weights[rows][y_present].astype(float)
+    gram = _gram(dataset, terms, where, X, y_present, weights)
+
+    Xy = X if y_present.all() else X[y_present]
+    if weights is None:
+        y = y - y.mean() # centering keeps y'y - b'X'y accurate; the intercept absorbs it
+        xty = np.asarray(Xy.T @ y).ravel()
+        yty = y @ y
+        n = len(y)
+    else:
+        y = y - np.average(y, weights=weights)
+        xty = np.asarray(Xy.T @ (weights * y)).ravel()
+        yty = np.sum(weights * y * y)
+        n = weights.sum()
+
+    all_columns = np.arange(X.shape[1])
+    rss_full = _rss(gram, xty, yty, all_columns)
+    df_resid = n - X.shape[1]
+
+    def columns_of(model_terms):
+        return np.concatenate([[0]] + [all_columns[slices[t]] for t in model_terms])
+
+    index = []
+    table = []
+    for term in terms:
+        # Terms that do not contain this term (e.g., for C(a): C(b), but not C(a):C(b))
+        others = [t for t in terms if t != term and not set(term) <= set(t)]
+        ss = _rss(gram, xty, yty, columns_of(others)) - _rss(gram, xty, yty, columns_of(others + [term]))
+        df = slices[term].stop - slices[term].start
+        index.append(term_label(term))
+        table.append([df, ss, ss / df])
+
+    table.append([df_resid, rss_full, rss_full / df_resid])
+    index.append('Residual')
+
+    result_df = pd.DataFrame(table, index=index, columns=table_columns[:3])
+    result_df['F'] = result_df['mean_sq'] / (rss_full / df_resid)
+    result_df['PR(>F)'] = stats.f.sf(result_df['F'], result_df['df'], df_resid)
+    result_df.loc['Residual', ['F', 'PR(>F)']] = np.nan
+    return result_df
@@ -0,0 +1,144 @@
+# Leveled, structured logging for Tea
+# Messages are %-style templates and their arguments are only formatted when
+# the level is enabled, so disabled log calls in the solver loop cost one
+# level check and nothing else.
+# Usage:
+#   log_debug("Testing assumption: %s.", prop._name)
+#   log("Loaded %d rows", n, rows=n) # keyword arguments are structured fields (JSON-lines sink)
+
+import contextlib
+import json
+import logging
+import sys
+from pathlib import Path
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+__levels__ = {
+    'debug': DEBUG,
+    'info': INFO,
+    'warning': WARNING,
+    'error': ERROR,
+    'quiet': logging.CRITICAL + 1,
+}
+
+# Level used while running in batch mode (hypothesize_many, command line runs)
+BATCH_LEVEL = WARNING
+
+logger = logging.getLogger('tea')
+logger.propagate = False
+logger.setLevel(INFO)
+
+# Console output goes to stdout, like the print-based logging it replaces.
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter('%(message)s'))
+logger.addHandler(_console_handler)
+
+_file_handler = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    # One JSON object per record. Structured fields passed to log calls are
+    # added as top-level keys.
+    def format(self, record):
+        entry = {
+            'time': record.created,
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _to_level(level):
+    if isinstance(level, str):
+        if level.lower() not in __levels__:
+            raise ValueError(f"Unknown log level: {level}. Expected one of {list(__levels__)}")
+        return __levels__[level.lower()]
+    return int(level)
+
+
+# @param level is a name in __levels__ or a logging level number
+# @param file is a path to append log records to (None removes the file sink)
+# @param json_lines writes the file sink as JSON lines instead of plain text
+# @param console turns console output on or off
+def configure(level=None, file=None, json_lines=False, console=True):
+    global _file_handler
+
+    if level is not None:
+        logger.setLevel(_to_level(level))
+
+    if _file_handler is not None:
+        logger.removeHandler(_file_handler)
+        _file_handler.close()
+        _file_handler = None
+
+    if file is not None:
+        _file_handler = logging.FileHandler(Path(file), mode='a')
+        if json_lines:
+            _file_handler.setFormatter(JsonLinesFormatter())
+        else:
+            _file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(_file_handler)
+
+    if console and _console_handler not in logger.handlers:
+        logger.addHandler(_console_handler)
+    elif not console and _console_handler in logger.handlers:
+        logger.removeHandler(_console_handler)
+
+
+def get_level():
+    return logger.level
+
+
+def is_enabled(level=DEBUG):
+    return logger.isEnabledFor(level)
+
+
+# Batch runs are quiet by default: only warnings and errors get through unless
+# the user asked for something else with @param level.
+@contextlib.contextmanager
+def batch_mode(level=None):
+    previous = logger.level
+    target = BATCH_LEVEL if level is None else _to_level(level)
+    # Never make logging *more* verbose than the user configured
+    logger.setLevel(max(previous, target) if level is None else target)
+    try:
+        yield logger
+    finally:
+        logger.setLevel(previous)
+
+
+def _emit(level, message, args, fields):
+    if fields:
+        logger.log(level, message, *args, extra={'fields': fields})
+    else:
+        logger.log(level, message, *args)
+
+
+def log(message: str, *args, **fields):
+    if logger.isEnabledFor(INFO):
+        _emit(INFO, message, args, fields)
+
+
+def log_debug(message: str, *args, **fields):
+    if logger.isEnabledFor(DEBUG):
+        _emit(DEBUG, message, args, fields)
+
+
+def log_warning(message: str, *args, **fields):
+    if logger.isEnabledFor(WARNING):
+        _emit(WARNING, message, args, fields)
+
+
+def log_error(message: str, *args, **fields):
+    if logger.isEnabledFor(ERROR):
+        _emit(ERROR, message, args, fields)
@@ -0,0 +1,191 @@
+# Mass-univariate tests: one categorical IV against many continuous outcomes.
+# The IV is grouped once; statistics are computed for all outcomes at once over
+# 2-D blocks (rows x outcomes), a chunk of outcome columns at a time.
+# Missing outcome values are left out per outcome.
+
+from tea.helpers import profiler, multipleComparisons
+from tea.helpers.ranks import rank_columns
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+default_chunk_size = 256  # outcome columns per block
+
+# Tests available in mass-univariate mode (named as the corresponding Tea tests)
+two_group_tests = ['students_t', 'welchs_t', 'mannwhitney_u']
+many_group_tests = ['f_test', 'kruskall_wallis']
+
+columns = ['outcome', 'test', 'statistic', 'dof', 'dof_between', 'p_value', 'corrected_p_value']
+
+
+def default_tests(num_groups: int):
+    return two_group_tests if num_groups == 2 else many_group_tests
+
+
+# @returns an integer code for each row (-1 for rows whose group is missing or not in @param groups)
+def group_codes(x: pd.Series, groups: list):
+    codes = pd.Categorical(x, categories=groups).codes
+    return np.asarray(codes, dtype=np.int64)
+
+
+# Per-group counts, means and sums of squared deviations of each column of @param block
+# @param onehot is rows x groups
+def _group_moments(block, onehot):
+    valid = ~np.isnan(block)
+    values = np.where(valid, block, 0.0)
+    counts = onehot.T @ valid  # groups x outcomes
+    sums = onehot.T @ values
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    # Deviations from each row's group mean (not sums of squares minus squared sums,
+    # which cancel catastrophically when the mean is large relative to the spread)
+    deviations = np.where(valid, block - onehot @ np.nan_to_num(means), 0.0)
+    sum_sq = onehot.T @ (deviations * deviations)
+    return counts, means, sum_sq
+
+
+def students_t(block, onehot):
+    counts, means, sum_sq = _group_moments(block, onehot)
+    dof = counts[0] + counts[1] - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled_var = (sum_sq[0] + sum_sq[1]) / dof
+        t = (means[0] - means[1]) / np.sqrt(pooled_var * (1 / counts[0] + 1 / counts[1]))
+    p = 2 * stats.t.sf(np.abs(t), dof)
+    return t, dof, p
+
+
+def welchs_t(block, onehot):
+    counts, means, sum_sq = _group_moments(block, onehot)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        se0 = sum_sq[0] / (counts[0] - 1) / counts[0]
+        se1 = sum_sq[1] / (counts[1] - 1) / counts[1]
+        t = (means[0] - means[1]) / np.sqrt(se0 + se1)
+        dof = (se0 + se1) ** 2 / (se0 ** 2 / (counts[0] - 1) + se1 ** 2 / (counts[1] - 1))
+    p = 2 * stats.t.sf(np.abs(t), dof)
+    return t, dof, p
+
+
+def one_way_anova(block, onehot):
+    counts, means, sum_sq = _group_moments(block, onehot)
+    n = counts.sum(axis=0)
+    k = (counts > 0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand_mean = np.nansum(counts * means, axis=0) / n
+        ss_between = np.nansum(counts * (means - grand_mean) ** 2, axis=0)
+        ss_within = sum_sq.sum(axis=0)
+        dof_between = k - 1
+        dof_within = n - k
+        f = (ss_between / dof_between) / (ss_within / dof_within)
+    p = stats.f.sf(f, dof_between, dof_within)
+    return f, dof_within, dof_between, p
+
+
+def mannwhitney_u(block, onehot):
+    n1, n2 = onehot.sum(axis=0)
+    ranks, tie_term = rank_columns(block)
+    n = n1 + n2
+    u1 = ranks.T @ onehot[:, 0] - n1 * (n1 + 1) / 2.0
+    u = np.maximum(u1, n1 * n2 - u1)
+    mu = n1 * n2 / 2.0
+    sigma = np.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1))))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (u - mu - 0.5) / sigma  # continuity correction
+    p = np.minimum(2 * stats.norm.sf(z), 1.0)
+    return u1, np.full(len(u1), np.nan), p
+
+
+def kruskall_wallis(block, onehot):
+    counts = onehot.sum(axis=0)
+    nonempty = counts > 0  # declared groups without rows are left out
+    counts = counts[nonempty]
+    n = counts.sum()
+    ranks, tie_term = rank_columns(block)
+    rank_sums = onehot[:, nonempty].T @ ranks  # groups x outcomes
+    with np.errstate(invalid='ignore', divide='ignore'):
+        h = 12.0 / (n * (n + 1)) * ((rank_sums ** 2) / counts[:, None]).sum(axis=0) - 3 * (n + 1)
+        h = h / (1 - tie_term / (n ** 3 - n))
+    dof = len(counts) - 1
+    p = stats.chi2.sf(h, dof)
+    return h, np.full(len(h), dof, dtype=float), p
+
+
+# Rank-based tests run on complete columns at once; columns with missing
+# values are ranked separately, leaving out the missing values
+def _rank_test(test_func):
+    def run(block, onehot):
+        missing = np.isnan(block).any(axis=0)
+        if not missing.any():
+            return test_func(block, onehot)
+
+        results = [np.full(block.shape[1], np.nan) for _ in range(3)]
+        complete = ~missing
+        if complete.any():
+            for acc, values in zip(results, test_func(block[:, complete], onehot)):
+                acc[complete] = values
+        for j in np.flatnonzero(missing):
+            valid = ~np.isnan(block[:, j])
+            for acc, values in zip(results, test_func(block[valid, j:j + 1], onehot[valid])):
+                acc[j] = values[0]
+        return results
+    return run
+
+
+__mass_test_to_function__ = {
+    'students_t': students_t,
+    'welchs_t': welchs_t,
+    'mannwhitney_u': _rank_test(mannwhitney_u),
+    'f_test': one_way_anova,
+    'kruskall_wallis': _rank_test(kruskall_wallis),
+}
+
+
+# Tests @param x_name against every column in @param y_names
+# @param groups are the categories of x, in order; two-group statistics compare groups[0] to groups[1]
+# @param correction is applied across outcomes, separately for each test
+# @returns a DataFrame with one row per outcome and test
+def test_outcomes(data: pd.DataFrame, x_name: str, groups: list, y_names: list, tests: list = None,
+                  chunk_size: int = default_chunk_size, correction: str = multipleComparisons.benjamini_hochberg_name):
+    codes = group_codes(data[x_name], groups)
+    in_group = codes >= 0
+    codes = codes[in_group]
+    onehot = np.zeros((len(codes), len(groups)))
+    onehot[np.arange(len(codes)), codes] = 1.0
+
+    tests = tests if tests else default_tests(len(groups))
+    for test in tests:
+        if test not in __mass_test_to_function__:
+            raise ValueError(f"{test} is not supported in mass-univariate mode. Supported tests: {list(__mass_test_to_function__)}")
+        if test in two_group_tests and len(groups) != 2:
+            raise ValueError(f"{test} requires exactly two groups, but {x_name} has {len(groups)}")
+
+    results = {test: [[], [], [], []] for test in tests}
+    for start in range(0, len(y_names), chunk_size):
+        chunk = y_names[start:start + chunk_size]
+        block = data[chunk].to_numpy(dtype=float)[in_group]
+        for test in tests:
+            with profiler.stage(profiler.test_execution, test):
+                output = __mass_test_to_function__[test](block, onehot)
+            stat, dof, p = output[0], output[1], output[-1]
+            dof_between = output[2] if len(output) == 4 else np.full(len(chunk), np.nan)
+            for acc, values in zip(results[test], [stat, dof, dof_between, p]):
+                acc.append(np.asarray(values, dtype=float))
+
+    frames = []
+    for test in tests:
+        stat, dof, dof_between, p = [np.concatenate(acc) if acc else np.array([]) for acc in results[test]]
+        corrected = np.full(len(p), np.nan)
+        finite = np.isfinite(p)
+        if correction:
+            corrected[finite] = multipleComparisons.correct(p[finite], correction)
+        frames.append(pd.DataFrame({
+            'outcome': list(y_names),
+            'test': test,
+            'statistic': stat,
+            'dof': dof,
+            'dof_between': dof_between,
+            'p_value': p,
+            'corrected_p_value': corrected,
+        }, columns=columns))
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,200 @@
+# Multiple comparison corrections
+# Each correction takes a sequence of p-values and returns the corrected
+# p-values (capped at 1) in the same order. Step-wise corrections sort once
+# and use cumulative maxima/minima, so they are O(m log m) in the family size.
+
+import attr
+import numpy as np
+
+bonferroni_name = 'bonferroni'
+holm_name = 'holm'
+hochberg_name = 'hochberg'
+benjamini_hochberg_name = 'fdr_bh'
+benjamini_yekutieli_name = 'fdr_by'
+
+
+def bonferroni(p_values):
+    p = np.asarray(p_values, dtype=float)
+    return np.minimum(p * len(p), 1.0)
+
+
+# Holm-Bonferroni step-down: controls the family-wise error rate, uniformly more powerful than Bonferroni
+def holm(p_values):
+    p = np.asarray(p_values, dtype=float)
+    m = len(p)
+    if m == 0:
+        return p
+    order = np.argsort(p, kind='mergesort')
+    stepped = (m - np.arange(m)) * p[order]
+    corrected = np.empty(m)
+    corrected[order] = np.minimum(np.maximum.accumulate(stepped), 1.0)
+    return corrected
+
+
+# Step-up from the largest p-value: corrected p_(i) = min over j >= i of factor_(j) * p_(j)
+def _step_up(p_values, factors):
+    p = np.asarray(p_values, dtype=float)
+    m = len(p)
+    if m == 0:
+        return p
+    order = np.argsort(p, kind='mergesort')[::-1]
+    stepped = p[order] * factors[::-1]
+    corrected = np.empty(m)
+    corrected[order] = np.minimum(np.minimum.accumulate(stepped), 1.0)
+    return corrected
+
+
+# Hochberg step-up: controls the family-wise error rate for independent (or positively dependent) tests
+def hochberg(p_values):
+    m = len(p_values)
+    return _step_up(p_values, m - np.arange(m, dtype=float))
+
+
+# Benjamini-Hochberg step-up: controls the false discovery rate for independent (or positively dependent) tests
+def benjamini_hochberg(p_values):
+    m = len(p_values)
+    return _step_up(p_values, m / np.arange(1, m + 1, dtype=float))
+
+
+# Benjamini-Yekutieli: controls the false discovery rate under arbitrary dependence
+def benjamini_yekutieli(p_values):
+    m = len(p_values)
+    ranks = np.arange(1, m + 1, dtype=float)
+    return _step_up(p_values, m * np.sum(1.0 / ranks) / ranks)
+
+
+__corrections__ = {
+    bonferroni_name: bonferroni,
+    holm_name: holm,
+    hochberg_name: hochberg,
+    benjamini_hochberg_name: benjamini_hochberg,
+    benjamini_yekutieli_name: benjamini_yekutieli,
+}
+
+
+def correct(p_values, method: str = holm_name):
+    if method not in __corrections__:
+        raise ValueError(f"Unknown multiple comparison correction: {method}. Expected one of {list(__corrections__)}")
+    return __corrections__[method](p_values)
+
+
+# The p-value of @param test_result to correct: the one-sided p-value when the
+# prediction is directional. Returns None for results without a numeric p-value
+# (e.g., bootstrapped confidence intervals).
+def p_value_of(test_result):
+    return p_value_to_correct(test_result.adjusted_p_value, test_result.p_value)
+
+
+# The p-value to correct given a result's @param adjusted_p_value and @param p_value (see p_value_of)
+def p_value_to_correct(adjusted_p_value, p_value):
+    p_value = adjusted_p_value if adjusted_p_value is not None else p_value
+    if isinstance(p_value, (float, int, np.floating)) and not isinstance(p_value, bool):
+        return float(p_value)
+    return None
+
+
+# Collects a family of p-values, e.g., as results stream in, and corrects them together.
+# P-values are kept in a NumPy buffer that doubles as needed, so families of
+# 10^5 or more hypotheses stay cheap to collect and correct.
+@attr.s(init=True, eq=False)
+class CorrectionSink(object):
+    method = attr.ib(type=str, default=holm_name)
+    _p_values = attr.ib(init=False, repr=False, factory=lambda: np.empty(1024))
+    _size = attr.ib(init=False, default=0)
+    # TestResult (or None) for each p-value; corrected p-values are written back to them by apply()
+    _targets = attr.ib(init=False, repr=False, factory=list)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def p_values(self):
+        return self._p_values[:self._size]
+
+    # @returns the index of @param p_value in the family
+    def add(self, p_value: float, target=None):
+        if self._size == len(self._p_values):
+            self._p_values = np.resize(self._p_values, 2 * len(self._p_values))
+        self._p_values[self._size] = p_value
+        self._targets.append(target)
+        self._size += 1
+        return self._size - 1
+
+    def add_many(self, p_values, targets: list = None):
+        p_values = np.asarray(p_values, dtype=float)
+        needed = self._size + len(p_values)
+        if needed > len(self._p_values):
+            self._p_values = np.resize(self._p_values, max(needed, 2 * len(self._p_values)))
+        self._p_values[self._size:needed] = p_values
+        self._targets.extend(targets if targets is not None else [None] * len(p_values))
+        self._size = needed
+
+    # Adds each TestResult in @param test_results that has a numeric p-value
+    def add_results(self, test_results):
+        for test_result in test_results:
+            p_value = p_value_of(test_result)
+            if p_value is not None:
+                self.add(p_value, test_result)
+
+    def corrected(self, method: str = None):
+        return correct(self.p_values, method if method else self.method)
+
+    # Sets corrected_p_value on every TestResult in the family
+    # @returns the corrected p-values
+    def apply(self, method: str = None):
+        corrected = self.corrected(method)
+        for target, c in zip(self._targets, corrected):
+            if target is not None:
+                target.corrected_p_value = float(c)
+        return corrected
+
+
+# Corrects any collection of TestResults as one family
+def correct_results(test_results, method: str = holm_name):
+    sink = CorrectionSink(method)
+    sink.add_results(test_results)
+    sink.apply()
+    return test_results
+
+
+# @returns the ResultData objects in the family of @param results: each result and
+# its follow-up predictions, once each
+def family_members(results):
+    family = []
+    seen = set()
+    for res in results:
+        for r in [res] + list(getattr(res, 'follow_up_results', None) or []):
+            if r is not None and id(r) not in seen:
+                seen.add(id(r))
+                family.append(r)
+    return family
+
+
+# Corrects each test across the results it was run on. The valid tests of a hypothesis
+# are alternative analyses of that hypothesis, so each test is its own family.
+# @param entries are (test name, p-value to correct or None) pairs
+# @returns the corrected p-value of each entry (None where it has no p-value to correct)
+def correct_by_test(entries, method: str = holm_name):
+    sinks = {}
+    for i, (test, p_value) in enumerate(entries):
+        if p_value is not None:
+            if test not in sinks:
+                sinks[test] = CorrectionSink(method)
+            sinks[test].add(p_value, i)
+
+    corrected = [None] * len(entries)
+    for sink in sinks.values():
+        for i, c in zip(sink._targets, sink.corrected()):
+            corrected[i] = float(c)
+    return corrected
+
+
+# Corrects the p-values of @param results (ResultData objects) as one family of hypotheses
+# (see family_members and correct_by_test)
+def correct_result_data(results, method: str = holm_name):
+    test_results = [(test, test_result) for res in family_members(results) for test, test_result in res.test_to_results.items()]
+    corrected = correct_by_test([(test, p_value_of(test_result)) for test, test_result in test_results], method)
+    for (_, test_result), c in zip(test_results, corrected):
+        if c is not None:
+            test_result.corrected_p_value = c
+    return results
@@ -0,0 +1,176 @@
+# Runs work on a Dataset in a pool of worker processes, for CPU-bound batches
+# (many hypotheses, bootstrap and permutation tests) that threads cannot speed
+# up because of the GIL.
+# The columns of the data are copied once into shared memory; workers map them
+# as zero-copy NumPy arrays (text columns are shared as integer codes: those
+# already dictionary-encoded by columnStore.py stay encoded, others are decoded
+# once per worker). The pool is kept between batches, so workers keep
+# the statistics libraries imported and only attach to each new dataset.
+
+import atexit
+import contextlib
+import importlib
+import itertools
+import multiprocessing
+import os
+import attr
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+from tea.runtimeDataStructures.dataset import Dataset
+
+# 'spawn' starts workers without copying the parent's state (e.g., z3 contexts and threads)
+start_method = 'spawn'
+
+# Imported by each worker when it starts
+warm_modules = ['scipy.stats', 'statsmodels.api', 'statsmodels.formula.api', 'z3', 'tea.evaluate']
+
+_pool = None
+_pool_workers = None
+_tokens = itertools.count()
+
+
+@attr.s(init=True, frozen=True)
+class SharedColumn(object):
+    name = attr.ib()
+    block = attr.ib(type=str)  # name of the shared memory block
+    dtype = attr.ib(type=str)
+    length = attr.ib(type=int)
+    categories = attr.ib(default=None)  # values of the codes in the block, for text columns
+    ordered = attr.ib(default=None)  # for Categorical columns (see columnStore.py), whether their categories are ordered
+
+
+# What a worker needs to attach to a shared Dataset
+@attr.s(init=True, frozen=True)
+class SharedDataset(object):
+    token = attr.ib(type=str)
+    columns = attr.ib(type=tuple)
+    variables = attr.ib()
+    pid_col_name = attr.ib()
+    weights_col_name = attr.ib()
+    chunk_size = attr.ib()
+
+
+# Copies the columns of @param dataset into shared memory for the duration of the block
+# @yields the SharedDataset to pass to submit()
+@contextlib.contextmanager
+def shared(dataset: Dataset):
+    blocks = []
+    try:
+        columns = []
+        for name in dataset.data.columns:
+            values = dataset.data[name]
+            categories = None
+            ordered = None
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Already dictionary-encoded (see columnStore.py)
+                array, categories, ordered = np.ascontiguousarray(values.cat.codes), tuple(values.cat.categories), values.cat.ordered
+            elif values.dtype.kind in 'biufcmM':
+                array = np.ascontiguousarray(values.to_numpy())
+            else:
+                codes, uniques = pd.factorize(values)
+                array, categories = codes, tuple(uniques)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            columns.append(SharedColumn(name, block.name, array.dtype.str, len(array), categories, ordered))
+
+        yield SharedDataset(f"{os.getpid()}-{next(_tokens)}", tuple(columns), dataset.variables,
+                            dataset.pid_col_name, dataset.weights_col_name, dataset.chunk_size)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+# @returns the pool of @param workers processes (default: one per CPU), started on first use
+def pool(workers: int = None):
+    global _pool, _pool_workers
+
+    workers = workers if workers else os.cpu_count()
+    if _pool is None or _pool_workers != workers:
+        shutdown()
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context(start_method),
+                                    initializer=_warm_up, initargs=(warm_modules,))
+        _pool_workers = workers
+    return _pool
+
+
+# @returns the running pool, whatever its number of workers, or else a new pool of @param workers processes
+# (for work that only needs some pool and should not restart one sized for a batch)
+def running_pool(workers: int = None):
+    return _pool if _pool is not None else pool(workers)
+
+
+# Whether this process is a worker (of this pool or any other), which must not start pools of its own
+def in_worker():
+    return multiprocessing.parent_process() is not None
+
+
+def shutdown():
+    global _pool, _pool_workers
+
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_workers = None
+
+
+atexit.register(shutdown)
+
+
+# Runs @param function(dataset, *@param args) in a worker, on the dataset described by @param shared_dataset
+# @returns a Future of its result. @param function must be importable by workers (defined at module level).
+def submit(shared_dataset: SharedDataset, function, *args, workers: int = None):
+    return pool(workers).submit(_run, shared_dataset, function, args)
+
+
+### Worker side
+
+# token -> (Dataset, shared memory blocks) of the dataset a worker is attached to
+_attached = {}
+
+
+def _warm_up(modules):
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _attach(shared_dataset: SharedDataset):
+    if shared_dataset.token in _attached:
+        return _attached[shared_dataset.token][0]
+
+    _detach()
+    blocks = []
+    data = {}
+    for column in shared_dataset.columns:
+        # Workers share the parent's resource tracker, which unlinks the block if the parent dies
+        block = shared_memory.SharedMemory(name=column.block)
+        blocks.append(block)
+        values = np.ndarray((column.length,), dtype=np.dtype(column.dtype), buffer=block.buf)
+        if column.ordered is not None:
+            values = pd.Categorical.from_codes(values, list(column.categories), ordered=column.ordered)
+        elif column.categories is not None:
+            # Code -1 (missing) picks the trailing NaN
+            values = np.array(column.categories + (np.nan,), dtype=object)[values]
+        data[column.name] = values
+
+    dataset = Dataset(None, shared_dataset.variables, shared_dataset.pid_col_name, None, shared_dataset.chunk_size)
+    dataset.data = pd.DataFrame(data, copy=False)
+    dataset.weights_col_name = shared_dataset.weights_col_name # validated by the parent
+    _attached[shared_dataset.token] = (dataset, blocks)
+    return dataset
+
+
+def _detach():
+    for token in list(_attached):
+        _, blocks = _attached.pop(token)
+        for block in blocks:
+            with contextlib.suppress(BufferError): # arrays of the old dataset are still referenced
+                block.close()
+
+
+def _run(shared_dataset: SharedDataset, function, args):
+    return function(_attach(shared_dataset), *args)
@@ -0,0 +1,212 @@
+# Per-stage timing and counters for hypothesize()/evaluate()
+# A Profile is active while an analysis runs. Instrumented code reports into the
+# active profile through stage() and count(); when nothing is being profiled
+# these are no-ops.
+# Profiles are active per thread. Work handed to other threads (e.g., tests run
+# concurrently) reports into the submitting thread's profile through carry().
+# The CPU time of a stage is that of the thread that ran it, so concurrent stages
+# do not count each other's time; the CPU time of a Profile is the process's
+# (all threads) over the whole analysis.
+
+import attr
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+
+# Stage names
+data_load = 'data load'
+role_assignment = 'role assignment'
+property_verification = 'property verification'
+z3_solving = 'z3 solving'
+test_execution = 'test execution'
+effect_sizes = 'effect sizes'
+rendering = 'rendering'
+follow_up = 'follow-up predictions'
+
+# Counter names
+z3_checks = 'z3 checks'
+select_calls = 'select calls'
+rows_scanned = 'rows scanned'
+index_lookups = 'index lookups'
+select_cache_hits = 'select cache hits'
+property_cache_hits = 'property cache hits'
+rank_cache_hits = 'rank cache hits'
+result_cache_hits = 'result cache hits'
+
+# Stack of active profiles of each thread; the last one receives measurements
+_local = threading.local()
+_lock = threading.Lock()
+
+
+@attr.s(init=True)
+class StageTiming(object):
+    wall = attr.ib(type=float, default=0.0)  # seconds
+    cpu = attr.ib(type=float, default=0.0)  # seconds of CPU time of the thread that ran the stage
+    calls = attr.ib(type=int, default=0)
+
+    def add(self, wall, cpu):
+        self.wall += wall
+        self.cpu += cpu
+        self.calls += 1
+
+    def as_dict(self):
+        return {'wall': self.wall, 'cpu': self.cpu, 'calls': self.calls}
+
+
+@attr.s(init=True, repr=False)
+class Profile(object):
+    # stage name -> StageTiming, in the order stages were first entered
+    stages = attr.ib(factory=OrderedDict)
+    # stage name -> {detail (e.g., property or test name) -> StageTiming}
+    details = attr.ib(factory=dict)
+    counters = attr.ib(factory=OrderedDict)
+    # Profiles of follow-up predictions evaluated while this profile was active
+    follow_ups = attr.ib(factory=list)
+    wall = attr.ib(type=float, default=0.0)
+    cpu = attr.ib(type=float, default=0.0)
+    # Set once a ResultData takes ownership of this profile
+    claimed = attr.ib(type=bool, default=False)
+
+    def record(self, stage: str, wall: float, cpu: float, detail=None):
+        with _lock:
+            if stage not in self.stages:
+                self.stages[stage] = StageTiming()
+            self.stages[stage].add(wall, cpu)
+            if detail is not None:
+                breakdown = self.details.setdefault(stage, OrderedDict())
+                if detail not in breakdown:
+                    breakdown[detail] = StageTiming()
+                breakdown[detail].add(wall, cpu)
+
+    def count(self, counter: str, n=1):
+        with _lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    # Timing for each verified property, keyed by property and variables
+    @property
+    def properties(self):
+        return self.details.get(property_verification, {})
+
+    # Timing for each executed statistical test
+    @property
+    def tests(self):
+        return self.details.get(test_execution, {})
+
+    def as_dict(self):
+        return {
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'stages': {k: v.as_dict() for k, v in self.stages.items()},
+            'details': {s: {k: v.as_dict() for k, v in d.items()} for s, d in self.details.items()},
+            'counters': dict(self.counters),
+            'follow_ups': [f.as_dict() for f in self.follow_ups],
+        }
+
+    def __str__(self):
+        output = f"Profile: wall = {self.wall:.4f}s, cpu = {self.cpu:.4f}s\n"
+        for stage, timing in self.stages.items():
+            output += f"  {stage}: wall = {timing.wall:.4f}s, cpu = {timing.cpu:.4f}s, calls = {timing.calls}\n"
+            for detail, d_timing in self.details.get(stage, {}).items():
+                output += f"    {detail}: wall = {d_timing.wall:.4f}s, cpu = {d_timing.cpu:.4f}s, calls = {d_timing.calls}\n"
+        for counter, value in self.counters.items():
+            output += f"  {counter} = {value}\n"
+        return output
+
+    def __repr__(self):
+        return f"Profile(wall={self.wall:.4f}, stages={list(self.stages)})"
+
+
+def _active():
+    if not hasattr(_local, 'profiles'):
+        _local.profiles = []
+    return _local.profiles
+
+
+def current():
+    active = _active()
+    return active[-1] if active else None
+
+
+def is_profiling():
+    return bool(_active())
+
+
+# @returns @param function, wrapped to report into the profile active in this thread
+# when it is called from another thread (e.g., submitted to a ThreadPoolExecutor)
+def carry(function):
+    profile = current()
+    if profile is None:
+        return function
+
+    def run(*args, **kwargs):
+        active = _active()
+        active.append(profile)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            active.pop()
+    return run
+
+
+# Activates a profile for the duration of the block.
+# An unclaimed active profile (e.g., opened by hypothesize() around data loading)
+# is reused so the evaluation reports into it. Otherwise a new profile is opened;
+# if another profile is active, the new one is recorded as its follow-up.
+@contextlib.contextmanager
+def profiling():
+    parent = current()
+    if parent is not None and not parent.claimed:
+        yield parent
+        return
+
+    profile = Profile()
+    if parent is not None:
+        with _lock:
+            parent.follow_ups.append(profile)
+    _active().append(profile)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield profile
+    finally:
+        profile.wall += time.perf_counter() - wall_start
+        profile.cpu += time.process_time() - cpu_start
+        _active().remove(profile)
+
+
+# Times the block into the active profile's @param name stage.
+# @param detail is a label (or a callable returning one) for the per-item
+# breakdown; callables are only invoked when profiling.
+@contextlib.contextmanager
+def stage(name: str, detail=None):
+    profile = current()
+    if profile is None:
+        yield
+        return
+
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        if callable(detail):
+            detail = detail()
+        profile.record(name, wall, cpu, detail)
+
+
+def count(counter: str, n=1):
+    profile = current()
+    if profile is not None:
+        profile.count(counter, n)
+
+
+# Marks the active profile as belonging to @param result_data
+def claim(result_data):
+    profile = current()
+    if profile is not None:
+        profile.claimed = True
+    result_data.profile = profile
+    return profile
@@ -0,0 +1,448 @@
+# Compiles the where clauses of Dataset.select (the queries of filters and
+# group splits, e.g. "x == 'a'" or "`score` < 3") into a physical plan instead
+# of running them through DataFrame.query, which scans and copies the whole
+# frame for every clause list.
+# - Equality on a column is answered from the column's group split: one pass
+#   over the column's dictionary codes (shared by every value, and cached on the
+#   Dataset) maps each value to its rows, so splitting y by the k categories of x
+#   reads x once. Membership in a list of categories is a bitmap over the codes.
+# - Equalities on nominal (or other text) columns, joined by & / | within a
+#   clause or by the clause list, are answered by bitmap algebra: each category
+#   has a packed bitmap of its rows (built on demand from the group split), and
+#   the bitmaps are ANDed and ORed a byte (8 rows) at a time.
+# - Range comparisons (<, <=, >, >=) of a numeric or ordinal column with a
+#   constant are binary searches in the column's sorted index (its rows sorted
+#   by value, built on the first range query and cached on the Dataset): the
+#   matching rows are a contiguous slice of the index.
+# - The remaining predicates are fused: each is evaluated only on the rows that
+#   survived the previous ones, without copying the frame.
+# - Duplicate clauses are evaluated once.
+# Clauses that are not simple comparisons fall back to DataFrame.eval.
+# Plan.explain() shows the operators with estimated rows and cost (rows touched).
+
+import ast
+import operator
+import re
+import attr
+import numpy as np
+import pandas as pd
+
+from tea.helpers import profiler, columnStore
+
+# Fraction of rows assumed to pass a predicate whose selectivity is not known
+range_selectivity = 1 / 3
+default_selectivity = 1 / 2
+
+_operators = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+_clause = re.compile(r"^\s*(`[^`]+`|[A-Za-z_]\w*)\s*(==|!=|<=|>=|<|>|\bin\b)\s*(.+?)\s*$")
+
+_ranges = ['<', '<=', '>', '>=']
+
+_conjunction = re.compile(r"\s*&\s*|\s+and\s+")
+_disjunction = re.compile(r"\s*\|\s*|\s+or\s+")
+
+_empty = np.empty(0, dtype=np.intp)
+
+
+# Equality on a column, looked up in the column's group split
+@attr.s(init=True, frozen=True)
+class GroupLookup(object):
+    column = attr.ib()
+    value = attr.ib()
+
+    def apply(self, frame, positions, dataset):
+        rows = groups(dataset, self.column).get(self.value, _empty)
+        return rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+
+    def estimate(self, frame, rows, dataset):
+        return min(rows, len(groups(dataset, self.column).get(self.value, _empty))), 0
+
+    def __str__(self):
+        return f"GroupLookup {self.column} == {self.value!r}"
+
+
+# Conjunction of disjunctions of equalities on nominal columns, answered from their bitmap indexes
+@attr.s(init=True, frozen=True)
+class Bitmap(object):
+    clauses = attr.ib(type=tuple)  # tuple (AND) of tuples (OR) of (column, value)
+
+    # @returns the packed bitmap of the rows that satisfy the predicate
+    def bits(self, dataset):
+        conjunction = None
+        for clause in self.clauses:
+            disjunction = None
+            for column, value in clause:
+                bitmap = bitmap_index(dataset, column).bitmap(value)
+                disjunction = bitmap if disjunction is None else disjunction | bitmap
+            conjunction = disjunction if conjunction is None else conjunction & disjunction
+        return conjunction
+
+    def apply(self, frame, positions, dataset):
+        rows = np.flatnonzero(np.unpackbits(self.bits(dataset), count=len(frame)))
+        return rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+
+    def estimate(self, frame, rows, dataset):
+        return min(rows, int(np.unpackbits(self.bits(dataset), count=len(frame)).sum())), 0
+
+    def __str__(self):
+        clauses = [' | '.join(f"{column} == {value!r}" for column, value in clause) for clause in self.clauses]
+        return "Bitmap " + ' & '.join(c if len(clause) == 1 else f"({c})" for c, clause in zip(clauses, self.clauses))
+
+
+# Range comparison of a column with a constant, looked up in the column's sorted index
+@attr.s(init=True, frozen=True)
+class RangeLookup(object):
+    column = attr.ib()
+    op = attr.ib()
+    value = attr.ib()
+
+    # The scan that replaces the lookup once earlier predicates have narrowed the rows
+    # (fewer rows are left than the index would return, so they are compared directly)
+    def scan(self):
+        return Compare(self.column, self.op, self.value)
+
+    def apply(self, frame, positions, dataset):
+        if positions is not None:
+            return self.scan().apply(frame, positions, dataset)
+        profiler.count(profiler.index_lookups)
+        return sorted_index(dataset, self.column).range(self.op, self.value)
+
+    def estimate(self, frame, rows, dataset):
+        index = sorted_index(dataset, self.column)
+        return min(rows, index.count(self.op, self.value)), 0
+
+    def __str__(self):
+        return f"RangeLookup {self.column} {self.op} {self.value!r}"
+
+
+# Comparison of a column with a constant (broadcast) or, if @param other_column, with another column
+@attr.s(init=True, frozen=True)
+class Compare(object):
+    column = attr.ib()
+    op = attr.ib()
+    value = attr.ib()
+    other_column = attr.ib(default=False)
+
+    def apply(self, frame, positions, dataset):
+        lhs = _read(frame, self.column, positions)
+        rhs = _read(frame, self.value, positions) if self.other_column else self.value
+        return _select(positions, _operators[self.op](lhs, rhs))
+
+    def estimate(self, frame, rows, dataset):
+        selectivity = default_selectivity if self.op in ['==', '!='] else range_selectivity
+        return rows * selectivity, rows
+
+    def __str__(self):
+        value = f"`{self.value}`" if self.other_column else repr(self.value)
+        return f"Filter {self.column} {self.op} {value}"
+
+
+# Membership of a column's values in a list of constants
+@attr.s(init=True, frozen=True)
+class Membership(object):
+    column = attr.ib()
+    values = attr.ib(type=tuple)
+
+    def apply(self, frame, positions, dataset):
+        if isinstance(frame[self.column].dtype, pd.CategoricalDtype):
+            # Bitmap over the dictionary codes
+            mask = columnStore.store(dataset).column(self.column).mask(self.values)
+            return _select(positions, mask if positions is None else mask[positions])
+        return _select(positions, _read(frame, self.column, positions).isin(self.values))
+
+    def estimate(self, frame, rows, dataset):
+        return rows * default_selectivity, rows
+
+    def __str__(self):
+        return f"Filter {self.column} in {list(self.values)!r}"
+
+
+# Any other clause, evaluated by pandas on every row
+@attr.s(init=True, frozen=True)
+class Expression(object):
+    text = attr.ib()
+
+    def apply(self, frame, positions, dataset):
+        mask = frame.eval(self.text)
+        if positions is not None:
+            mask = mask.iloc[positions]
+        return _select(positions, mask)
+
+    def estimate(self, frame, rows, dataset):
+        return rows * default_selectivity, len(frame)
+
+    def __str__(self):
+        return f"Eval {self.text}"
+
+
+def _read(frame, column, positions):
+    values = frame[column]
+    return values if positions is None else values.iloc[positions]
+
+
+# @returns the positions (among @param positions, or all rows) where @param mask holds
+def _select(positions, mask):
+    selected = np.flatnonzero(np.asarray(mask, dtype=bool))
+    return selected if positions is None else positions[selected]
+
+
+# @returns the predicate for one where @param clause over the columns of @param frame
+def compile_clause(frame, clause: str):
+    bitmap = _compile_bitmap(frame, clause)
+    if bitmap:
+        return bitmap
+
+    match = _clause.match(clause)
+    if not match:
+        return Expression(clause)
+
+    column, op, rhs = match.groups()
+    column = column.strip('`')
+    if column not in frame.columns:
+        return Expression(clause)
+
+    rhs_column = rhs.strip('`') if rhs.startswith('`') and rhs.endswith('`') else rhs
+    if rhs_column in frame.columns and (rhs_column != rhs or rhs.isidentifier()):
+        if op == 'in':
+            return Expression(clause)
+        return Compare(column, op, rhs_column, other_column=True)
+
+    try:
+        value = ast.literal_eval(rhs)
+    except (ValueError, SyntaxError):
+        return Expression(clause)
+
+    if op == 'in':
+        if not isinstance(value, (list, tuple)):
+            return Expression(clause)
+        return Membership(column, tuple(value))
+    if op == '==' and _hashable(value) and _comparable(frame[column], value):
+        return GroupLookup(column, value)
+    if op in _ranges and _rangeable(frame[column], value):
+        return RangeLookup(column, op, value)
+    return Compare(column, op, value)
+
+
+# @returns the Bitmap predicate for a @param clause joining equalities on nominal columns
+# with & (or and) or | (or or), or None if it is not one
+def _compile_bitmap(frame, clause: str):
+    for connective, conjunctive in [(_conjunction, True), (_disjunction, False)]:
+        parts = connective.split(clause)
+        if len(parts) > 1:
+            break
+    else:
+        return None
+
+    clauses = []
+    for part in parts:
+        text = part.strip()
+        parenthesized = text.startswith('(') and text.endswith(')')
+        predicate = compile_clause(frame, text[1:-1] if parenthesized else text)
+        if isinstance(predicate, GroupLookup) and _bitmapped(frame[predicate.column]):
+            clauses.append(((predicate.column, predicate.value),))
+        elif isinstance(predicate, Bitmap) and (parenthesized or not conjunctive):
+            # & binds tighter than |, so a disjunction is a conjunct only in parentheses
+            clauses.extend(predicate.clauses)
+        else:
+            return None
+
+    if conjunctive:
+        return Bitmap(tuple(clauses))
+    if all(len(c) == 1 for c in clauses):
+        return Bitmap((tuple(c[0] for c in clauses),))
+    return None
+
+
+# Whether equalities on @param values are answered from a bitmap index (nominal and text columns)
+def _bitmapped(values):
+    return isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+# Whether looking @param value up among the values of @param values finds the same rows as comparing them
+def _comparable(values, value):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return True
+    if isinstance(value, str):
+        return values.dtype == object
+    return isinstance(value, (bool, int, float)) and pd.api.types.is_numeric_dtype(values)
+
+
+# Whether the rows of @param values in a range bounded by @param value are found by sorting the values
+def _rangeable(values, value):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.ordered and _hashable(value) and value in values.cat.categories
+    numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+    return numeric and pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+
+
+# The rows of a column that have a value, sorted by value
+@attr.s(init=True, frozen=True, slots=True)
+class SortedIndex(object):
+    order = attr.ib(repr=False)  # positions of the rows
+    keys = attr.ib(repr=False)  # their values (codes, for ordinal columns), ascending
+    dictionary = attr.ib(default=None)  # values of the codes, for ordinal columns
+
+    # @returns the slice of the index whose values satisfy op @param value
+    def _bounds(self, op: str, value):
+        key = self.dictionary.get_loc(value) if self.dictionary is not None else value
+        if op in ['<', '>=']:
+            split = np.searchsorted(self.keys, key, side='left')
+        else:
+            split = np.searchsorted(self.keys, key, side='right')
+        return (0, split) if op in ['<', '<='] else (split, len(self.keys))
+
+    # @returns the positions, in row order, of the rows whose value satisfies @param op @param value
+    def range(self, op: str, value):
+        start, stop = self._bounds(op, value)
+        return np.sort(self.order[start:stop])
+
+    def count(self, op: str, value):
+        start, stop = self._bounds(op, value)
+        return stop - start
+
+
+# Whether applying @param predicate reads its column for every remaining row,
+# given whether earlier predicates have @param narrowed the rows
+def _scans(predicate, narrowed: bool):
+    if isinstance(predicate, (GroupLookup, Bitmap)):
+        return False
+    return narrowed or not isinstance(predicate, RangeLookup)
+
+
+@attr.s(init=True, frozen=True)
+class Plan(object):
+    column = attr.ib()
+    predicates = attr.ib(type=tuple)
+
+    # @returns the positions of the rows that satisfy every predicate (None for all rows)
+    def rows(self, dataset):
+        frame = dataset.data
+        positions = None
+        for predicate in self.predicates:
+            if _scans(predicate, positions is not None):
+                profiler.count(profiler.rows_scanned, len(frame) if positions is None else len(positions))
+            positions = predicate.apply(frame, positions, dataset)
+            if not len(positions):
+                break
+        return positions
+
+    # @returns the Series of self.column for the rows that satisfy every predicate
+    def execute(self, dataset):
+        positions = self.rows(dataset)
+        values = dataset.data[self.column]
+        return values if positions is None else values.iloc[positions]
+
+    # @returns a description of the operators of the plan, with their estimated rows and cost
+    def explain(self, dataset):
+        frame = dataset.data
+        lines = [f"Scan ({len(frame)} rows)"]
+        rows = len(frame)
+        for i, predicate in enumerate(self.predicates):
+            narrowed = i > 0
+            if isinstance(predicate, RangeLookup) and narrowed:
+                rows, cost = predicate.scan().estimate(frame, rows, dataset)
+                lines.append(f"{predicate} (scan)  rows={rows:.0f} cost={cost:.0f}")
+            else:
+                rows, cost = predicate.estimate(frame, rows, dataset)
+                lines.append(f"{predicate}  rows={rows:.0f} cost={cost:.0f}")
+        lines.append(f"Project {self.column}  rows={rows:.0f}")
+        return '\n'.join(lines)
+
+
+# @returns the Plan selecting @param column of @param dataset for the rows that satisfy the @param where clauses
+def plan(dataset, column: str, where: list):
+    key = ('query plan', column, tuple(where))
+    if key not in dataset.cache:
+        predicates = []
+        for clause in dict.fromkeys(where): # without duplicates
+            predicates.append(compile_clause(dataset.data, clause))
+        predicates = _combine_bitmaps(dataset.data, predicates)
+        # Lookups first: they touch no rows once the split (or index) is made.
+        # Range lookups come last among them, as they only pay off on all rows.
+        predicates.sort(key=lambda p: 0 if isinstance(p, (Bitmap, GroupLookup)) else 1 if isinstance(p, RangeLookup) else 2)
+        dataset.cache[key] = Plan(column, tuple(predicates))
+    return dataset.cache[key]
+
+
+# @returns @param predicates with the equalities on nominal columns ANDed into one Bitmap,
+# unless there is a single equality (which its group split answers directly)
+def _combine_bitmaps(frame, predicates: list):
+    combined = [p for p in predicates if isinstance(p, Bitmap)
+                or (isinstance(p, GroupLookup) and _bitmapped(frame[p.column]))]
+    if not combined or (len(combined) == 1 and isinstance(combined[0], GroupLookup)):
+        return predicates
+    clauses = []
+    for p in combined:
+        clauses.extend(p.clauses if isinstance(p, Bitmap) else [((p.column, p.value),)])
+    return [Bitmap(tuple(dict.fromkeys(clauses)))] + [p for p in predicates if p not in combined]
+
+
+# @returns the group split of @param column of @param dataset: value -> positions of its rows
+def groups(dataset, column: str):
+    key = ('group split', column)
+    if key not in dataset.cache:
+        profiler.count(profiler.rows_scanned, len(dataset.data))
+        encoded = columnStore.store(dataset).column(column)
+        order = np.argsort(encoded.codes, kind='stable')
+        bounds = np.searchsorted(encoded.codes[order], np.arange(len(encoded.dictionary) + 1))
+        dataset.cache[key] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(encoded.dictionary)}
+    return dataset.cache[key]
+
+
+# @returns the SortedIndex of @param column of @param dataset (a numeric or ordinal column)
+def sorted_index(dataset, column: str):
+    key = ('sorted index', column)
+    if key not in dataset.cache:
+        profiler.count(profiler.rows_scanned, len(dataset.data))
+        values = dataset.data[column]
+        dictionary = None
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            encoded = columnStore.store(dataset).column(column)
+            keys, dictionary = encoded.codes, encoded.dictionary
+            present = keys >= 0
+        else:
+            keys = values.to_numpy()
+            present = values.notna().to_numpy()
+        order = np.flatnonzero(present)
+        order = order[np.argsort(keys[order], kind='stable')]
+        dataset.cache[key] = SortedIndex(order, keys[order], dictionary)
+    return dataset.cache[key]
+
+
+# Packed bitmaps of the rows of each value of a column, built on demand
+@attr.s(init=True, frozen=True)
+class BitmapIndex(object):
+    groups = attr.ib(repr=False)  # group split of the column
+    rows = attr.ib(type=int)
+    bitmaps = attr.ib(factory=dict, repr=False)  # value -> np.packbits of its rows
+
+    def bitmap(self, value):
+        if value not in self.bitmaps:
+            bits = np.zeros(self.rows, dtype=bool)
+            bits[self.groups.get(value, _empty)] = True
+            self.bitmaps[value] = np.packbits(bits)
+        return self.bitmaps[value]
+
+
+# @returns the BitmapIndex of @param column of @param dataset
+def bitmap_index(dataset, column: str):
+    key = ('bitmap index', column)
+    if key not in dataset.cache:
+        dataset.cache[key] = BitmapIndex(groups(dataset, column), len(dataset.data))
+    return dataset.cache[key]
@@ -0,0 +1,235 @@
+# Shared rankings for rank-based tests and effect sizes.
+# A column (or the pooled groups of a column) is sorted once: the Ranking
+# keeps the average ranks and tie information, and is cached on the Dataset so
+# every rank-based test and A12 on the same data reuses it.
+# Frequency-weighted rows are ranked as they are: each value gets the average
+# rank of the observations it stands for, and ties count all of them.
+# Statistics follow scipy.stats; cases where scipy computes exact p-values
+# (small samples without ties) are left to scipy.
+
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import profiler
+
+import attr
+import numpy as np
+from scipy import stats
+
+
+@attr.s(init=True, eq=False)
+class Ranking(object):
+    ranks = attr.ib()  # average rank (from 1) of each value, in the order of the values
+    order = attr.ib()  # indices that sort the values
+    tie_term = attr.ib(type=float)  # sum of t^3 - t over runs of t tied observations
+    counts = attr.ib(default=None)  # number of observations of each value (None if one each)
+
+    @property
+    def n(self):
+        return len(self.ranks) if self.counts is None else int(self.counts.sum())
+
+    # @returns the rank of each observation (values repeated by their counts)
+    def observation_ranks(self):
+        return self.ranks if self.counts is None else np.repeat(self.ranks, self.counts)
+
+    @property
+    def has_ties(self):
+        return self.tie_term > 0
+
+
+# @param values must not contain NaN
+# @param counts is the number of observations of each value (None if one each)
+def rank(values, counts=None):
+    values = np.asarray(values)
+    n = len(values)
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+
+    # Boundaries between runs of tied values
+    change = np.ones(n + 1, dtype=bool)
+    change[1:n] = sorted_values[1:] != sorted_values[:-1]
+    bounds = np.flatnonzero(change)
+    lengths = np.diff(bounds)
+
+    # Observations before each run, and in it
+    observations = bounds if counts is None else np.concatenate(([0], np.cumsum(counts[order])))[bounds]
+    starts = observations[:-1]
+    sizes = np.diff(observations)
+
+    ranks = np.empty(n)
+    ranks[order] = np.repeat(starts + (sizes + 1) / 2.0, lengths)
+    tie_term = float(np.sum(sizes.astype(float) ** 3 - sizes))
+    return Ranking(ranks, order, tie_term, counts)
+
+
+# Average ranks within each column and the tie term sum(t^3 - t) per column
+def rank_columns(block):
+    n, m = block.shape
+    order = np.argsort(block, axis=0, kind='mergesort')
+    sorted_block = np.take_along_axis(block, order, axis=0)
+
+    # Boundaries between runs of tied values, per column
+    change = np.ones((n + 1, m), dtype=bool)
+    change[1:n] = sorted_block[1:] != sorted_block[:-1]
+    positions = np.flatnonzero(change.T.ravel())
+    col = positions // (n + 1)
+    pos = positions % (n + 1)
+    same_col = col[1:] == col[:-1]
+    starts = pos[:-1][same_col]
+    lengths = np.diff(pos)[same_col]
+    run_col = col[1:][same_col]
+
+    # Average rank of each run, spread back over the sorted positions
+    run_rank = starts + (lengths + 1) / 2.0
+    sorted_ranks = np.repeat(run_rank, lengths).reshape(m, n).T
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=0)
+
+    tie_term = np.bincount(run_col, weights=lengths.astype(float) ** 3 - lengths, minlength=m)
+    return ranks, tie_term
+
+
+# @returns the Ranking cached on @param dataset under @param key, ranking the
+# values returned by @param get_values on first use (None if they contain NaN)
+# @param get_values returns the values, or the values and the number of observations of each
+def cached(dataset: Dataset, key: tuple, get_values):
+    key = ('ranks',) + key
+    if key in dataset.cache:
+        profiler.count(profiler.rank_cache_hits)
+        return dataset.cache[key]
+
+    values, counts = get_values(), None
+    if isinstance(values, tuple):
+        values, counts = values
+    values = np.asarray(values)
+    ranking = None
+    if not (values.dtype.kind == 'f' and np.isnan(values).any()):
+        ranking = rank(values, counts)
+    dataset.cache[key] = ranking
+    return ranking
+
+
+@attr.s(init=True, eq=False)
+class GroupedRanking(object):
+    ranking = attr.ib(type=Ranking)  # of the values of all groups pooled
+    codes = attr.ib()  # index into groups of each value
+    groups = attr.ib(type=list)
+
+    # @returns the number of observations and the sum of their ranks in each group
+    def totals(self):
+        counts = self.ranking.counts
+        counts = np.ones(len(self.codes)) if counts is None else counts.astype(float)
+        size = len(self.groups)
+        return (np.bincount(self.codes, weights=counts, minlength=size),
+                np.bincount(self.codes, weights=counts * self.ranking.ranks, minlength=size))
+
+    def count(self, group):
+        return int(self.totals()[0][self.groups.index(group)])
+
+    def rank_sum(self, group):
+        return float(self.totals()[1][self.groups.index(group)])
+
+
+# Pooled ranking of @param y_name over the rows where @param x_name is one of @param groups.
+# The same groups in any order share one ranking (e.g., a test and A12 on the same two groups).
+# @returns None if y is missing for any of those rows
+def grouped(dataset: Dataset, y_name: str, x_name: str, groups: list):
+    groups = sorted(groups, key=str)
+    key = ('grouped ranks', y_name, x_name, tuple(groups))
+    if key in dataset.cache:
+        profiler.count(profiler.rank_cache_hits)
+        return dataset.cache[key]
+
+    codes = dataset.column_store.column(x_name).recode(groups)
+    in_groups = codes >= 0
+    values = dataset.data[y_name].to_numpy(dtype=float)[in_groups]
+    weights = dataset.weights
+    grouped_ranking = None
+    if not np.isnan(values).any():
+        counts = None if weights is None else weights[in_groups]
+        grouped_ranking = GroupedRanking(rank(values, counts), codes[in_groups], groups)
+    dataset.cache[key] = grouped_ranking
+    return grouped_ranking
+
+
+# Whether scipy computes the Mann-Whitney U p-value exactly for these groups (method='auto')
+def mannwhitney_is_exact(grouped_ranking: GroupedRanking, x_group, y_group):
+    small = grouped_ranking.count(x_group) <= 8 or grouped_ranking.count(y_group) <= 8
+    return small and not grouped_ranking.ranking.has_ties
+
+
+# Two-sided Mann-Whitney U test (normal approximation with continuity and tie corrections)
+# @returns U of @param x_group and the p-value, as scipy.stats.mannwhitneyu
+def mannwhitney_u(grouped_ranking: GroupedRanking, x_group, y_group):
+    assert (len(grouped_ranking.groups) == 2)
+    n1 = grouped_ranking.count(x_group)
+    n2 = grouped_ranking.count(y_group)
+    n = n1 + n2
+    u1 = grouped_ranking.rank_sum(x_group) - n1 * (n1 + 1) / 2.0
+    u = max(u1, n1 * n2 - u1)
+    sigma = np.sqrt(n1 * n2 / 12.0 * ((n + 1) - grouped_ranking.ranking.tie_term / (n * (n - 1))))
+    z = (u - n1 * n2 / 2.0 - 0.5) / sigma
+    return u1, min(2 * stats.norm.sf(z), 1.0)
+
+
+# Kruskal-Wallis H test with tie correction, as scipy.stats.kruskal
+def kruskal(grouped_ranking: GroupedRanking):
+    ranking = grouped_ranking.ranking
+    n = ranking.n
+    counts, rank_sums = grouped_ranking.totals()
+    present = counts > 0
+    h = 12.0 / (n * (n + 1)) * np.sum(rank_sums[present] ** 2 / counts[present]) - 3 * (n + 1)
+    h /= 1 - ranking.tie_term / (n ** 3 - n)
+    return h, stats.chi2.sf(h, np.count_nonzero(present) - 1)
+
+
+# Spearman's rho of two paired rankings, as scipy.stats.spearmanr
+# (paired rankings of weighted rows share the counts)
+def spearman(x_ranking: Ranking, y_ranking: Ranking):
+    n = x_ranking.n
+    if x_ranking.counts is None:
+        rho = np.corrcoef(x_ranking.ranks, y_ranking.ranks)[0, 1]
+    else:
+        cov = np.cov(x_ranking.ranks, y_ranking.ranks, fweights=x_ranking.counts)
+        rho = cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1])
+    with np.errstate(divide='ignore'):
+        t = rho * np.sqrt((n - 2) / ((1.0 - rho) * (1.0 + rho)))
+    return rho, 2 * stats.t.sf(np.abs(t), n - 2)
+
+
+# Vargha and Delaney's A12 of @param lhs over @param rhs
+def vda(grouped_ranking: GroupedRanking, lhs, rhs):
+    m = grouped_ranking.count(lhs)
+    n = grouped_ranking.count(rhs)
+    r1 = grouped_ranking.rank_sum(lhs)
+    # A = (r1/m - (m+1)/2)/n # formula (14) in Vargha and Delaney, 2000
+    return (2 * r1 - m * (m + 1)) / (2 * n * m)  # equivalent formula to avoid accuracy errors
+
+
+# Friedman chi-square test on a subjects x conditions matrix (ranking within each subject),
+# as scipy.stats.friedmanchisquare
+def friedman(values):
+    n, k = values.shape
+    ranks, tie_term = rank_columns(values.T)  # conditions x subjects
+    rank_sums = ranks.sum(axis=1)
+    chi2 = 12.0 / (n * k * (k + 1)) * np.sum(rank_sums ** 2) - 3 * n * (k + 1)
+    chi2 /= 1 - tie_term.sum() / (n * k * (k * k - 1))
+    return chi2, stats.chi2.sf(chi2, k - 1)
+
+
+# Whether scipy uses the normal approximation for the Wilcoxon signed-rank test
+# of these differences (method='auto')
+def wilcoxon_is_asymptotic(differences):
+    return len(differences) > 50
+
+
+# Two-sided Wilcoxon signed-rank test of paired @param differences (zeros are
+# dropped), normal approximation with tie correction, as scipy.stats.wilcoxon
+# @param ranking is the Ranking of the absolute non-zero differences
+def wilcoxon(differences, ranking: Ranking):
+    d = differences[differences != 0]
+    n = len(d)
+    r_plus = ranking.ranks[d > 0].sum()
+    r_minus = ranking.ranks[d < 0].sum()
+    statistic = min(r_plus, r_minus)
+    se = np.sqrt(n * (n + 1) * (2 * n + 1) / 24.0 - ranking.tie_term / 48.0)
+    z = (statistic - n * (n + 1) / 4.0) / se
+    return statistic, 2 * stats.norm.sf(np.abs(z))
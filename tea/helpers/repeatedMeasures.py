@@ -0,0 +1,113 @@
+# Within-subjects data as a subjects x conditions matrix.
+# The data is pivoted once per (outcome, condition variable) by participant id
+# (a hash join on the participant and condition codes, O(n) however the rows
+# are ordered) and cached on the Dataset; the repeated-measures ANOVA, paired
+# t-test, Wilcoxon signed-rank and Friedman tests all read columns of the matrix.
+# Paired tests use the participants observed exactly once in every condition
+# (see SubjectMatrix.alignment); the others are reported and left out.
+
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers.logger import log_warning
+
+import attr
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+anova_columns = ['F Value', 'Num DF', 'Den DF', 'Pr > F']
+
+
+@attr.s(init=True, eq=False)
+class SubjectMatrix(object):
+    values = attr.ib()  # subjects x conditions, mean of each cell (NaN if empty)
+    counts = attr.ib()  # subjects x conditions, number of observations in each cell
+    subjects = attr.ib()  # participant id of each row
+    conditions = attr.ib(type=list)  # category of each column
+    unknown_conditions = attr.ib(type=bool)  # whether some rows have a condition not in conditions
+    _alignment = attr.ib(default=None, init=False, repr=False)
+
+    # Every subject has a (non-missing) value in every condition
+    @property
+    def complete(self):
+        return bool((self.counts > 0).all() and np.isfinite(self.values).all())
+
+    # Exactly one observation per subject and condition, so columns pair up observations
+    @property
+    def paired(self):
+        return self.complete and bool((self.counts == 1).all())
+
+    def column(self, condition):
+        return self.values[:, self.conditions.index(condition)]
+
+    # @returns the Alignment of the participants observed exactly once in every condition
+    def alignment(self):
+        if self._alignment is None:
+            matched = (self.counts == 1).all(axis=1) & np.isfinite(self.values).all(axis=1)
+            # One contiguous row per condition
+            columns = np.ascontiguousarray(self.values[matched].T)
+            self._alignment = Alignment(list(columns), self.subjects[matched], self.subjects[~matched])
+            if len(self._alignment.unmatched):
+                log_warning("%d of %d participants are not observed exactly once in each of %s and are left out "
+                            "of paired tests: %s", len(self._alignment.unmatched), len(self.subjects), self.conditions,
+                            _preview(self._alignment.unmatched))
+        return self._alignment
+
+
+# Observations of the same participants in each condition
+@attr.s(init=True, eq=False, frozen=True)
+class Alignment(object):
+    columns = attr.ib(type=list)  # per condition, a contiguous array with one value per matched participant
+    subjects = attr.ib()  # participant id of each position in the columns
+    unmatched = attr.ib()  # participant ids missing from a condition or observed more than once in one
+
+
+def _preview(ids, limit: int = 10):
+    shown = ', '.join(str(i) for i in ids[:limit])
+    return shown + (', ...' if len(ids) > limit else '')
+
+
+# @returns the SubjectMatrix of @param y_name by participant and @param x_name, or
+# None if @param dataset has no participant ids
+def subject_matrix(dataset: Dataset, y_name: str, x_name: str, conditions: list):
+    pid = dataset.pid_col_name
+    if not pid or pid not in dataset.data:
+        return None
+
+    key = ('subject matrix', y_name, x_name, tuple(conditions))
+    if key not in dataset.cache:
+        data = dataset.data
+        subject_codes, subjects = pd.factorize(data[pid], sort=True)
+        condition_codes = np.asarray(pd.Categorical(data[x_name], categories=conditions).codes, dtype=np.int64)
+        y = data[y_name].to_numpy(dtype=float)
+
+        keep = (subject_codes >= 0) & (condition_codes >= 0)
+        cells = subject_codes[keep] * len(conditions) + condition_codes[keep]
+        size = len(subjects) * len(conditions)
+        weights = dataset.weights
+        weights = np.ones(np.count_nonzero(keep)) if weights is None else weights[keep].astype(float)
+        counts = np.bincount(cells, weights=weights, minlength=size).astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.bincount(cells, weights=weights * y[keep], minlength=size) / counts
+
+        dataset.cache[key] = SubjectMatrix(values.reshape(len(subjects), len(conditions)),
+                                           counts.reshape(len(subjects), len(conditions)),
+                                           subjects, list(conditions),
+                                           bool((condition_codes < 0).any()))
+    return dataset.cache[key]
+
+
+# One-way repeated-measures ANOVA on a complete subjects x conditions matrix
+# @returns a table laid out like statsmodels' AnovaRM(...).fit().anova_table
+def anova_table(matrix: SubjectMatrix, x_name: str):
+    values = matrix.values
+    num_subjects, num_conditions = values.shape
+    grand_mean = values.mean()
+
+    ss_conditions = num_subjects * np.sum((values.mean(axis=0) - grand_mean) ** 2)
+    ss_subjects = num_conditions * np.sum((values.mean(axis=1) - grand_mean) ** 2)
+    ss_error = np.sum((values - grand_mean) ** 2) - ss_conditions - ss_subjects
+
+    num_df = float(num_conditions - 1)
+    den_df = float((num_conditions - 1) * (num_subjects - 1))
+    f = (ss_conditions / num_df) / (ss_error / den_df)
+    return pd.DataFrame([[f, num_df, den_df, stats.f.sf(f, num_df, den_df)]], index=[x_name], columns=anova_columns)
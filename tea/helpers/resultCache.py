@@ -0,0 +1,142 @@
+# On-disk cache of whole analyses: the ResultData of hypothesize() for a given
+# dataset, variables, study design, assumptions, mode, hypothesis and Tea version.
+# A hit skips loading the data, verifying properties and solving.
+# Datasets are identified by a hash of the file's contents (recomputed only
+# when the file's size or modification time changes). Entries are pickles in
+# directory; the least recently used ones are evicted beyond max_bytes, and
+# entries older than max_age seconds are evicted regardless.
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+from tea.version import __version__
+
+enabled = False
+directory = Path.home() / '.tea' / 'cache'
+max_bytes = 1 << 30
+max_age = 30 * 24 * 60 * 60
+
+suffix = '.pickle'
+
+# (path, size, modification time) -> content hash
+_dataset_hashes = {}
+
+
+def configure(enable: bool = True, cache_directory=None, cache_max_bytes: int = None, cache_max_age: float = None):
+    global enabled, directory, max_bytes, max_age
+
+    enabled = enable
+    if cache_directory is not None:
+        directory = Path(cache_directory)
+    if cache_max_bytes is not None:
+        max_bytes = cache_max_bytes
+    if cache_max_age is not None:
+        max_age = cache_max_age
+
+
+# @returns the SHA-256 of the file at @param path, or None if it is not a local file
+def dataset_hash(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+    identity = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    if identity not in _dataset_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _dataset_hashes[identity] = digest.hexdigest()
+    return _dataset_hashes[identity]
+
+
+# @returns the cache key of an analysis, or None if it cannot be cached
+# @param variables are the defined Variables; the other parameters are JSON-like
+def key(dataset_path, variables: list, design, assumptions, mode, vars: list, prediction, **data_options):
+    content = dataset_hash(dataset_path)
+    if content is None:
+        return None
+
+    description = {
+        'tea': __version__,
+        'dataset': content,
+        'data options': data_options,
+        'variables': [repr(v) for v in variables],
+        'design': design,
+        'assumptions': assumptions,
+        'mode': mode,
+        'vars': vars,
+        'prediction': prediction,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def _path(cache_key: str):
+    return directory / f"{cache_key}{suffix}"
+
+
+# @returns the cached ResultData for @param cache_key, or None
+def get(cache_key: str):
+    if not enabled or cache_key is None:
+        return None
+
+    path = _path(cache_key)
+    try:
+        if time.time() - path.stat().st_mtime > max_age:
+            path.unlink()
+            return None
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+    os.utime(path) # most recently used
+    return result
+
+
+# Stores @param result_data (without its profile) under @param cache_key and evicts stale entries
+def put(cache_key: str, result_data):
+    if not enabled or cache_key is None:
+        return
+
+    stored = copy.copy(result_data)
+    stored.profile = None
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as f:
+        pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, _path(cache_key))
+    evict()
+
+
+# Removes entries older than max_age, then the least recently used until the cache fits in max_bytes
+def evict():
+    now = time.time()
+    entries = []
+    for path in directory.glob(f"*{suffix}"):
+        try:
+            stat = path.stat()
+        except OSError: # removed concurrently
+            continue
+        if now - stat.st_mtime > max_age:
+            path.unlink(missing_ok=True)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def clear():
+    for path in directory.glob(f"*{suffix}"):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,139 @@
+# Per-group summary statistics (size, mean and variance of an outcome).
+# Summaries are computed from (frequency-weighted) rows, or read from a table
+# with one row per group, and are enough for t-tests and the one-way ANOVA.
+
+from tea.runtimeDataStructures.dataset import Dataset
+
+import attr
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Tests that can run on summaries (named as the corresponding Tea tests)
+summary_tests = ['students_t', 'welchs_t', 'f_test']
+
+columns = ['test', 'statistic', 'dof', 'dof_between', 'p_value']
+
+
+@attr.s(init=True, eq=False)
+class GroupSummary(object):
+    groups = attr.ib(type=list)
+    counts = attr.ib()  # number of observations in each group
+    means = attr.ib()
+    variances = attr.ib()  # sample variances (ddof=1)
+
+    # @returns (n, mean, standard deviation) of @param group
+    def of(self, group):
+        i = self.groups.index(group)
+        return self.counts[i], self.means[i], np.sqrt(self.variances[i])
+
+
+# Summary of @param y_name for each of @param groups of @param x_name, weighting rows
+# by the dataset's frequency weights. Cached on @param dataset.
+# @returns None if y is missing for any row in the groups
+def from_data(dataset: Dataset, y_name: str, x_name: str, groups: list):
+    key = ('group summary', y_name, x_name, tuple(groups))
+    if key not in dataset.cache:
+        codes = dataset.column_store.column(x_name).recode(groups)
+        in_groups = codes >= 0
+        codes = codes[in_groups]
+        y = dataset.data[y_name].to_numpy(dtype=float)[in_groups]
+        weights = dataset.weights
+        weights = np.ones(len(y)) if weights is None else weights[in_groups].astype(float)
+
+        summary = None
+        if not np.isnan(y).any():
+            counts = np.bincount(codes, weights=weights, minlength=len(groups))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = np.bincount(codes, weights=weights * y, minlength=len(groups)) / counts
+                deviations = y - means[codes]
+                variances = np.bincount(codes, weights=weights * deviations * deviations, minlength=len(groups)) / (counts - 1)
+            summary = GroupSummary(list(groups), counts, means, variances)
+        dataset.cache[key] = summary
+    return dataset.cache[key]
+
+
+# @param data has one row per group with its @param mean, standard deviation @param sd and size @param n
+def from_table(data: pd.DataFrame, group: str, mean: str, sd: str, n: str):
+    return GroupSummary(list(data[group]),
+                        data[n].to_numpy(dtype=float),
+                        data[mean].to_numpy(dtype=float),
+                        data[sd].to_numpy(dtype=float) ** 2)
+
+
+# @returns the t statistic and two-sided p-value comparing @param lhs to @param rhs
+def t_test(summary: GroupSummary, lhs, rhs, equal_var: bool = True):
+    n1, mean1, sd1 = summary.of(lhs)
+    n2, mean2, sd2 = summary.of(rhs)
+    return stats.ttest_ind_from_stats(mean1, sd1, n1, mean2, sd2, n2, equal_var=equal_var)
+
+
+# One-way ANOVA across all groups
+# @returns F, the within and between degrees of freedom and the p-value
+def one_way_anova(summary: GroupSummary):
+    present = summary.counts > 0
+    counts = summary.counts[present]
+    means = summary.means[present]
+    variances = summary.variances[present]
+
+    n = counts.sum()
+    grand_mean = np.sum(counts * means) / n
+    ss_between = np.sum(counts * (means - grand_mean) ** 2)
+    ss_within = np.sum((counts - 1) * variances)
+    dof_between = len(counts) - 1
+    dof_within = n - len(counts)
+    f = (ss_between / dof_between) / (ss_within / dof_within)
+    return f, dof_within, dof_between, stats.f.sf(f, dof_between, dof_within)
+
+
+# @returns the median of @param values, each observed @param counts times
+def weighted_median(values, counts):
+    order = np.argsort(values, kind='mergesort')
+    observations = np.cumsum(counts[order])
+    n = observations[-1]
+    # Values at the two middle observations (the same one if n is odd)
+    middle = np.searchsorted(observations, [(n - 1) // 2, n // 2], side='right')
+    return values[order][middle].mean()
+
+
+# Levene test (centered at the medians) on frequency-weighted rows, as scipy.stats.levene
+# @param samples are the values of each group and @param weights their frequency weights
+# @returns W and the p-value
+def levene(samples: list, weights: list):
+    samples = [np.asarray(y, dtype=float) for y in samples]
+    counts = np.array([w.sum() for w in weights], dtype=float)
+    deviations = [np.abs(y - weighted_median(y, w)) for y, w in zip(samples, weights)]
+    means = np.array([np.sum(w * z) / n for z, w, n in zip(deviations, weights, counts)])
+
+    k = len(samples)
+    n = counts.sum()
+    grand_mean = np.sum(counts * means) / n
+    ss_between = np.sum(counts * (means - grand_mean) ** 2)
+    ss_within = np.sum([np.sum(w * (z - m) ** 2) for z, w, m in zip(deviations, weights, means)])
+    statistic = (n - k) / (k - 1) * ss_between / ss_within
+    return statistic, stats.f.sf(statistic, k - 1, n - k)
+
+
+# Runs @param tests (default: students_t and welchs_t for two groups, f_test otherwise)
+# @returns a DataFrame with one row per test
+def test_summary(summary: GroupSummary, tests: list = None):
+    tests = tests if tests else (summary_tests[:2] if len(summary.groups) == 2 else summary_tests[2:])
+    rows = []
+    for test in tests:
+        if test not in summary_tests:
+            raise ValueError(f"{test} cannot run on summary statistics. Supported tests: {summary_tests}")
+        if test == 'f_test':
+            f, dof_within, dof_between, p = one_way_anova(summary)
+            rows.append([test, f, dof_within, dof_between, p])
+        else:
+            if len(summary.groups) != 2:
+                raise ValueError(f"{test} requires exactly two groups, but received {len(summary.groups)}")
+            t, p = t_test(summary, summary.groups[0], summary.groups[1], equal_var=(test == 'students_t'))
+            n1, n2 = summary.counts
+            if test == 'students_t':
+                dof = n1 + n2 - 2
+            else: # Welch-Satterthwaite
+                se1, se2 = summary.variances / summary.counts
+                dof = (se1 + se2) ** 2 / (se1 ** 2 / (n1 - 1) + se2 ** 2 / (n2 - 1))
+            rows.append([test, t, dof, np.nan, p])
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,127 @@
+# Checks loaded data against the declared variables: values of nominal and
+# ordinal columns must be among their categories, and values of numeric columns
+# must be numbers within their range (if declared). Each column is checked with
+# one vectorized pass (isin, or a range comparison); missing values are not
+# violations. The outcome is a ValidationReport kept on the Dataset.
+# Policies for violations:
+#   'warn': log them and keep the data as is (default)
+#   'coerce': log them and treat the violating values as missing
+#   'drop': log them and drop the rows with a violation in any declared column
+#   'error': raise a ValueError describing them
+
+import attr
+import numpy as np
+import pandas as pd
+
+from tea.ast import DataType
+from tea.helpers.logger import log_warning
+
+warn_policy = 'warn'
+coerce_policy = 'coerce'
+drop_policy = 'drop'
+error_policy = 'error'
+policies = [warn_policy, coerce_policy, drop_policy, error_policy]
+
+# Distinct violating values shown per variable
+sample_size = 5
+
+
+@attr.s(init=True, frozen=True)
+class Violation(object):
+    variable = attr.ib(type=str)
+    kind = attr.ib(type=str)  # 'category', 'range', 'type' or 'missing column'
+    count = attr.ib(type=int)  # number of violating rows
+    samples = attr.ib(type=tuple, default=())  # some of the violating values
+
+    def __str__(self):
+        if self.kind == 'missing column':
+            return f"{self.variable}: no column in the data"
+        expected = {'category': 'among the declared categories', 'range': 'within the declared range', 'type': 'numbers'}
+        samples = ', '.join(repr(s) for s in self.samples)
+        return f"{self.variable}: {self.count} values are not {expected[self.kind]} (e.g., {samples})"
+
+
+@attr.s(init=True, frozen=True)
+class ValidationReport(object):
+    policy = attr.ib(type=str)
+    rows = attr.ib(type=int)  # rows checked
+    violations = attr.ib(type=tuple, default=())
+    rows_dropped = attr.ib(type=int, default=0)
+
+    @property
+    def valid(self):
+        return not self.violations
+
+    def __str__(self):
+        if self.valid:
+            return f"All {self.rows} rows match the declared variables."
+        lines = [f"The data does not match the declared variables ({self.policy} policy):"]
+        lines += [f"  {v}" for v in self.violations]
+        if self.rows_dropped:
+            lines.append(f"  {self.rows_dropped} of {self.rows} rows were dropped.")
+        return '\n'.join(lines)
+
+
+def _samples(values: pd.Series):
+    return tuple(v.item() if isinstance(v, np.generic) else v for v in values.unique()[:sample_size])
+
+
+# @returns the (kind of violation, mask of violating rows) checks of @param values against
+# the declaration of @param var, and the values to keep under the coerce policy
+def _check(var, values: pd.Series):
+    present = values.notna().to_numpy()
+    if var.dtype is DataType.NOMINAL or var.dtype is DataType.ORDINAL:
+        if not var.categories:
+            return [], values
+        return [('category', present & ~values.isin(list(var.categories)).to_numpy())], values
+
+    numbers = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+    checks = [('type', present & numbers.isna().to_numpy())]
+    if var.drange:
+        low, high = var.drange
+        checks.append(('range', ((numbers < low) | (numbers > high)).to_numpy()))
+    return checks, numbers
+
+
+# Validates the data of @param dataset against its variables, applying @param policy
+# @returns the ValidationReport, also kept as dataset.validation
+def validate(dataset, policy: str = warn_policy):
+    if policy not in policies:
+        raise ValueError(f"Unknown validation policy {policy}; use one of {policies}")
+    if dataset.validation is not None and dataset.validation.policy == policy:
+        return dataset.validation
+
+    data = dataset.data
+    violations = []
+    violating_rows = np.zeros(len(data), dtype=bool)
+    coerced = {}
+    for var in dataset.variables:
+        if var.name not in data.columns:
+            violations.append(Violation(var.name, 'missing column', 0))
+            continue
+        values = data[var.name]
+        checks, coerced_values = _check(var, values)
+        column_violations = np.zeros(len(data), dtype=bool)
+        for kind, mask in checks:
+            if mask.any():
+                violations.append(Violation(var.name, kind, int(mask.sum()), _samples(values[mask])))
+                column_violations |= mask
+        if column_violations.any():
+            violating_rows |= column_violations
+            coerced[var.name] = coerced_values.mask(column_violations)
+
+    report = ValidationReport(policy, len(data), tuple(violations))
+    if violations:
+        if policy == error_policy:
+            raise ValueError(str(report))
+        if policy == coerce_policy:
+            dataset.data = data.assign(**coerced)
+            dataset.cache.clear()
+        elif policy == drop_policy:
+            dataset.data = data[~violating_rows]
+            dataset.cache.clear()
+            report = attr.evolve(report, rows_dropped=int(violating_rows.sum()))
+        log_warning("%s", report)
+
+    dataset.validation = report
+    return report
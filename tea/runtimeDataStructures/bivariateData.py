@@ -2,6 +2,6 @@ import attr
 from .combinedData import CombinedData
 
 
-@attr.s(init=True, auto_attribs=True)
+@attr.s(init=True, auto_attribs=True, frozen=True, slots=True)
 class BivariateData(CombinedData):
     pass
\ No newline at end of file
@@ -1,20 +1,25 @@
 from tea.global_vals import *
 from tea.ast import *
 import attr
-from .value import Value
+from .value import Value, intern
 
 # CombinedData is the runtime data structure used to unify experimental design and variable declarations
-@attr.s(init=True)
+# Immutable: adding properties makes a new CombinedData that shares the VarData objects (see with_properties)
+@attr.s(init=True, frozen=True, slots=True)
 class CombinedData(Value):
-    vars = attr.ib(default=[]) # list of VarData objects 
-    study_type = attr.ib(default=observational_identifier)
+    vars = attr.ib(factory=list) # list of VarData objects, explanatory variables first
+    study_type = attr.ib(default=observational_identifier, converter=intern)
     # set of characteristics about the groups that are used to determine statistical test
     alpha = attr.ib(type=float, default=0.05)
-    properties = attr.ib(default=dict())
-    
+    properties = attr.ib(factory=dict)
+
+    def __attrs_post_init__(self):
+        # Order variables so that the explained (y) variables are at the end
+        object.__setattr__(self, 'vars', self.get_explanatory_variables() + self.get_explained_variables())
 
-    def _update_vars(self):
-        self.vars = self.get_explanatory_variables() + self.get_explained_variables()
+    # @param properties are added to (or replace) this CombinedData's properties
+    def with_properties(self, properties: dict):
+        return attr.evolve(self, properties={**self.properties, **properties})
 
     # Null Hypothesis: Groups come from populations with equal variance
     def has_equal_variance(self): 
@@ -1,4 +1,6 @@
 import attr
+import contextlib
+import numpy as np
 import pandas as pd
 import os
 import csv
@@ -6,6 +8,8 @@ from pathlib import Path
 from urllib.parse import urlparse
 import requests
 
+from tea.helpers import profiler, queryPlan, columnStore
+
 BASE_PATH = os.getcwd()
 
 
@@ -18,9 +22,14 @@ class Dataset(object):
     dfile = attr.ib()  # path name
     variables = attr.ib()  # list of Variable objects <-- TODO: may not need this in new implementation....
     pid_col_name = attr.ib()  # name of column in pandas DataFrame that has participant ids
+    weights_col_name = attr.ib(default=None)  # name of column with the number of observations each row stands for
+    chunk_size = attr.ib(default=None)  # if set, kernels that support it read the data this many rows at a time
     row_pids = attr.ib(init=False)  # list of unique participant ids
     data = attr.ib(init=False)  # pandas DataFrame
-    
+    select_cache = attr.ib(init=False, default=None, eq=False, hash=False, repr=False)  # see cached_selects()
+    cache = attr.ib(init=False, factory=dict, eq=False, hash=False, repr=False)  # data derived once per dataset (e.g., design matrices)
+    validation = attr.ib(init=False, default=None, eq=False, hash=False, repr=False)  # validation.ValidationReport of the data, once checked
+
     @staticmethod
     def load(path: str, name):
         assert(isinstance(path, str))
@@ -59,7 +68,13 @@ class Dataset(object):
 
     def __attrs_post_init__(self):
         if self.dfile: 
-            self.data = pd.read_csv(self.dfile)
+            self.data = columnStore.encode(pd.read_csv(self.dfile), self.variables)
+
+        if self.weights_col_name:
+            weights = self.data[self.weights_col_name]
+            if not pd.api.types.is_numeric_dtype(weights) or weights.isna().any() or (weights < 0).any() \
+                    or (weights != weights.round()).any():
+                raise ValueError(f"Weights in {self.weights_col_name} must be counts (non-negative integers)")
 
         # if self.pid_col_name:
         #     # Reindex DataFrame indices to be pids
@@ -72,6 +87,31 @@ class Dataset(object):
             if v.name == var_name: 
                 return self.data[var_name]  # returns the data, not the variable object
 
+    # Dictionary-encoded columns of the data (see helpers/columnStore.py)
+    @property
+    def column_store(self):
+        return columnStore.store(self)
+
+    # Frequency weight of each row, or None if every row is one observation
+    @property
+    def weights(self):
+        if not self.weights_col_name:
+            return None
+        key = ('weights',)
+        if key not in self.cache:
+            self.cache[key] = self.data[self.weights_col_name].to_numpy(dtype=np.int64)
+        return self.cache[key]
+
+    # Yields the data @param chunk_size (default: the dataset's) rows at a time
+    def iter_chunks(self, chunk_size: int = None):
+        chunk_size = chunk_size if chunk_size else self.chunk_size
+        if not chunk_size:
+            yield self.data
+            return
+        for start in range(0, len(self.data), chunk_size):
+            profiler.count(profiler.rows_scanned, min(chunk_size, len(self.data) - start))
+            yield self.data.iloc[start:start + chunk_size]
+
     # Returns variable object -- may want to altogether replace the __getitem__
     def get_variable(self, var_name: str): 
         for v in self.variables: 
@@ -85,25 +125,58 @@ class Dataset(object):
                         'categories': v.categories} 
 
     # SQL style select
+    # Frequency-weighted rows are repeated as many times as they were observed
     def select(self, col: str, where: list = None):
+        def select_rows():
+            res, weights = self._select(col, where)
+            return res if weights is None else res.repeat(weights)
+        return self._cached_select((col, where), select_rows)
+
+    # SQL style select that keeps frequency-weighted rows as they are, for
+    # statistics that take the weights into account
+    # @returns the selected data and the weight of each row (None if rows are unweighted)
+    def select_weighted(self, col: str, where: list = None):
+        return self._cached_select(('weighted', col, where), lambda: self._select(col, where))
+
+    def _select(self, col: str, where: list):
         # TODO should check that the query is valid (no typos, etc.) before build
-
-        def build_query(where: list):
-            query = ''
-
-            # build up query based on where clauses
-            for i, e in enumerate(where):
-                query += e
-                
-                if i+1 < len(where):
-                    query += '&'
-            return query
-
-        df = self.data
         if where: # not None
-            query = build_query(where)
-            res = df.query(query)[col] # makes a copy
+            res = self.plan(col, where).execute(self)
         else: 
-            res = df[col]
-
-        return res
\ No newline at end of file
+            res = self.data[col]
+
+        weights = self.weights
+        if weights is not None:
+            weights = weights[self.data.index.get_indexer(res.index)]
+        return res, weights
+
+    def _cached_select(self, key: tuple, select_rows):
+        profiler.count(profiler.select_calls)
+        cache = self.select_cache
+        if cache is None:
+            return select_rows()
+        key = tuple(tuple(k) if isinstance(k, list) else k for k in key)
+        if key in cache:
+            profiler.count(profiler.select_cache_hits)
+        else:
+            cache[key] = select_rows()
+        return cache[key]
+
+    # @returns the queryPlan.Plan that select() runs for @param col and @param where (see its explain())
+    def plan(self, col: str, where: list):
+        return queryPlan.plan(self, col, [where] if isinstance(where, str) else where)
+
+    # Memoizes select() within the block so that work sharing the same group
+    # splits (e.g., a batch of hypotheses) selects each group once.
+    # Callers must not modify the selected data in place.
+    @contextlib.contextmanager
+    def cached_selects(self):
+        if self.select_cache is not None: # already caching
+            yield
+            return
+
+        self.select_cache = {}
+        try:
+            yield
+        finally:
+            self.select_cache = None
\ No newline at end of file
@@ -5,6 +5,7 @@ import io
 from tea.z3_solver.solver import __ALL_TESTS__
 from tea.runtimeDataStructures.value import Value
 from tea.runtimeDataStructures.combinedData import CombinedData
+from tea.runtimeDataStructures.testResult import TestResult
 from tea.global_vals import *
 
 import attr
@@ -14,10 +15,12 @@ class ResultData(Value):
     test_to_results = attr.ib(type=dict)
     test_to_assumptions = attr.ib(type=dict)
     follow_up_results = attr.ib(type=list, default=None)
+    profile = attr.ib(default=None) # tea.helpers.profiler.Profile with per-stage timings and counters
 
     def __init__(self, test_to_results, combined_data: CombinedData):
         self.test_to_results = test_to_results
         self.test_to_assumptions = {}
+        self.profile = None
         for test in __ALL_TESTS__:
             if test.name in test_to_results:
                 test_assumptions = []
@@ -49,6 +52,9 @@ class ResultData(Value):
     def bonferroni_correction(self, num_comparisons):
         for key,value in self.test_to_results.items():
             value.bonferroni_correction(num_comparisons)
+        for res in getattr(self, 'follow_up_results', None) or []:
+            if res is not None:
+                res.bonferroni_correction(num_comparisons)
         return self
 
     def _pretty_print(self):
@@ -61,7 +67,7 @@ class ResultData(Value):
             output += f"***Test assumptions:\n{test_assumptions}\n\n"
             output += "***Test results:\n"
 
-            if hasattr(results, '__dict__'):
+            if isinstance(results, TestResult):
                 # for prop, value in results.__dict__.items():
                 #     if value is None:
                 #         continue
@@ -80,13 +86,15 @@ class ResultData(Value):
                         output += f"p_value = {'%.5f'%(results.p_value)}\n"
                 if results.adjusted_p_value:
                     output += f"adjusted_p_value = {'%.5f'%(results.adjusted_p_value)}\n"
+                if results.approximation_error:
+                    output += f"approximation_error = {'%.5f'%(results.approximation_error)}\n"
                 if results.alpha:
                     output += f"alpha = {results.alpha}\n"
                 if results.dof:
                     output += f"dof = {results.dof}\n"
                 if results.table is not None:
                     output += f"table = {results.table}\n"
-                if "effect_size" in results.__dict__:
+                if results.effect_size:
                     effect_sizes = results.effect_size.items()
                     output += f"Effect size:\n"
                     for effect_size_name, effect_size_value in effect_sizes:
@@ -135,7 +143,7 @@ class ResultData(Value):
                 else:
                     print("<p>No assumptions</p>")
                 print("<h3>Results</h3>")
-                if hasattr(results, "__dict__"):
+                if isinstance(results, TestResult):
                     def dl_pair(term, definition):
                         dt = html.escape(str(term))
                         dd = html.escape(str(definition))
@@ -155,13 +163,15 @@ class ResultData(Value):
                             print(dl_pair("p_value", f"{results.p_value:.5f}"))
                     if results.adjusted_p_value:
                         print(dl_pair("adjusted_p_value", f"{results.adjusted_p_value:.5f}"))
+                    if results.approximation_error:
+                        print(dl_pair("approximation_error", f"{results.approximation_error:.5f}"))
                     if results.alpha:
                         print(dl_pair("alpha", results.alpha))
                     if results.dof:
                         print(dl_pair("dof", results.dof))
                     if results.table is not None:
                         print(dl_pair("table", results.table))
-                    if "effect_size" in results.__dict__:
+                    if results.effect_size:
                         effect_sizes = results.effect_size.items()
                         sub_dl = "<ul>"
                         for name, value in results.effect_size.items():
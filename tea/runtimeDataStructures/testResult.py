@@ -1,6 +1,6 @@
 from tea.global_vals import *
 from enum import Enum
-from .value import Value
+from .value import Value, intern
 from tea.ast import DataType, LessThan, GreaterThan, Literal, Relationship
 
 # Other
@@ -80,9 +80,9 @@ __many_groups_outcome_tests__ = {
 }
 
 
-@attr.s(init=True)
+@attr.s(init=True, slots=True)
 class TestResult(Value): 
-    name = attr.ib()
+    name = attr.ib(converter=intern)
     test_statistic = attr.ib()
     p_value = attr.ib()
     prediction = attr.ib()
@@ -96,6 +96,8 @@ class TestResult(Value):
     x = attr.ib(default=None)
     y = attr.ib(default=None)
     group_descriptive_statistics = attr.ib(default=None)
+    approximation_error = attr.ib(default=None) # bound on the error of an approximate test_statistic
+    effect_size = attr.ib(default=None) # effect size name -> value
 
     def __attrs_post_init__(self):
         self.adjust_p_val()
@@ -105,7 +107,7 @@ class TestResult(Value):
             self.null_hypothesis = self.get_null_hypothesis()
             self.set_interpretation()
         else:
-            print("No prediction specified.")
+            log_debug("No prediction specified.", test=self.name)
 
     def adjust_p_val(self):
         # Adjust p value
@@ -120,15 +122,11 @@ class TestResult(Value):
         
         # Does it already have an adjusted p value?
         if self.adjusted_p_value:
-            self.corrected_p_value = self.adjusted_p_value/(num_comparisons * 1.0)
+            self.corrected_p_value = min(self.adjusted_p_value * num_comparisons, 1.0)
 
         else: 
             if isinstance(self.p_value, float): # Self is not a result from Bootstrapping
-                self.corrected_p_value = self.p_value/(num_comparisons * 1.0)
-
-        ## FOR DEBUGGING
-        if num_comparisons != 1:
-            import pdb; pdb.set_trace()
+                self.corrected_p_value = min(self.p_value * num_comparisons, 1.0)
 
     def get_null_hypothesis(self):
         # TODO: Passing x and y seems more modular than passing string?
@@ -159,6 +157,8 @@ class TestResult(Value):
         elif self.name in __categorical_tests__:
             assert self.x
             assert self.y
+            if self._is_many_categories_table():
+                return f"There is no association between {self.x.metadata[name]} and {self.y.metadata[name]}."
             var1, var2 = self._calculate_two_group_vars()
             return __stats_tests_to_null_hypotheses__[self.name] \
                 .format(var1, var2, self.y.metadata[name])
@@ -225,6 +225,8 @@ class TestResult(Value):
             elif self.name in __many_groups_outcome_tests__:
                 stat = __test_to_statistic_of_interest__[self.name]
                 self.interpretation += f"There is a difference in {stat}s of {self.y.metadata[name]} for at least one of {self._get_all_groups()}."
+            elif self.name in __categorical_tests__ and self._is_many_categories_table():
+                self.interpretation += f"There is an association between {self.x.metadata[name]} and {self.y.metadata[name]}."
             elif self.name in __categorical_tests__:
                 var1, var2 = self._calculate_two_group_vars()
                 self.interpretation += f"There is an association between {var1} and {var2} on {self.y.metadata[name]}."
@@ -253,11 +255,9 @@ class TestResult(Value):
     #     self.self.adjusted_p_value = adjusted_p_value
 
     def add_effect_size(self, name, effect_size): 
-        if hasattr(self, 'effect_size'):
-            self.effect_size[name] = effect_size
-        else: 
-            self.effect_size = attr.ib()
-            self.effect_size = {name: effect_size}
+        if self.effect_size is None:
+            self.effect_size = {}
+        self.effect_size[name] = effect_size
 
     def add_effect_size_to_interpretation(self):
         effect_sizes = ""
@@ -272,6 +272,10 @@ class TestResult(Value):
     def add_doc(self, name, dof):
         import pdb; pdb.set_trace()
 
+    # Whether this is a test on an r x c table (x does not have exactly two categories) without a prediction
+    def _is_many_categories_table(self):
+        return not self.prediction and len(self.x.metadata[categories]) != 2
+
     def _calculate_two_group_vars(self):
         var1 = ""
         var2 = ""
@@ -1,2 +1,11 @@
+import sys
+
+
+# Runtime data structures are slotted (no per-instance __dict__), so many can be kept alive cheaply
 class Value(object):
-    pass
+    __slots__ = ()
+
+
+# @returns @param value interned if it is a string (names and roles are repeated across many objects)
+def intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
@@ -1,16 +1,25 @@
 from tea.global_vals import *
-from .value import Value
+from .value import Value, intern
 from tea.ast import DataType
 
 import attr
 
 
-@attr.s(init=True)
+# Immutable: a VarData with another role or more properties is a new VarData
+# that shares the metadata (see with_role and with_properties)
+@attr.s(init=True, frozen=True, slots=True)
 class VarData(Value):
     # dataframe: Any
     metadata = attr.ib()
-    properties = attr.ib(default=dict())
-    role = attr.ib(default=None)
+    properties = attr.ib(factory=dict)
+    role = attr.ib(default=None, converter=intern)
+
+    def with_role(self, role: str):
+        return attr.evolve(self, role=role)
+
+    # @param properties are added to (or replace) this VarData's properties
+    def with_properties(self, properties: dict):
+        return attr.evolve(self, properties={**self.properties, **properties})
 
     def is_normal(self, alpha=0.05):
         global normal_distribution
@@ -4,8 +4,11 @@ from tea.runtimeDataStructures.varData import VarData
 from tea.runtimeDataStructures.combinedData import CombinedData
 from tea.runtimeDataStructures.bivariateData import BivariateData
 from tea.helpers.evaluateHelperMethods import get_data, compute_normal_distribution, compute_eq_variance
+from tea.helpers import profiler, contingency
 
 import attr
+import contextlib
+import sys
 import z3
 from typing import Dict, List
 
@@ -96,12 +99,13 @@ def set_mode(mode):
     MODE = mode
 
 
-@attr.s(hash=False, cmp=False, auto_attribs=True, init=False)
+@attr.s(hash=False, cmp=False, auto_attribs=True, init=False, slots=True)
 class StatVar:
     name: str
+    __z3__: z3.BoolRef = attr.ib(repr=False)
 
     def __init__(self, name):
-        self.name = name
+        self.name = sys.intern(name)
         self.__z3__ = z3.Bool(self.name)
 
 
@@ -281,6 +285,7 @@ class Property:
 
 
 class AppliedProperty:
+    __slots__ = ('property', 'vars', '_name', '__z3__', 'property_test_results')
     property: Property
 
     def __init__(self, prop, pvars):
@@ -381,15 +386,9 @@ def greater_than_5_frequency(dataset: Dataset, var_data: CombinedData, alpha):
                 x_cat = [k for k , v in x.metadata[categories].items()]
                 y_cat = [k for k , v in y.metadata[categories].items()]
 
-                for xc in x_cat: 
-                    for yc in y_cat: 
-                        data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{xc}'", f"{y.metadata[name]} == '{yc}'"])                    
-
-                        # Check that the count is at least five for each of the (x,y) group pairs
-                        if len(data) < 5:
-                            return False
-                
-                return True
+                # Check that the count is at least five for each of the (x,y) group pairs
+                table = contingency.table(dataset, x.metadata[name], y.metadata[name], x_cat, y_cat)
+                return table.min_count() >= 5
             else: 
                 return False
         else: 
@@ -443,19 +442,22 @@ def has_equal_variance(dataset: Dataset, var_data: list, alpha):
         if y.is_continuous(): 
             cont_ys.append(y)
     
+    grouped_weights = [] if dataset.weights_col_name else None
     eq_var = (None, None)
     if cat_xs and cont_ys: 
         for y in ys:
             for x in xs: 
                 cat = [k for k,v in x.metadata[categories].items()]
                 for c in cat: 
-                    data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+                    data, weights = dataset.select_weighted(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
                     grouped_data.append(data)
+                    if grouped_weights is not None:
+                        grouped_weights.append(weights)
                 if isinstance(var_data, BivariateData):
                     # Equal variance
-                    eq_var = compute_eq_variance(grouped_data)
+                    eq_var = compute_eq_variance(grouped_data, grouped_weights)
                 else: 
-                    eq_var = compute_eq_variance(grouped_data)
+                    eq_var = compute_eq_variance(grouped_data, grouped_weights)
 
     if eq_var[0] is None and eq_var[1] is None:
         import pdb; pdb.set_trace()
@@ -870,12 +872,13 @@ def construct_bivariate_tests(combined_data: CombinedData):
                                             two_or_more_categories: [[x],[y]]
                                         })                       
 
+        # Exact for 2 x 2 tables, Monte Carlo for larger ones
         fishers_exact = StatisticalTest('fishers_exact', [x, y],
                                         test_properties=
                                         [bivariate, independent_obs],
                                         properties_for_vars={
                                             categorical:  [[x], [y]],
-                                            two_categories: [[x],[y]]
+                                            two_or_more_categories: [[x],[y]]
                                         })
 
         # ANOVAs
@@ -935,8 +938,70 @@ chi_square_test = StatisticalTest('chi_square', [x, y],
 """
 
 
+def _property_label(prop: AppliedProperty):
+    return f"{prop._name}({', '.join(v.name for v in prop.vars)})"
+
+
+# Checks the z3 model, recording the time spent solving
+def _check(solver):
+    profiler.count(profiler.z3_checks)
+    with profiler.stage(profiler.z3_solving):
+        return solver.check()
+
+
+# Verified property values shared across analyses of the same data (see property_cache())
+__property_cache__ = None
+
+
+# Reuses verified properties within the block. Only valid while the dataset,
+# study design and assumptions stay the same, e.g., for a batch of hypotheses.
+@contextlib.contextmanager
+def property_cache():
+    global __property_cache__
+
+    if __property_cache__ is not None: # already caching
+        yield
+        return
+
+    __property_cache__ = {}
+    try:
+        yield
+    finally:
+        __property_cache__ = None
+
+
+# Properties of individual variables (e.g., is_normal(y)) only depend on those variables
+# and the categories analyzed (follow-ups compare a subset of the categories).
+# Properties of the whole analysis (e.g., has_paired_observations) also depend on the
+# other variables and their roles.
+def _property_key(combined_data: CombinedData, prop: AppliedProperty):
+    var_categories = {v.metadata[name]: v.metadata[categories] for v in combined_data.vars}
+    analyzed = tuple(tuple(var_categories[v.name]) if var_categories.get(v.name) else None for v in prop.vars)
+    key = (_property_label(prop), alpha, analyzed)
+    if len(prop.vars) == len(combined_data.vars):
+        key += (tuple((v.metadata[name], v.role) for v in combined_data.vars),)
+    return key
+
+
 # Verify the property against data
 def verify_prop(dataset: Dataset, combined_data: CombinedData, prop:AppliedProperty):
+    cache = __property_cache__
+    if cache is not None:
+        key = _property_key(combined_data, prop)
+        if key in cache:
+            profiler.count(profiler.property_cache_hits)
+            val, prop.property_test_results = cache[key]
+            return val
+
+    with profiler.stage(profiler.property_verification, lambda: _property_label(prop)):
+        val = _verify_prop(dataset, combined_data, prop)
+
+    if cache is not None:
+        cache[key] = (val, prop.property_test_results)
+    return val
+
+
+def _verify_prop(dataset: Dataset, combined_data: CombinedData, prop:AppliedProperty):
     global alpha
 
     if len(prop.vars) == len(combined_data.vars):
@@ -1003,18 +1068,18 @@ def assume_properties(stat_var_map, assumptions: Dict[str,str], solver, dataset,
                             # CHECK ASSUMPTIONS HERE
                             val = verify_prop(dataset, combined_data, ap)
                             if MODE == 'strict': 
-                                log_debug(f"Running under STRICT mode.")
+                                log_debug("Running under STRICT mode.")
                                 if val: 
-                                    log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
+                                    log_debug("User asserted property: %s is supported by statistical checking. Tea agrees with the user.", prop.name)
                                 else: 
-                                    log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. Tea will override user assertion.") 
+                                    log_debug("User asserted property: %s, but is NOT supported by statistical checking. Tea will override user assertion.", prop.name)
                                 solver.add(ap.__z3__ == z3.BoolVal(val))
                             elif MODE == 'relaxed': 
-                                log_debug(f"Running under RELAXED mode.")
+                                log_debug("Running under RELAXED mode.")
                                 if val: 
-                                    log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
+                                    log_debug("User asserted property: %s is supported by statistical checking. Tea agrees with the user.", prop.name)
                                 else: 
-                                    log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. User assertion will be considered true.")
+                                    log_debug("User asserted property: %s, but is NOT supported by statistical checking. User assertion will be considered true.", prop.name)
                                 
                                 solver.add(ap.__z3__ == z3.BoolVal(True))
                             else: 
@@ -1028,18 +1093,18 @@ def assume_properties(stat_var_map, assumptions: Dict[str,str], solver, dataset,
                             # CHECK ASSUMPTIONS HERE
                             val = verify_prop(dataset, combined_data, ap)
                             if MODE == 'strict': 
-                                log_debug(f"Running under STRICT mode.")
+                                log_debug("Running under STRICT mode.")
                                 if val: 
-                                    log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
+                                    log_debug("User asserted property: %s is supported by statistical checking. Tea agrees with the user.", prop.name)
                                 else: 
-                                    log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. Tea will override user assertion.")
+                                    log_debug("User asserted property: %s, but is NOT supported by statistical checking. Tea will override user assertion.", prop.name)
                                 solver.add(ap.__z3__ == z3.BoolVal(val))
                             elif MODE == 'relaxed': 
-                                log_debug(f"Running under RELAXED mode.")
+                                log_debug("Running under RELAXED mode.")
                                 if val: 
-                                    log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
+                                    log_debug("User asserted property: %s is supported by statistical checking. Tea agrees with the user.", prop.name)
                                 else: 
-                                    log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. User assertion will be considered true.")
+                                    log_debug("User asserted property: %s, but is NOT supported by statistical checking. User assertion will be considered true.", prop.name)
                                 solver.add(ap.__z3__ == z3.BoolVal(True)) # override user
                             else: 
                                 raise ValueError(f"Invalid MODE: {MODE}")
@@ -1068,8 +1133,7 @@ def synthesize_tests(dataset: Dataset, assumptions: Dict[str,str], combined_data
     global name
     stat_var_map = {}
 
-    # Reorder variables so that y var is at the end
-    combined_data._update_vars() 
+    # Variables are ordered so that the y var is at the end (see CombinedData)
 
     # Compute unique statisical variable names from the combined data.
     combined_data_vars = []
@@ -1098,17 +1162,17 @@ def synthesize_tests(dataset: Dataset, assumptions: Dict[str,str], combined_data
     # For each test, add it to the solver as a constraint. 
     # Add the tests and their properties
     for test in all_tests():
-        log_debug(f"\nCurrently considering {test.name}")
+        log_debug("\nCurrently considering %s", test.name)
         solver.add(test.__z3__ == z3.And(*test.query()))
         solver.add(test.__z3__ == z3.BoolVal(True))
 
         # Check the model 
-        result = solver.check()
+        result = _check(solver)
         if result == z3.unsat:
-            log_debug("Test is unsat.\n")
+            log_debug("Test is unsat.\n", test=test.name)
             solver.pop() 
         elif result == z3.unknown:
-            print("failed to solve")
+            log_warning("Failed to solve while considering %s", test.name)
             try:
                 pass
             except z3.Z3Exception:
@@ -1123,22 +1187,22 @@ def synthesize_tests(dataset: Dataset, assumptions: Dict[str,str], combined_data
                 # Verify the properties for that test
                 for prop in test._properties:
                     if is_assumed_prop(assumed_props, prop):
-                        log_debug(f"User asserted property: {prop._name}.")
+                        log_debug("User asserted property: %s.", prop._name)
                         val = True
                         solver.add(prop.__z3__ == z3.BoolVal(val))
                         # import pdb; pdb.set_trace()
                     else: 
-                        log_debug(f"Testing assumption: {prop._name}.")
+                        log_debug("Testing assumption: %s.", prop._name, test=test.name, property=prop._name)
                     
                         # Does this property need to hold for the test to be valid?
                         # If so, verify that the property does hold
                         if model and z3.is_true(model.evaluate(prop.__z3__)):
                             val = verify_prop(dataset, combined_data, prop)
                             if val: 
-                                log_debug(f"Property holds.")
+                                log_debug("Property holds.", test=test.name, property=prop._name, holds=True)
                             else: # The property does not verify
                                 assert (val == False)
-                                log_debug(f"Property FAILS")
+                                log_debug("Property FAILS", test=test.name, property=prop._name, holds=False)
                                 # if not test_invalid: 
                                 solver.pop() # remove the last test
                                 test_invalid = True
@@ -1151,7 +1215,7 @@ def synthesize_tests(dataset: Dataset, assumptions: Dict[str,str], combined_data
 
         
         
-    solver.check()
+    _check(solver)
     # import pdb; pdb.set_trace()
     model = solver.model() # final model
     tests_to_conduct = []
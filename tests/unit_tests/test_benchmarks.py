@@ -0,0 +1,34 @@
+from benchmarks.generators import all_designs, generate
+from benchmarks.run import compare, failures
+from benchmarks import memory
+
+import pandas as pd
+
+
+def test_generators_are_seeded():
+    for design in all_designs():
+        first = generate(design, 200, seed=3)
+        second = generate(design, 200, seed=3)
+        assert first.rows == 200
+        pd.testing.assert_frame_equal(first.data, second.data)
+        for v in first.variables:
+            assert v['name'] in first.data.columns
+
+
+def test_compare_flags_regressions():
+    baseline = [{'design': 'paired', 'rows': 1000, 'status': 'ok', 'wall': 1.0}]
+    current = [{'design': 'paired', 'rows': 1000, 'status': 'ok', 'wall': 1.1},
+               {'design': 'paired', 'rows': 1000, 'status': 'ok', 'wall': 2.0}]
+    assert compare(baseline, current, 0.25) == []
+    assert compare(baseline, current[1:], 0.25) == [('paired', 1000, 1.0, 2.0)]
+
+    crashed = {'design': 'paired', 'rows': 1000, 'status': 'error', 'wall': 0.1, 'error': 'ValueError: boom'}
+    assert compare(baseline, [crashed], 0.25) == []
+    assert failures(current + [crashed]) == [crashed]
+
+
+def test_memory_reports_bytes_per_object():
+    records = list(memory.run(count=50))
+    assert [r['structure'] for r in records] == list(memory.structures)
+    for record in records:
+        assert record['bytes per object'] > 0
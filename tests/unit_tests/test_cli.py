@@ -0,0 +1,71 @@
+from tea import cli
+import tea
+
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def write_spec(tmp_path, suffix='.json'):
+    rng = np.random.default_rng(12)
+    n = 120
+    data = pd.DataFrame({'cohort': np.resize(['a', 'b'], n)})
+    for i in range(3):
+        data[f"m{i}"] = rng.normal(0, 1, n) + (data['cohort'] == 'b') * 0.4 * i
+    data.to_csv(tmp_path / 'sweep.csv', index=False)
+
+    spec = {'data': 'sweep.csv',
+            'variables': [{'name': 'cohort', 'data type': 'nominal', 'categories': ['a', 'b']}] +
+                         [{'name': f"m{i}", 'data type': 'ratio'} for i in range(3)],
+            'design': {'study type': 'observational study', 'contributor variables': 'cohort',
+                       'outcome variables': [f"m{i}" for i in range(3)]},
+            'assumptions': {'Type I (False Positive) Error Rate': 0.05},
+            'hypotheses': [{'vars': ['cohort', f"m{i}"], 'prediction': ['cohort:a < b']} for i in range(3)],
+            'correction': 'bonferroni'}
+    path = tmp_path / f"spec{suffix}"
+    with open(path, 'w') as f:
+        if suffix == '.yaml':
+            import yaml
+            yaml.safe_dump(spec, f)
+        else:
+            json.dump(spec, f)
+    return path
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_run_spec_matches_hypothesize_many(tmp_path):
+    spec = write_spec(tmp_path)
+    assert cli.main([str(spec), '--output', str(tmp_path / 'out.jsonl'), '--log-level', 'quiet']) == 0
+    records = read_jsonl(tmp_path / 'out.jsonl')
+
+    expected = tea.hypothesize_many([(['cohort', f"m{i}"], ['cohort:a < b']) for i in range(3)], correction='bonferroni')
+    tea.configure_logging(level='info')
+    assert len(records) == sum(len(r.test_to_results) for r in expected)
+    for record in records:
+        test_result = expected[record['hypothesis']].test_to_results[record['test']]
+        assert record['p_value'] == test_result.p_value
+        assert np.isclose(record['corrected_p_value'], test_result.corrected_p_value)
+
+
+def test_resume_from_checkpoint(tmp_path):
+    pytest.importorskip('yaml')
+    spec = write_spec(tmp_path, '.yaml')
+    output = tmp_path / 'out.csv'
+    full = cli.run(str(spec), str(output), batch_size=1)
+
+    # Interrupted after the first hypothesis, halfway through writing the second
+    checkpoint = tmp_path / 'out.csv.checkpoint'
+    lines = checkpoint.read_text().splitlines(keepends=True)
+    checkpoint.write_text(''.join(lines[:2]) + lines[2][:20])
+    output.unlink()
+
+    resumed = cli.run(str(spec), str(output), batch_size=1, resume=True)
+    tea.configure_logging(level='info')
+    assert resumed == full
+    assert len(pd.read_csv(output)) == len(full)
+    assert len(checkpoint.read_text().splitlines()) == 4
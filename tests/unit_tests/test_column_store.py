@@ -0,0 +1,53 @@
+from tea.ast import DataType, Variable
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import columnStore
+
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+size = Variable.from_spec('size', DataType.ORDINAL, OrderedDict([('small', 1), ('medium', 2), ('large', 3)]))
+group = Variable.from_spec('group', DataType.NOMINAL, OrderedDict([('b', -1), ('a', -1)]))
+count = Variable.from_spec('count', DataType.RATIO)
+score = Variable.from_spec('score', DataType.RATIO)
+
+
+def test_loaded_data_is_encoded(tmp_path):
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'size': ['large', 'small', 'medium', None, 'huge'],
+                  'group': ['a', 'b', 'c', 'a', 'b'],
+                  'count': [1, 200, 3, 4, 5],
+                  'score': [0.1, 0.2, 0.3, 0.4, 0.5]}).to_csv(path, index=False)
+    dataset = Dataset(str(path), [size, group, count, score], None)
+    data = dataset.data
+
+    assert list(data['size'].cat.categories) == ['small', 'medium', 'large', 'huge']
+    assert data['size'].cat.ordered
+    assert data['size'].cat.codes.tolist() == [2, 0, 1, -1, 3]
+    assert data['size'].cat.codes.dtype == np.int8
+    assert list(data['group'].cat.categories) == ['b', 'a', 'c']
+    assert data['count'].dtype == np.int16
+    assert data['score'].dtype == np.float64
+    assert (data['size'] >= 'medium').tolist() == [True, False, True, False, True]
+
+
+def test_store_codes_masks_and_recodes():
+    dataset = Dataset(None, [group], None)
+    dataset.data = pd.DataFrame({'group': ['a', 'c', 'b', None, 'a']})
+    column = dataset.column_store.column('group')
+
+    assert list(column.dictionary) == ['a', 'c', 'b']
+    assert column.codes.tolist() == [0, 1, 2, -1, 0]
+    assert column.mask(['a', 'b', 'z']).tolist() == [True, False, True, False, True]
+    assert column.recode(['b', 'a']).tolist() == [1, -1, 0, -1, 1]
+    assert dataset.column_store.column('group') is column
+
+
+def test_encoding_saves_memory():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'group': rng.choice(['control', 'treatment'], 10000),
+                         'count': rng.integers(0, 100, 10000)})
+    encoded = columnStore.encode(data, [group, count])
+    assert encoded.memory_usage(deep=True).sum() < data.memory_usage(deep=True).sum() / 10
+    assert (encoded['group'].astype(object) == data['group']).all()
+    assert (encoded['count'] == data['count']).all()
@@ -0,0 +1,84 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import contingency, processPool
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+
+
+def categorical_dataset(n=2000, x_levels=30, y_levels=40):
+    rng = np.random.default_rng(6)
+    x = rng.integers(0, x_levels, n)
+    y = (x + rng.integers(0, 3, n)) % y_levels  # associated
+    data = pd.DataFrame({'x': [f"x{v}" for v in x], 'y': [f"y{v}" for v in y]})
+    dataset = Dataset(None, [], None)
+    dataset.data = data
+    return dataset, [f"x{v}" for v in range(x_levels)], [f"y{v}" for v in range(y_levels)]
+
+
+def test_table_counts_each_pair():
+    dataset, x_cat, y_cat = categorical_dataset()
+    table = contingency.table(dataset, 'x', 'y', x_cat, y_cat)
+    assert contingency.table(dataset, 'x', 'y', x_cat, y_cat) is table
+    expected = pd.crosstab(dataset.data['x'], dataset.data['y']).reindex(index=x_cat, columns=y_cat, fill_value=0)
+    assert np.array_equal(table.dense(), expected.values)
+    assert table.min_count() == 0
+
+
+def test_sparse_table_for_many_cells(monkeypatch):
+    dataset, x_cat, y_cat = categorical_dataset()
+    dense = contingency.table(dataset, 'x', 'y', x_cat, y_cat)
+    monkeypatch.setattr(contingency, 'sparse_cells', 100)
+    wide = contingency.table(dataset, 'x', 'y', x_cat, y_cat + ['unused'])
+    assert wide.is_sparse
+    assert np.array_equal(wide.dense()[:, :-1], dense.dense())
+    assert wide.min_count() == 0
+    # The empty column is left out
+    assert np.allclose(contingency.chi_square(wide), contingency.chi_square(dense))
+
+
+def test_chi_square_and_g_test_match_scipy():
+    observed = np.random.default_rng(7).poisson(4, (6, 5)) + 1
+    table = contingency.ContingencyTable(observed, None, None)
+    for statistic in [contingency.pearson_name, contingency.log_likelihood_name]:
+        expected = stats.chi2_contingency(observed, correction=False, lambda_=statistic)
+        assert np.allclose(contingency.chi_square(table, statistic), expected[:3])
+
+    sparse_table = contingency.ContingencyTable(sparse.csr_matrix(observed), None, None)
+    assert np.allclose(contingency.chi_square(sparse_table), contingency.chi_square(table))
+
+
+def test_fisher_monte_carlo():
+    observed = np.array([[3, 7], [9, 2]])
+    table = contingency.ContingencyTable(observed, None, None)
+    neg_log_probability, p_value = contingency.fisher_monte_carlo(table, simulations=20000, seed=1)
+    n = observed.sum()
+    assert np.isclose(np.exp(-neg_log_probability), stats.hypergeom.pmf(3, n, 10, 12))
+    assert abs(p_value - stats.fisher_exact(observed)[1]) < 0.005
+
+    # Reproducible for a seed, whether or not chunks are simulated in parallel
+    wide = contingency.ContingencyTable(np.random.default_rng(8).poisson(2, (4, 5)), None, None)
+    assert contingency.fisher_monte_carlo(wide, simulations=3000, seed=2) == \
+        contingency.fisher_monte_carlo(wide, simulations=3000, seed=2, workers=2)
+
+
+def test_fisher_monte_carlo_runs_in_the_process_pool_on_request(monkeypatch):
+    wide = contingency.ContingencyTable(np.random.default_rng(8).poisson(2, (4, 5)), None, None)
+    serial = contingency.fisher_monte_carlo(wide, simulations=3000, seed=2, workers=1)
+    monkeypatch.setattr(contingency, 'fisher_parallel_cells', 0)
+    pool = processPool.pool(3)
+    submitted = []
+    monkeypatch.setattr(processPool, 'running_pool', lambda workers: submitted.append(workers) or pool)
+    try:
+        # Serial by default (as called by fishers_exact) and inside pool workers
+        assert contingency.fisher_monte_carlo(wide, simulations=3000, seed=2) == serial
+        monkeypatch.setattr(contingency, 'fisher_workers', 3)
+        monkeypatch.setattr(processPool, 'in_worker', lambda: True)
+        assert contingency.fisher_monte_carlo(wide, simulations=3000, seed=2) == serial
+        assert submitted == []
+
+        monkeypatch.setattr(processPool, 'in_worker', lambda: False)
+        assert contingency.fisher_monte_carlo(wide, simulations=3000, seed=2) == serial
+    finally:
+        processPool.shutdown()
+    assert submitted == [3]
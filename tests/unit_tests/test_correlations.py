@@ -0,0 +1,74 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import correlations
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def correlated(n=20000):
+    rng = np.random.default_rng(11)
+    x = rng.normal(size=n)
+    y = 0.3 * x + rng.normal(size=n)
+    return x, np.round(y)  # y has ties
+
+
+def chunked(x, y, chunk_size=3001):
+    return lambda: ((x[i:i + chunk_size], y[i:i + chunk_size]) for i in range(0, len(x), chunk_size))
+
+
+def test_iter_chunks_covers_the_data():
+    dataset = Dataset(None, [], None, None, 4)
+    dataset.data = pd.DataFrame({'y': np.arange(10)})
+    chunks = list(dataset.iter_chunks())
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert np.array_equal(pd.concat(chunks)['y'], dataset.data['y'])
+
+
+def test_exact_kernels_match_scipy():
+    x, y = correlated()
+    assert np.allclose(correlations.pearson(chunked(x, y)), stats.pearsonr(x, y))
+
+    rho, p_value, error = correlations.spearman(chunked(x, y))
+    assert np.allclose([rho, p_value], stats.spearmanr(x, y))
+    assert error == 0
+
+    tau, p_value, error = correlations.kendall(chunked(x, y))
+    assert np.allclose([tau, p_value], stats.kendalltau(x, y))
+    assert error == 0
+
+
+def test_sketched_kernels_are_within_their_error():
+    x, y = correlated()
+    # x has more distinct values than the sketch, so its ranks are estimated
+    rho, _, error = correlations.spearman(chunked(x, y), size=2000)
+    assert 0 < error < 0.5
+    assert abs(rho - stats.spearmanr(x, y)[0]) <= error
+    assert correlations.spearman(chunked(x, y), size=2000) == (rho, _, error)  # seeded
+
+    tau, _, error = correlations.kendall(chunked(x, y), size=2000)
+    assert 0 < error < 0.5
+    assert abs(tau - stats.kendalltau(x, y)[0]) <= error
+
+
+def test_missing_values_are_not_streamed():
+    x, y = correlated(100)
+    x[3] = np.nan
+    assert correlations.spearman(chunked(x, y, 10)) is None
+    assert correlations.kendall(chunked(x, y, 10)) is None
+
+
+def test_value_counts_merge_buffered_chunks(monkeypatch):
+    monkeypatch.setattr(correlations, 'value_counts_buffer', 100)
+    x = np.round(np.random.default_rng(4).normal(size=20000), 2)
+    counts = correlations.ValueCounts(10000)
+    for i in range(0, len(x), 250):
+        counts.update(x[i:i + 250])
+    assert counts.exact
+    values, expected = np.unique(x, return_counts=True)
+    assert np.array_equal(counts.values, values) and np.array_equal(counts.counts, expected)
+
+    too_many = correlations.ValueCounts(len(values) - 1)
+    for i in range(0, len(x), 250):
+        too_many.update(x[i:i + 250])
+    assert not too_many.exact
@@ -0,0 +1,43 @@
+from tea.ast import DataType, Variable, Literal, Equal, LessThan, GreaterThanEqual
+from tea.evaluate import evaluate
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers.evaluateHelperMethods import get_data
+
+from collections import OrderedDict
+import pandas as pd
+import pytest
+
+size = Variable.from_spec('size', DataType.ORDINAL, OrderedDict([('small', 1), ('medium', 2), ('large', 3)]))
+group = Variable.from_spec('group', DataType.NOMINAL, ['a', 'b'])
+score = Variable.from_spec('score', DataType.RATIO)
+baseline = Variable.from_spec('baseline', DataType.RATIO)
+
+
+def make_dataset():
+    dataset = Dataset(None, [size, group, score, baseline], None)
+    dataset.data = pd.DataFrame({'size': ['small', 'large', 'medium', 'small', 'large'],
+                                 'group': ['a', 'b', 'a', 'b', 'a'],
+                                 'score': [1.0, 5.0, 3.0, 2.0, 4.0],
+                                 'baseline': [2.0, 4.0, 3.0, 1.0, 5.0]})
+    return dataset
+
+
+def filtered(dataset, expr):
+    return list(get_data(dataset, evaluate(dataset, expr, {})))
+
+
+def test_literal_is_a_scalar():
+    literal = evaluate(make_dataset(), Literal(3.0), {})
+    assert literal.metadata['value'] == 3.0
+
+
+def test_filters_against_constants_and_variables():
+    dataset = make_dataset()
+    assert filtered(dataset, LessThan(score, Literal(3.0))) == [1.0, 2.0]
+    assert filtered(dataset, Equal(group, Literal('b'))) == ['b', 'b']
+    assert filtered(dataset, GreaterThanEqual(size, Literal('medium'))) == ['large', 'medium', 'large']
+    assert filtered(dataset, LessThan(size, Literal(2))) == ['small', 'small']
+    assert filtered(dataset, LessThan(score, baseline)) == [1.0, 4.0]
+
+    with pytest.raises(ValueError):
+        evaluate(dataset, LessThan(group, Literal('a')), {})
@@ -0,0 +1,102 @@
+import tea
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def define_sweep(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 200
+    data = pd.DataFrame({'pid': np.arange(n), 'cohort': rng.permutation(np.resize(['a', 'b'], n))})
+    for i in range(3):
+        data[f"m{i}"] = rng.normal(0, 1, n) + (data['cohort'] == 'b') * 0.3 * i
+    path = tmp_path / 'sweep.csv'
+    data.to_csv(path, index=False)
+
+    tea.configure_logging(level='quiet')
+    tea.data(str(path), key='pid')
+    tea.define_variables([{'name': 'cohort', 'data type': 'nominal', 'categories': ['a', 'b']}] +
+                         [{'name': f"m{i}", 'data type': 'ratio'} for i in range(3)])
+    tea.define_study_design({'study type': 'observational study', 'contributor variables': 'cohort',
+                             'outcome variables': [f"m{i}" for i in range(3)]})
+    tea.assume({'Type I (False Positive) Error Rate': 0.05})
+
+
+def test_hypothesize_many_matches_hypothesize(tmp_path):
+    define_sweep(tmp_path)
+    specs = [(['cohort', f"m{i}"], ['cohort:a < b']) for i in range(3)]
+
+    single = [tea.hypothesize(vars, prediction) for vars, prediction in specs]
+    many = tea.hypothesize_many(specs, correction='bonferroni', workers=2)
+    tea.configure_logging(level='info')
+
+    assert len(many) == len(specs)
+    for s, m in zip(single, many):
+        assert set(s.test_to_results) == set(m.test_to_results)
+        for test, result in m.test_to_results.items():
+            assert result.p_value == s.test_to_results[test].p_value
+            # Each test is corrected across the hypotheses it was run on
+            family = sum(test in r.test_to_results for r in many)
+            p_value = result.adjusted_p_value if result.adjusted_p_value is not None else result.p_value
+            assert np.isclose(result.corrected_p_value, min(p_value * family, 1.0))
+    assert many[0].profile is many[1].profile
+
+
+def test_correct_multiple_comparisons_across_hypothesize_calls(tmp_path):
+    define_sweep(tmp_path)
+    results = [tea.hypothesize(['cohort', f"m{i}"], ['cohort:a < b']) for i in range(3)]
+    tea.configure_logging(level='info')
+
+    corrected = tea.correct_multiple_comparisons('bonferroni')
+    assert corrected == results
+    for result in results:
+        for test, test_result in result.test_to_results.items():
+            family = sum(test in r.test_to_results for r in results)
+            assert np.isclose(test_result.corrected_p_value, min(test_result.adjusted_p_value * family, 1.0))
+
+
+def test_hypothesize_many_in_processes(tmp_path):
+    define_sweep(tmp_path)
+    specs = [(['cohort', f"m{i}"], ['cohort:a < b']) for i in range(3)]
+
+    threads = tea.hypothesize_many(specs, correction='holm', workers=2)
+    processes = tea.hypothesize_many(specs, correction='holm', workers=2, processes=True)
+    tea.configure_logging(level='info')
+
+    for t, p in zip(threads, processes):
+        assert set(t.test_to_results) == set(p.test_to_results)
+        for test, result in p.test_to_results.items():
+            assert result.p_value == t.test_to_results[test].p_value
+            assert result.corrected_p_value == t.test_to_results[test].corrected_p_value
+
+
+def test_follow_ups_compare_pairs_of_categories(tmp_path):
+    rng = np.random.default_rng(2)
+    n = 240
+    data = pd.DataFrame({'pid': np.arange(n), 'arm': np.resize(['a', 'b', 'c'], n), 'y': rng.normal(0, 1, n)})
+    data['y'] += (data['arm'] == 'c') * 0.8
+    path = tmp_path / 'arms.csv'
+    data.to_csv(path, index=False)
+
+    tea.configure_logging(level='quiet')
+    tea.data(str(path), key='pid')
+    tea.define_variables([{'name': 'arm', 'data type': 'nominal', 'categories': ['a', 'b', 'c']},
+                          {'name': 'y', 'data type': 'ratio'}])
+    tea.define_study_design({'study type': 'experiment', 'independent variables': 'arm', 'dependent variables': 'y'})
+    tea.assume({'Type I (False Positive) Error Rate': 0.05, 'groups normally distributed': [['arm', 'y']]})
+    predictions = ['arm:a < b', 'arm:a < c', 'arm:b < c']
+
+    single = tea.hypothesize(['arm', 'y'], predictions)
+    many = tea.hypothesize_many([(['arm', 'y'], predictions)])[0]
+    tea.configure_logging(level='info')
+
+    assert len(single.follow_up_results) == len(predictions)
+    for prediction, s, m in zip(predictions, single.follow_up_results, many.follow_up_results):
+        lhs, rhs = prediction[len('arm:'):].split(' < ')
+        pair = data[data['arm'].isin([lhs, rhs])]
+        t = stats.ttest_ind(pair.loc[pair['arm'] == lhs, 'y'], pair.loc[pair['arm'] == rhs, 'y'])
+        assert np.isclose(s.test_to_results['students_t'].test_statistic, t.statistic)
+        # The ANOVA of a pair is restricted to its rows: F = t^2
+        assert np.isclose(s.test_to_results['f_test'].test_statistic, t.statistic ** 2)
+        assert s.test_to_results['students_t'].p_value == m.test_to_results['students_t'].p_value
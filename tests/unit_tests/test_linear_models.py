@@ -0,0 +1,51 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import linearModels
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from statsmodels.formula.api import ols
+
+
+def factor_dataset(n=400, many_levels=150):
+    rng = np.random.default_rng(2)
+    data = pd.DataFrame({'a': rng.choice(['x', 'y', 'z'], n),
+                         'b': rng.choice(['p', 'q'], n, p=[0.3, 0.7]),  # unbalanced
+                         'c': rng.integers(0, many_levels, n).astype(str),
+                         'y': rng.normal(size=n)})
+    data['y'] += (data['a'] == 'x') * 0.5
+    data.loc[[4, 17, 99], 'y'] = np.nan
+    dataset = Dataset(None, [], None)
+    dataset.data = data
+    return dataset
+
+
+def assert_matches_statsmodels(dataset, terms, formula):
+    table = linearModels.anova_table(dataset, 'y', terms)
+    expected = sm.stats.anova_lm(ols(formula, data=dataset.data).fit(), typ=2).loc[table.index]
+    assert np.allclose(table[expected.columns].values, expected.values, equal_nan=True)
+
+
+def test_one_way_matches_statsmodels():
+    assert_matches_statsmodels(factor_dataset(), [('a',)], 'y ~ C(a)')
+
+
+def test_type_two_sums_of_squares_with_interaction():
+    dataset = factor_dataset()
+    assert_matches_statsmodels(dataset, [('a',), ('b',)], 'y ~ C(a) + C(b)')
+    assert_matches_statsmodels(dataset, [('a',), ('b',), ('a', 'b')], 'y ~ C(a) * C(b)')
+
+
+def test_sparse_design_matrix_for_many_levels():
+    dataset = factor_dataset()
+    X, slices, rows = linearModels.design_matrix(dataset, [('c',), ('a',)])
+    assert X.shape[1] > linearModels.sparse_threshold
+    assert not isinstance(X, np.ndarray)
+    assert_matches_statsmodels(dataset, [('c',), ('a',)], 'y ~ C(c) + C(a)')
+
+
+def test_design_matrix_is_cached_on_dataset():
+    dataset = factor_dataset()
+    first = linearModels.design_matrix(dataset, [('a',), ('b',)])
+    assert linearModels.design_matrix(dataset, [('a',), ('b',)]) is first
+    assert linearModels.design_matrix(dataset, [('a',)]) is not first
@@ -0,0 +1,43 @@
+from tea.helpers import logger
+
+import json
+
+
+class CountsFormatting(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return 'formatted'
+
+
+def test_disabled_level_does_not_format():
+    arg = CountsFormatting()
+    logger.configure(level='info', console=False)
+    logger.log_debug("Testing assumption: %s.", arg)
+    assert arg.calls == 0
+    logger.configure(level='info', console=True)
+
+
+def test_json_lines_sink(tmp_path):
+    log_file = tmp_path / 'tea.jsonl'
+    logger.configure(level='debug', file=log_file, json_lines=True, console=False)
+    logger.log_debug("Property %s holds.", 'is_normal', property='is_normal', holds=True)
+    logger.configure(level='info', file=None, console=True)
+
+    records = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert len(records) == 1
+    assert records[0]['level'] == 'debug'
+    assert records[0]['message'] == "Property is_normal holds."
+    assert records[0]['property'] == 'is_normal'
+    assert records[0]['holds'] is True
+
+
+def test_batch_mode_is_quiet():
+    logger.configure(level='debug', console=False)
+    with logger.batch_mode():
+        assert not logger.is_enabled(logger.INFO)
+        assert logger.is_enabled(logger.WARNING)
+    assert logger.is_enabled(logger.DEBUG)
+    logger.configure(level='info', console=True)
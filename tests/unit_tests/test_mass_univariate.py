@@ -0,0 +1,89 @@
+from tea.helpers import massUnivariate
+import tea
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from statsmodels.stats.multitest import multipletests
+
+
+def outcome_data(groups, n=120, m=5):
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(rng.normal(size=(n, m)), columns=[f"y{i}" for i in range(m)])
+    data['y0'] = np.round(data['y0'])  # ties
+    data.loc[3, 'y1'] = np.nan
+    data['g'] = rng.choice(groups, n)
+    return data
+
+
+def result_for(results, test, y):
+    return results[(results['test'] == test) & (results['outcome'] == y)].iloc[0]
+
+
+def test_two_groups_match_scipy():
+    data = outcome_data(['a', 'b'])
+    ys = [f"y{i}" for i in range(5)]
+    results = massUnivariate.test_outcomes(data, 'g', ['a', 'b'], ys, chunk_size=2)
+    assert len(results) == 3 * len(ys)
+
+    for y in ys:
+        a = data.loc[data['g'] == 'a', y].dropna()
+        b = data.loc[data['g'] == 'b', y].dropna()
+        for test, expected in [('students_t', stats.ttest_ind(a, b)),
+                               ('welchs_t', stats.ttest_ind(a, b, equal_var=False)),
+                               ('mannwhitney_u', stats.mannwhitneyu(a, b, alternative='two-sided', method='asymptotic'))]:
+            row = result_for(results, test, y)
+            assert np.isclose(row['statistic'], expected[0])
+            assert np.isclose(row['p_value'], expected[1])
+
+
+def test_many_groups_match_scipy():
+    data = outcome_data(['a', 'b', 'c'])
+    ys = [f"y{i}" for i in range(5)]
+    results = massUnivariate.test_outcomes(data, 'g', ['a', 'b', 'c'], ys)
+
+    for y in ys:
+        groups = [data.loc[data['g'] == c, y].dropna() for c in ['a', 'b', 'c']]
+        for test, expected in [('f_test', stats.f_oneway(*groups)), ('kruskall_wallis', stats.kruskal(*groups))]:
+            row = result_for(results, test, y)
+            assert np.isclose(row['statistic'], expected[0])
+            assert np.isclose(row['p_value'], expected[1])
+
+
+def test_hypothesize_mass_univariate_corrects_across_outcomes(tmp_path):
+    data = outcome_data(['a', 'b'])
+    data['pid'] = np.arange(len(data))
+    path = tmp_path / 'outcomes.csv'
+    data.to_csv(path, index=False)
+
+    tea.data(str(path), key='pid')
+    tea.define_variables([{'name': 'g', 'data type': 'nominal', 'categories': ['a', 'b']}])
+    results = tea.hypothesize_mass_univariate('g', [f"y{i}" for i in range(5)], tests=['welchs_t'])
+
+    assert list(results['test'].unique()) == ['welchs_t']
+    assert np.allclose(results['corrected_p_value'], multipletests(results['p_value'], method='fdr_bh')[1])
+    assert results.attrs['profile'].stages
+
+
+def test_large_offsets_match_scipy():
+    data = outcome_data(['a', 'b'], n=100, m=2)
+    data[['y0', 'y1']] = data[['y0', 'y1']] + 1e9
+    results = massUnivariate.test_outcomes(data, 'g', ['a', 'b'], ['y0', 'y1'], tests=['students_t', 'welchs_t'])
+    for y in ['y0', 'y1']:
+        a = data.loc[data['g'] == 'a', y].dropna()
+        b = data.loc[data['g'] == 'b', y].dropna()
+        assert np.isclose(result_for(results, 'students_t', y)['statistic'], stats.ttest_ind(a, b)[0])
+        assert np.isclose(result_for(results, 'welchs_t', y)['p_value'], stats.ttest_ind(a, b, equal_var=False)[1])
+
+
+def test_declared_groups_without_rows_are_left_out():
+    data = outcome_data(['a', 'b', 'c'])
+    ys = [f"y{i}" for i in range(5)]
+    results = massUnivariate.test_outcomes(data, 'g', ['a', 'b', 'c', 'absent'], ys)
+    for y in ys:
+        samples = [data.loc[data['g'] == g, y].dropna() for g in ['a', 'b', 'c']]
+        for test, expected in [('f_test', stats.f_oneway(*samples)), ('kruskall_wallis', stats.kruskal(*samples))]:
+            row = result_for(results, test, y)
+            assert np.isclose(row['statistic'], expected[0])
+            assert np.isclose(row['p_value'], expected[1])
+        assert result_for(results, 'kruskall_wallis', y)['dof'] == 2
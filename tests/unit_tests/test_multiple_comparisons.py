@@ -0,0 +1,67 @@
+from tea.helpers import multipleComparisons
+from tea.runtimeDataStructures.testResult import TestResult
+
+import numpy as np
+from statsmodels.stats.multitest import multipletests
+
+p_values = [0.01, 0.04, 0.03, 0.005, 0.2, 0.04]
+statsmodels_names = {
+    'bonferroni': 'bonferroni',
+    'holm': 'holm',
+    'hochberg': 'simes-hochberg',
+    'fdr_bh': 'fdr_bh',
+    'fdr_by': 'fdr_by',
+}
+
+
+def test_corrections_match_statsmodels():
+    for method, statsmodels_name in statsmodels_names.items():
+        expected = multipletests(p_values, method=statsmodels_name)[1]
+        assert np.allclose(multipleComparisons.correct(p_values, method), expected)
+
+
+def test_unknown_correction():
+    try:
+        multipleComparisons.correct(p_values, 'sidak-ish')
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_sink_streams_large_families():
+    rng = np.random.default_rng(0)
+    family = rng.uniform(size=100000)
+    sink = multipleComparisons.CorrectionSink('fdr_bh')
+    for chunk in np.array_split(family, 7):
+        sink.add_many(chunk)
+    sink.add(0.5)
+
+    expected = multipletests(np.append(family, 0.5), method='fdr_bh')[1]
+    assert len(sink) == 100001
+    assert np.allclose(sink.corrected(), expected)
+
+
+def test_correct_results_sets_corrected_p_values():
+    results = [TestResult(name='students_t', test_statistic=1.0, p_value=p, prediction=None, alpha=0.05) for p in p_values]
+    multipleComparisons.correct_results(results, 'hochberg')
+    expected = multipletests(p_values, method='simes-hochberg')[1]
+    assert np.allclose([r.corrected_p_value for r in results], expected)
+
+
+def test_result_data_family_counts_each_result_once():
+    class Result(object):
+        def __init__(self, p_value):
+            self.test_to_results = {'students_t': TestResult(name='students_t', test_statistic=1.0, p_value=p_value,
+                                                             prediction=None, alpha=0.05)}
+            self.follow_up_results = None
+
+    results = [Result(p) for p in p_values[:3]]
+    results[0].follow_up_results = [results[0], Result(p_values[3])]
+    multipleComparisons.correct_result_data(results, 'bonferroni')
+    assert [r.test_to_results['students_t'].corrected_p_value for r in results] == \
+        list(multipleComparisons.bonferroni(p_values[:4])[:3])
+
+    entries = [('students_t', p) for p in p_values[:4]] + [('students_t', None)]
+    assert multipleComparisons.correct_by_test(entries, 'bonferroni') == \
+        list(multipleComparisons.bonferroni(p_values[:4])) + [None]
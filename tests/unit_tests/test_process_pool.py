@@ -0,0 +1,21 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import processPool
+
+import numpy as np
+import pandas as pd
+
+
+def test_workers_see_the_shared_data():
+    data = pd.DataFrame({'pid': np.arange(6), 'g': ['a', 'b', None, 'a', 'b', 'a'],
+                         'y': np.linspace(0, 1, 6), 'flag': [True, False] * 3,
+                         'size': pd.Categorical(['lo', 'hi', 'lo', None, 'hi', 'lo'], ['lo', 'hi'], ordered=True)})
+    dataset = Dataset(None, [], 'pid')
+    dataset.data = data
+
+    with processPool.shared(dataset) as shared_dataset:
+        attached = processPool.submit(shared_dataset, getattr, 'data', workers=1).result()
+        pid = processPool.submit(shared_dataset, getattr, 'pid_col_name', workers=1).result()
+    processPool.shutdown()
+
+    pd.testing.assert_frame_equal(attached, data)
+    assert pid == 'pid'
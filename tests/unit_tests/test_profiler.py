@@ -0,0 +1,60 @@
+from tea.helpers import profiler
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+from tea.runtimeDataStructures.resultData import ResultData
+
+
+def test_stage_and_count_without_profile_are_noops():
+    assert not profiler.is_profiling()
+    with profiler.stage(profiler.test_execution, lambda: 1 / 0): # detail is never built
+        pass
+    profiler.count(profiler.select_calls)
+
+
+def test_profile_records_stages_details_and_counters():
+    with profiler.profiling() as profile:
+        with profiler.stage(profiler.test_execution, 'students_t'):
+            pass
+        with profiler.stage(profiler.test_execution, 'welchs_t'):
+            pass
+        profiler.count(profiler.select_calls, 3)
+
+    assert profile.stages[profiler.test_execution].calls == 2
+    assert set(profile.tests) == {'students_t', 'welchs_t'}
+    assert profile.counters[profiler.select_calls] == 3
+    assert profile.wall >= profile.stages[profiler.test_execution].wall
+
+
+def test_claimed_profile_gets_follow_up_profiles():
+    result = ResultData({}, None)
+    with profiler.profiling() as outer:
+        profiler.claim(result)
+        with profiler.profiling() as inner:
+            profiler.count(profiler.z3_checks)
+
+    assert result.profile is outer
+    assert outer.follow_ups == [inner]
+    assert profiler.z3_checks not in outer.counters
+    assert inner.counters[profiler.z3_checks] == 1
+
+
+def test_threads_report_into_the_submitting_profile():
+    def busy():
+        with profiler.stage(profiler.test_execution):
+            end = time.thread_time() + 0.05
+            while time.thread_time() < end:
+                pass
+        profiler.count(profiler.select_calls)
+
+    with profiler.profiling() as profile:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for f in [executor.submit(profiler.carry(busy)) for _ in range(4)]:
+                f.result()
+            executor.submit(busy).result()  # not carried: no profile in the worker thread
+
+    timing = profile.stages[profiler.test_execution]
+    assert timing.calls == 4 and profile.counters[profiler.select_calls] == 4
+    # Each stage counts its own thread's CPU time, not the process's
+    assert timing.cpu <= profile.cpu + 0.01
+    assert not profiler.is_profiling()
@@ -0,0 +1,89 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import queryPlan, profiler
+
+import numpy as np
+import pandas as pd
+
+
+def make_dataset(n=300):
+    rng = np.random.default_rng(1)
+    dataset = Dataset(None, [], None)
+    dataset.data = pd.DataFrame({'x': rng.choice(['a', 'b', 'c'], n),
+                                 'k': rng.integers(0, 4, n),
+                                 'g': rng.choice([1.0, 2.0, np.nan], n),
+                                 's': rng.choice(['a', 'b', None], n),
+                                 'f': rng.normal(size=n),
+                                 'y': rng.normal(size=n)})
+    return dataset
+
+
+def test_plans_select_the_same_rows_as_query():
+    dataset = make_dataset()
+    wheres = [["x == 'a'"], ["x == 'a'", "k == 2"], ["k == '2'"], ["g == 1"], ["s != 'b'"],
+              ["x == 'b'", "`f` >= -0.5"], ["k in [1, 3]", "f < y"], ["k == 2 & f < 0"], ["x == 'a'", "x == 'a'"],
+              ["k <= 2"], ["g > 1"], ["f > 0", "y <= 0.5"], ["k < 2.5", "x == 'c'"]]
+    for where in wheres:
+        expected = dataset.data.query('&'.join(where))['y']
+        pd.testing.assert_series_equal(dataset.select('y', where=where), expected)
+
+
+def test_plan_pushes_group_splits_down():
+    dataset = make_dataset()
+    plan = dataset.plan('y', ["f < 0", "x == 'a'", "f < 0"])
+    assert [type(p) for p in plan.predicates] == [queryPlan.GroupLookup, queryPlan.RangeLookup]
+
+    # Every category of x is looked up in one split of x
+    for c in ['a', 'b', 'c']:
+        dataset.select('y', where=[f"x == '{c}'"])
+    assert [key for key in dataset.cache if key[0] == 'group split'] == [('group split', 'x')]
+
+    explanation = plan.explain(dataset).splitlines()
+    assert explanation[0] == 'Scan (300 rows)'
+    assert explanation[1].startswith("GroupLookup x == 'a'  rows=")
+    assert explanation[-1].startswith('Project y')
+
+
+def test_range_filters_share_a_sorted_index():
+    dataset = make_dataset()
+    dataset.data['size'] = pd.Categorical(np.resize(['lo', 'mid', 'hi', None], 300), ['lo', 'mid', 'hi'], ordered=True)
+    for threshold in [-1.0, 0, 0.5, 2]:
+        for op in ['<', '<=', '>', '>=']:
+            where = [f"f {op} {threshold}"]
+            assert isinstance(dataset.plan('y', where).predicates[0], queryPlan.RangeLookup)
+            pd.testing.assert_series_equal(dataset.select('y', where=where), dataset.data.query(where[0])['y'])
+    for op in ['<', '>=']:
+        where = [f"size {op} 'mid'"]
+        pd.testing.assert_series_equal(dataset.select('y', where=where), dataset.data.query(where[0])['y'])
+    assert [key for key in dataset.cache if key[0] == 'sorted index'] == [('sorted index', 'f'), ('sorted index', 'size')]
+
+
+def test_equalities_on_nominal_columns_compose_as_bitmaps():
+    dataset = make_dataset()
+    dataset.data['x'] = pd.Categorical(dataset.data['x'], ['a', 'b', 'c', 'd'])
+    wheres = [["x == 'a' | x == 'b'"], ["x == 'a' | s == 'b'", "k > 1"], ["(x == 'a' | x == 'c') & s == 'a'"],
+              ["x == 'b'", "s == 'a'"], ["x == 'a' or x == 'd'"], ["x == 'a' | x == 'b' & s == 'a'"]]
+    for where in wheres:
+        expected = dataset.data.query('&'.join(f"({w})" for w in where))['y']
+        pd.testing.assert_series_equal(dataset.select('y', where=where), expected)
+
+    plan = dataset.plan('y', ["x == 'a' | x == 'c'", "s == 'a'", "f < 0"])
+    assert [type(p) for p in plan.predicates] == [queryPlan.Bitmap, queryPlan.RangeLookup]
+    assert plan.predicates[0].clauses == ((('x', 'a'), ('x', 'c')), (('s', 'a'),))
+    assert plan.explain(dataset).splitlines()[1].startswith("Bitmap (x == 'a' | x == 'c') & s == 'a'  rows=")
+    # & binds tighter than |: not a conjunction of bitmaps
+    assert isinstance(dataset.plan('y', ["x == 'a' | x == 'b' & s == 'a'"]).predicates[0], queryPlan.Expression)
+    assert ('bitmap index', 'x') in dataset.cache
+
+
+def test_narrowed_range_lookups_are_costed_as_scans():
+    dataset = make_dataset()
+    plan = dataset.plan('y', ["x == 'a'", "f < 0"])
+    explanation = plan.explain(dataset).splitlines()
+    matched = len(queryPlan.groups(dataset, 'x')['a'])
+    assert explanation[2] == f"RangeLookup f < 0 (scan)  rows={matched * queryPlan.range_selectivity:.0f} cost={matched}"
+
+    queryPlan.sorted_index(dataset, 'f')  # built (and counted) once
+    with profiler.profiling() as profile:
+        plan.rows(dataset)
+        dataset.plan('y', ["f < 0"]).rows(dataset)
+    assert profile.counters[profiler.rows_scanned] == matched
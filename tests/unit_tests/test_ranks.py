@@ -0,0 +1,73 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import ranks
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def group_dataset(n=300):
+    rng = np.random.default_rng(4)
+    data = pd.DataFrame({'g': rng.choice(['a', 'b', 'c'], n),
+                         'y': np.round(rng.normal(size=n), 1),  # ties
+                         'z': rng.normal(size=n)})
+    data['z'] += data['y']
+    dataset = Dataset(None, [], None)
+    dataset.data = data
+    return dataset
+
+
+def test_rank_matches_scipy():
+    values = np.round(np.random.default_rng(0).normal(size=500), 1)
+    ranking = ranks.rank(values)
+    assert np.allclose(ranking.ranks, stats.rankdata(values))
+    _, counts = np.unique(values, return_counts=True)
+    assert np.isclose(ranking.tie_term, np.sum(counts ** 3 - counts))
+
+    block = np.column_stack([values, values[::-1]])
+    block_ranks, tie_term = ranks.rank_columns(block)
+    assert np.allclose(block_ranks[:, 1], stats.rankdata(values[::-1]))
+    assert np.allclose(tie_term, ranking.tie_term)
+
+
+def test_group_tests_match_scipy():
+    dataset = group_dataset()
+    data = dataset.data
+    a, b, c = [data.loc[data['g'] == g, 'y'] for g in ['a', 'b', 'c']]
+
+    two = ranks.grouped(dataset, 'y', 'g', ['b', 'a'])
+    assert ranks.grouped(dataset, 'y', 'g', ['a', 'b']) is two  # shared regardless of group order
+    assert not ranks.mannwhitney_is_exact(two, 'a', 'b')
+    assert np.allclose(ranks.mannwhitney_u(two, 'a', 'b'), stats.mannwhitneyu(a, b, alternative='two-sided'))
+
+    all_groups = ranks.grouped(dataset, 'y', 'g', ['a', 'b', 'c'])
+    assert np.allclose(ranks.kruskal(all_groups), stats.kruskal(a, b, c))
+
+    # A12 from pooled ranks (Vargha and Delaney, 2000)
+    pooled = stats.rankdata(pd.concat([a, b]))
+    expected = (2 * pooled[:len(a)].sum() - len(a) * (len(a) + 1)) / (2 * len(a) * len(b))
+    assert np.isclose(ranks.vda(two, 'a', 'b'), expected)
+
+
+def test_missing_values_are_not_ranked():
+    dataset = group_dataset()
+    dataset.data.loc[0, 'y'] = np.nan
+    assert ranks.grouped(dataset, 'y', 'g', ['a', 'b', 'c']) is None
+    assert ranks.cached(dataset, ('y',), lambda: dataset.data['y']) is None
+
+
+def test_paired_tests_match_scipy():
+    rng = np.random.default_rng(5)
+    values = np.round(rng.normal(size=(120, 4)), 1)
+    values[:, 3] += 0.3
+    assert np.allclose(ranks.friedman(values), stats.friedmanchisquare(*values.T))
+
+    differences = values[:, 3] - values[:, 0]
+    assert ranks.wilcoxon_is_asymptotic(differences)
+    ranking = ranks.rank(np.abs(differences[differences != 0]))
+    assert np.allclose(ranks.wilcoxon(differences, ranking), stats.wilcoxon(values[:, 3], values[:, 0]))
+
+    dataset = group_dataset()
+    x = ranks.cached(dataset, ('y',), lambda: dataset.data['y'])
+    z = ranks.cached(dataset, ('z',), lambda: dataset.data['z'])
+    assert np.allclose(ranks.spearman(x, z), stats.spearmanr(dataset.data['y'], dataset.data['z']))
@@ -0,0 +1,74 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import repeatedMeasures
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from statsmodels.stats.anova import AnovaRM
+
+conditions = ['c1', 'c2', 'c3']
+
+
+def within_dataset(subjects=40, repeats=1):
+    rng = np.random.default_rng(3)
+    pid = np.repeat(np.arange(subjects), len(conditions) * repeats)
+    cond = np.tile(np.repeat(conditions, repeats), subjects)
+    y = np.repeat(rng.normal(size=subjects), len(conditions) * repeats) + rng.normal(size=len(pid))
+    y += (cond == 'c3') * 0.4
+    data = pd.DataFrame({'pid': pid, 'cond': cond, 'y': y}).sample(frac=1, random_state=0)
+    dataset = Dataset(None, [], 'pid')
+    dataset.data = data
+    return dataset
+
+
+def test_anova_matches_anova_rm():
+    for repeats in [1, 2]:  # cells with several observations are averaged
+        dataset = within_dataset(repeats=repeats)
+        matrix = repeatedMeasures.subject_matrix(dataset, 'y', 'cond', conditions)
+        assert matrix.complete
+        assert matrix.paired == (repeats == 1)
+
+        table = repeatedMeasures.anova_table(matrix, 'cond')
+        expected = AnovaRM(dataset.data, depvar='y', subject='pid', within=['cond'], aggregate_func='mean').fit().anova_table
+        assert np.allclose(table.values, expected.loc[['cond'], table.columns].values)
+
+
+def test_columns_pair_observations_by_participant():
+    dataset = within_dataset()
+    matrix = repeatedMeasures.subject_matrix(dataset, 'y', 'cond', conditions)
+    assert repeatedMeasures.subject_matrix(dataset, 'y', 'cond', conditions) is matrix
+
+    ordered = dataset.data.sort_values('pid')
+    columns = [ordered.loc[ordered['cond'] == c, 'y'].to_numpy() for c in conditions]
+    assert np.allclose(matrix.column('c1'), columns[0])
+    assert np.isclose(stats.ttest_rel(matrix.column('c1'), matrix.column('c3'))[1], stats.ttest_rel(columns[0], columns[2])[1])
+    assert np.isclose(stats.friedmanchisquare(*matrix.values.T)[0], stats.friedmanchisquare(*columns)[0])
+
+
+def test_incomplete_subjects_are_detected():
+    dataset = within_dataset()
+    dataset.data = dataset.data.drop(dataset.data.index[0])
+    matrix = repeatedMeasures.subject_matrix(dataset, 'y', 'cond', conditions)
+    assert not matrix.complete
+    assert not matrix.paired
+
+    no_ids = Dataset(None, [], None)
+    no_ids.data = dataset.data
+    assert repeatedMeasures.subject_matrix(no_ids, 'y', 'cond', conditions) is None
+
+
+def test_alignment_leaves_out_unmatched_participants():
+    dataset = within_dataset()
+    data = dataset.data
+    # Participant 0 misses c2 and participant 1 is observed twice in c1
+    data = pd.concat([data[~((data['pid'] == 0) & (data['cond'] == 'c2'))],
+                      data[(data['pid'] == 1) & (data['cond'] == 'c1')]]).sample(frac=1, random_state=1)
+    dataset.data = data
+
+    alignment = repeatedMeasures.subject_matrix(dataset, 'y', 'cond', conditions).alignment()
+    assert list(alignment.unmatched) == [0, 1]
+    assert list(alignment.subjects) == list(range(2, 40))
+    for c, column in zip(conditions, alignment.columns):
+        assert column.flags['C_CONTIGUOUS']
+        expected = data[data['cond'] == c].set_index('pid')['y'].loc[alignment.subjects]
+        assert np.array_equal(column, expected.to_numpy())
@@ -0,0 +1,78 @@
+from tea.helpers import profiler, resultCache
+import tea
+import tea.api
+
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def cache(tmp_path):
+    tea.configure_cache(directory=tmp_path / 'cache')
+    yield tmp_path / 'cache'
+    tea.configure_cache(enabled=False, directory=resultCache.directory)
+
+
+def define_analysis(path, shift=0.5):
+    rng = np.random.default_rng(13)
+    data = pd.DataFrame({'cohort': np.resize(['a', 'b'], 80), 'score': rng.normal(size=80)})
+    data.loc[data['cohort'] == 'b', 'score'] += shift
+    data.to_csv(path, index=False)
+
+    tea.configure_logging(level='quiet')
+    tea.data(str(path))
+    tea.define_variables([{'name': 'cohort', 'data type': 'nominal', 'categories': ['a', 'b']},
+                          {'name': 'score', 'data type': 'ratio'}])
+    tea.define_study_design({'study type': 'observational study', 'contributor variables': 'cohort',
+                             'outcome variables': 'score'})
+    tea.assume({'Type I (False Positive) Error Rate': 0.05})
+
+
+def test_hit_skips_loading_data(tmp_path, cache, monkeypatch):
+    define_analysis(tmp_path / 'data.csv')
+    first = tea.hypothesize(['cohort', 'score'], ['cohort:a < b'])
+    assert len(list(cache.glob('*.pickle'))) == 1
+
+    def load_data(*args):
+        raise AssertionError("data loaded on a cache hit")
+    monkeypatch.setattr(tea.api, 'load_data', load_data)
+    second = tea.hypothesize(['cohort', 'score'], ['cohort:a < b'])
+    tea.configure_logging(level='info')
+
+    assert second.profile.counters[profiler.result_cache_hits] == 1
+    assert set(second.test_to_results) == set(first.test_to_results)
+    for test, result in first.test_to_results.items():
+        assert second.test_to_results[test].p_value == result.p_value
+        assert second.test_to_results[test].corrected_p_value == result.corrected_p_value
+
+
+def test_changes_miss(tmp_path, cache):
+    define_analysis(tmp_path / 'data.csv')
+    tea.hypothesize(['cohort', 'score'], ['cohort:a < b'])
+    tea.hypothesize(['cohort', 'score'], ['cohort:a > b'])  # another prediction
+    define_analysis(tmp_path / 'data.csv', shift=0.6)  # other data in the same file
+    result = tea.hypothesize(['cohort', 'score'], ['cohort:a < b'])
+    tea.configure_logging(level='info')
+
+    assert profiler.result_cache_hits not in result.profile.counters
+    assert len(list(cache.glob('*.pickle'))) == 3
+
+
+def test_eviction(tmp_path, cache):
+    cache.mkdir()
+    for i in range(4):
+        path = cache / f"{i}.pickle"
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (time.time() - 10 * (4 - i),) * 2)  # 0 is the least recently used
+    resultCache.configure(cache_max_bytes=250)
+    try:
+        resultCache.evict()
+        assert sorted(p.name for p in cache.glob('*.pickle')) == ['2.pickle', '3.pickle']
+        resultCache.configure(cache_max_age=15)
+        resultCache.evict()
+        assert [p.name for p in cache.glob('*.pickle')] == ['3.pickle']
+    finally:
+        resultCache.configure(cache_max_bytes=1 << 30, cache_max_age=30 * 24 * 60 * 60)
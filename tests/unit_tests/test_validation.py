@@ -0,0 +1,51 @@
+from tea.ast import DataType, Variable
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import validation
+
+import numpy as np
+import pandas as pd
+import pytest
+
+group = Variable.from_spec('group', DataType.NOMINAL, ['a', 'b'])
+score = Variable.from_spec('score', DataType.RATIO, None, [0, 10])
+
+
+def make_dataset():
+    dataset = Dataset(None, [group, score], None)
+    dataset.data = pd.DataFrame({'group': ['a', 'b', 'c', 'a', None, 'd'],
+                                 'score': [1.0, 12.0, 3.0, -1.0, 5.0, np.nan]})
+    return dataset
+
+
+def test_reports_counts_and_samples():
+    dataset = make_dataset()
+    report = validation.validate(dataset)
+    assert not report.valid
+    assert [(v.variable, v.kind, v.count, v.samples) for v in report.violations] == \
+        [('group', 'category', 2, ('c', 'd')), ('score', 'range', 2, (12.0, -1.0))]
+    assert len(dataset.data) == 6
+    assert dataset.validation is report
+    assert validation.validate(dataset) is report
+
+
+def test_coerce_and_drop():
+    dataset = make_dataset()
+    validation.validate(dataset, validation.coerce_policy)
+    assert dataset.data['group'].isna().tolist() == [False, False, True, False, True, True]
+    assert dataset.data['score'].isna().tolist() == [False, True, False, True, False, True]
+
+    dataset = make_dataset()
+    report = validation.validate(dataset, validation.drop_policy)
+    assert report.rows_dropped == 4
+    assert dataset.data['score'].tolist() == [1.0, 5.0]
+
+
+def test_error_and_missing_columns():
+    dataset = make_dataset()
+    dataset.data['score'] = ['1', 'two', '3', '4', '5', '6']
+    with pytest.raises(ValueError, match='score: 1 values are not numbers'):
+        validation.validate(dataset, validation.error_policy)
+
+    dataset.data = dataset.data.drop(columns=['group', 'score'])
+    report = validation.validate(dataset)
+    assert [v.kind for v in report.violations] == ['missing column', 'missing column']
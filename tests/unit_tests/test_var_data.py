@@ -0,0 +1,58 @@
+from tea.global_vals import *
+from tea.ast import DataType
+from tea.runtimeDataStructures.varData import VarData
+from tea.runtimeDataStructures.bivariateData import BivariateData
+from tea.runtimeDataStructures.testResult import TestResult
+from tea.helpers.evaluateHelperMethods import assign_roles
+
+import attr
+import pickle
+import pytest
+
+
+def var(var_name, dtype):
+    return VarData({'dtype': dtype, 'categories': None, 'var_name': var_name, 'query': ''})
+
+
+def test_assign_roles_shares_metadata():
+    x, y = var('x', DataType.NOMINAL), var('y', DataType.RATIO)
+    design = {contributor_identifier: 'x', outcome_identifier: ['y']}
+    roles = assign_roles([y, x], observational_identifier, design)
+
+    assert [v.role for v in roles] == [outcome_identifier, contributor_identifier]
+    assert roles[0].metadata is y.metadata
+    assert y.role is None
+    with pytest.raises(attr.exceptions.FrozenInstanceError):
+        y.role = outcome_identifier
+
+
+def test_derived_properties_do_not_change_the_original():
+    x, y = var('x', DataType.NOMINAL), var('y', DataType.RATIO)
+    assert x.properties is not y.properties
+
+    with_size = y.with_properties({sample_size: 10})
+    assert with_size.get_sample_size() == 10
+    assert sample_size not in y.properties
+
+    x, y = x.with_role(contributor_identifier), y.with_role(outcome_identifier)
+    combined_data = BivariateData([y, x], observational_identifier)
+    assert combined_data.vars == [x, y]  # explained variable last
+    is_paired = combined_data.with_properties({paired: True})
+    assert is_paired.has_paired_observations()
+    assert paired not in combined_data.properties
+    assert is_paired.vars[0] is x
+
+
+def test_runtime_data_is_slotted_and_picklable():
+    y = var('y', DataType.RATIO).with_role(' '.join(['outcome', 'variables']))
+    assert not hasattr(y, '__dict__')
+    assert y.role is outcome_identifier  # interned
+
+    result = TestResult(name=students_t_name, test_statistic=2.0, p_value=0.04, prediction=None, alpha=0.05)
+    assert not hasattr(result, '__dict__')
+    result.add_effect_size('Cohen\'s d', 0.5)
+    result.add_effect_size('A12', 0.6)
+    assert result.effect_size == {'Cohen\'s d': 0.5, 'A12': 0.6}
+
+    assert pickle.loads(pickle.dumps(y)) == y
+    assert pickle.loads(pickle.dumps(result)) == result
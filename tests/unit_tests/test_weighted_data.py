@@ -0,0 +1,94 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.helpers import summaryStatistics, linearModels, contingency, ranks
+import tea
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+
+# The same observations as raw rows and as (group, outcome, count) rows
+def raw_and_aggregated(tmp_path):
+    rng = np.random.default_rng(9)
+    n = 2000
+    raw = pd.DataFrame({'g': rng.choice(['a', 'b', 'c'], n), 'h': rng.choice(['u', 'v'], n),
+                        'y': np.round(rng.normal(size=n), 1)})
+    aggregated = raw.groupby(['g', 'h', 'y']).size().rename('count').reset_index()
+    raw.to_csv(tmp_path / 'raw.csv', index=False)
+    aggregated.to_csv(tmp_path / 'aggregated.csv', index=False)
+    return Dataset(str(tmp_path / 'raw.csv'), [], None), Dataset(str(tmp_path / 'aggregated.csv'), [], None, 'count')
+
+
+def test_weights_must_be_counts(tmp_path):
+    pd.DataFrame({'y': [1.0, 2.0], 'count': [1, 2.5]}).to_csv(tmp_path / 'bad.csv', index=False)
+    with pytest.raises(ValueError):
+        Dataset(str(tmp_path / 'bad.csv'), [], None, 'count')
+
+
+def test_select_repeats_weighted_rows(tmp_path):
+    raw, aggregated = raw_and_aggregated(tmp_path)
+    assert len(aggregated.data) < len(raw.data)
+    selected = aggregated.select('y', where=["g == 'a'"])
+    expected = raw.select('y', where=["g == 'a'"])
+    assert np.array_equal(np.sort(selected.to_numpy()), np.sort(expected.to_numpy()))
+
+
+def test_statistics_on_weighted_rows_match_raw_rows(tmp_path):
+    raw, aggregated = raw_and_aggregated(tmp_path)
+    groups = ['a', 'b', 'c']
+
+    summary = summaryStatistics.from_data(aggregated, 'y', 'g', groups)
+    a, b = [raw.data.loc[raw.data['g'] == g, 'y'] for g in ['a', 'b']]
+    assert np.allclose(summaryStatistics.t_test(summary, 'a', 'b'), stats.ttest_ind(a, b))
+    assert np.allclose(summaryStatistics.t_test(summary, 'a', 'b', equal_var=False), stats.ttest_ind(a, b, equal_var=False))
+    assert np.allclose(summaryStatistics.one_way_anova(summary)[0], stats.f_oneway(*[raw.data.loc[raw.data['g'] == g, 'y'] for g in groups])[0])
+
+    terms = [('g',), ('h',), ('g', 'h')]
+    assert np.allclose(linearModels.anova_table(aggregated, 'y', terms).values,
+                       linearModels.anova_table(raw, 'y', terms).values, equal_nan=True)
+
+    assert np.array_equal(contingency.table(aggregated, 'g', 'h', groups, ['u', 'v']).dense(),
+                          contingency.table(raw, 'g', 'h', groups, ['u', 'v']).dense())
+
+
+def test_ranks_and_levene_on_weighted_rows_match_raw_rows(tmp_path):
+    raw, aggregated = raw_and_aggregated(tmp_path)
+    groups = ['a', 'b', 'c']
+    samples = [raw.data.loc[raw.data['g'] == g, 'y'] for g in groups]
+
+    assert np.allclose(ranks.kruskal(ranks.grouped(aggregated, 'y', 'g', groups)), stats.kruskal(*samples))
+    pair = ranks.grouped(aggregated, 'y', 'g', groups[:2])
+    assert pair.count('a') == len(samples[0])
+    assert np.allclose(ranks.mannwhitney_u(pair, 'a', 'b'), stats.mannwhitneyu(samples[0], samples[1], alternative='two-sided'))
+
+    selected = [aggregated.select_weighted('y', where=[f"g == '{g}'"]) for g in groups]
+    assert all(len(y) == len(w) < len(s) for (y, w), s in zip(selected, samples))
+    assert np.allclose(summaryStatistics.levene([y for y, _ in selected], [w for _, w in selected]), stats.levene(*samples))
+
+    y, weights = aggregated.select_weighted('y')
+    ranking = ranks.rank(y.to_numpy(), weights)
+    assert ranking.n == len(raw.data)
+    assert np.allclose(np.sort(ranking.observation_ranks()), np.sort(stats.rankdata(raw.data['y'])))
+    z = np.sin(y.to_numpy())
+    assert np.allclose(ranks.spearman(ranking, ranks.rank(z, weights)),
+                       stats.spearmanr(raw.data['y'], np.sin(raw.data['y'])))
+
+
+def test_hypothesize_from_summary(tmp_path):
+    rng = np.random.default_rng(10)
+    samples = {g: rng.normal(i * 0.2, 1, 50 + 10 * i) for i, g in enumerate(['a', 'b', 'c'])}
+    summary = pd.DataFrame({'group': list(samples),
+                            'm': [s.mean() for s in samples.values()],
+                            'sd': [s.std(ddof=1) for s in samples.values()],
+                            'n': [len(s) for s in samples.values()]})
+    summary.to_csv(tmp_path / 'summary.csv', index=False)
+
+    results = tea.hypothesize_from_summary(str(tmp_path / 'summary.csv'), 'group', 'm', 'sd', 'n')
+    assert list(results['test']) == ['f_test']
+    assert np.allclose(results[['statistic', 'p_value']].values[0], stats.f_oneway(*samples.values()))
+
+    summary[summary['group'] != 'c'].to_csv(tmp_path / 'two.csv', index=False)
+    results = tea.hypothesize_from_summary(str(tmp_path / 'two.csv'), 'group', 'm', 'sd', 'n')
+    welch = results[results['test'] == 'welchs_t'].iloc[0]
+    assert np.allclose([welch['statistic'], welch['p_value']], stats.ttest_ind(samples['a'], samples['b'], equal_var=False))